@@ -3,7 +3,9 @@ Copyright 2013 Mark Dredze. All rights reserved.
 This software is released under the 2-clause BSD license.
 Mark Dredze, mdredze@cs.jhu.edu
 '''
-import os, sys, csv, re
+import os, sys, re, multiprocessing
+from csv_loader import CsvLoader
+from reviewer_matching import ReviewerMatcher
 
 '''
 Author: Mark Dredze (mdredze@cs.jhu.edu)
@@ -23,6 +25,15 @@ This enables you to track who has declined your offer by email. All other column
 The result of the script is a list of statistics and a list of names and emails of reviewers who haven't responded.
 As some reviewers may enter a different name or email when they signup, this list may not be accurate.
 
+With the --batch option, the second argument is instead a directory of contact lists, one per area. The area
+of each file is found from its file name (e.g. machine_translation.csv or mt.csv for "Machine Translation (MT)").
+The signup sheet is parsed once, the areas are checked in parallel and a single report is written
+to the --output file (or printed).
+
+With the --fuzzy option, contacts without an exact match are also matched approximately (accents,
+name order, initials, misspellings and alternate emails). Approximate matches are listed with their
+confidence so they can be checked by hand.
+
 '''
 def selectAreaName(self, column_names):
 	areas = []
@@ -37,80 +48,107 @@ def selectAreaName(self, column_names):
 	area_number = input('Select area: ')
 	return areas[area_number][0].lower()
 		
-class ACLCheckReviewers:
-	def __init__(self):
-		pass
+
+# Exact case insensitive lookup of signups by name or email.
+class SignupIndex:
+	def __init__(self, signup_loader):
+		self.entries = []
+		self.names = set()
+		self.emails = set()
+		self.name_to_signup_entry = {}
+		self.email_to_signup_entry = {}
+		for entry in signup_loader:
+			self.entries.append(entry)
+			name = entry['name'].lower()
+			email = entry['email'].lower()
+			if name:
+				self.names.add(name)
+				self.name_to_signup_entry[name] = entry
+			if email:
+				self.emails.add(email)
+				self.email_to_signup_entry[email] = entry
+
+	# Returns the signup entry matching the lowercased name or email, or None.
+	def lookup(self, name_lower, email_lower):
+		if name_lower in self.names:
+			return self.name_to_signup_entry[name_lower]
+		if email_lower in self.emails:
+			return self.email_to_signup_entry[email_lower]
+		return None
 	
+	# Returns (entry, confidence, method), or None if there is no match.
+	def lookupWithConfidence(self, name, email):
+		entry = self.lookup(name.lower(), email.lower())
+		if entry is None:
+			return None
+		return entry, 1.0, 'exact'
 
-	def mapColumns(self, entry):
-		names_to_columns = {}
-		columns_to_names = {}
-		for ii, name in enumerate(entry):
-			names_to_columns[name.lower()] = ii
-			columns_to_names[ii] = name.lower()
-		
-		return names_to_columns, columns_to_names
+# Falls back to approximate matching when there is no exact match.
+class FuzzySignupIndex(SignupIndex):
+	def __init__(self, signup_loader, min_confidence=0.8):
+		SignupIndex.__init__(self, signup_loader)
+		records = [(entry['name'], entry['email'], entry) for entry in self.entries]
+		self.matcher = ReviewerMatcher(records, min_confidence=min_confidence)
+	
+	def lookupWithConfidence(self, name, email):
+		match = SignupIndex.lookupWithConfidence(self, name, email)
+		if match is None:
+			match = self.matcher.match(name, email)
+		return match
+
+# The signup index shared with the batch worker processes, set before they are forked.
+shared_signup_index = None
+
+def normalizeAreaKey(text):
+	return re.sub('[^a-z0-9]', '', text.lower())
+
+# Find the area column for a contact list file from its name. Returns None if there is no match.
+def findAreaColumn(filename, column_names):
+	file_key = normalizeAreaKey(os.path.splitext(os.path.basename(filename))[0])
+	best_column = None
+	best_length = 0
+	for column_name in column_names:
+		match = re.search('areas \[(.+?) \((.*)\)\]?', column_name)
+		if not match:
+			continue
+		keys = [normalizeAreaKey(match.group(1)), normalizeAreaKey(match.group(2))]
+		if file_key and file_key in keys:
+			return column_name
+		# Otherwise take the longest area name contained in the file name.
+		area_key = keys[0]
+		if area_key and area_key in file_key and len(area_key) > best_length:
+			best_column = column_name
+			best_length = len(area_key)
+	return best_column
 
-	def getColumn(self, entry, names_to_columns, column):
-		column_id = names_to_columns[column]
-		if column_id >= len(entry):
-			return ''
-		return entry[column_id]
+def checkAreaInWorker(arguments):
+	contacts_filename, area_name = arguments
+	return ACLCheckReviewers().checkArea(shared_signup_index, CsvLoader(contacts_filename), area_name)
+
+class ACLCheckReviewers:
+	want_string = 'Want to review (1st Choices)'
+	willing_string = 'Willing to review (2nd Choices)'
+	will_not_string = 'Will not review'
+	
+	# min_confidence- if not None, contacts are also matched approximately with at least this confidence.
+	def __init__(self, min_confidence=None):
+		self.min_confidence = min_confidence
 	
 
+	# Returns a streaming loader over the file and its lowercased column names.
 	def loadCSVFile(self, filename):
-		file = open(filename)
-		reader = csv.reader(file)
-		
-		contents = []
-		
-		for ii, entry in enumerate(reader):
-			if ii == 0:
-				names_to_columns, columns_to_names = self.mapColumns(entry)
-				continue
-			line = {}
-			for jj in range(len(entry)):
-				line[columns_to_names[jj]] = entry[jj]
-			contents.append(line)
-
-		file.close()
-		return contents, names_to_columns.keys()	
-			
-	def run(self):
-		if len(sys.argv) != 3:
-			print 'Usage: %s acl_reviewer_stats_filename reviews_email_list_for_area' % sys.argv[0]
-			sys.exit()
-			
-		acl_reviewer_stats_filename = sys.argv[1]
-		acl_reviewer_emails_filename = sys.argv[2]
-		
-		want_string = 'Want to review (1st Choices)'
-		willing_string = 'Willing to review (2nd Choices)'
-		will_not_string = 'Will not review'
-		
-		
-		
-		acl_reviewer_emails_contents = self.loadCSVFile(acl_reviewer_emails_filename)[0]
-		acl_reviewer_stats_contents, column_names = self.loadCSVFile(acl_reviewer_stats_filename)
-		
-		area_name = self.selectAreaName(column_names)
-		
-		# Create a list of all the reviewers who signed up.
-		names = set()
-		emails = set()
-		name_to_signup_entry = {}
-		email_to_signup_entry = {}
-		for entry in acl_reviewer_stats_contents:
-			name = entry['name'].lower()
-			email = entry['email'].lower()
-			if name:
-				names.add(name)
-				name_to_signup_entry[name] = entry
-			if email:
-				emails.add(email)
-				email_to_signup_entry[email] = entry
-		
+		csv_loader = CsvLoader(filename)
+		return csv_loader, csv_loader.getColumnNames()
 	
+	def createSignupIndex(self, signup_loader):
+		if self.min_confidence is not None:
+			return FuzzySignupIndex(signup_loader, self.min_confidence)
+		return SignupIndex(signup_loader)
+	
+	# Compare a contact list with the signups for the area column area_name.
+	# Returns a dict with the counts, the contacted reviewers who haven't signed up and
+	# the signups for this area who weren't contacted.
+	def checkArea(self, signup_index, contacts, area_name):
 		# Check to see if each reviewer signed up.
 		num_missing_reviewers = 0
 		num_missing_email = 0
@@ -123,14 +161,17 @@ class ACLCheckReviewers:
 		
 		contacted_names = set()
 		contacted_emails = set()
+		missing_reviewers = []
+		approximate_matches = []
 		
-		print "Reviewers who haven't signed up yet."
-		for entry in acl_reviewer_emails_contents:
-			name = entry.setdefault('name', '')
-			email = entry.setdefault('email', '')
+		num_contacted = 0
+		for entry in contacts:
+			num_contacted += 1
+			name = entry.get('name')
+			email = entry.get('email')
 			
-			chair = entry.setdefault('chair', '')
-			declined = entry.setdefault('decline', '')
+			chair = entry.get('chair')
+			declined = entry.get('decline')
 			
 			name_lower = name.lower()
 			email_lower = email.lower()
@@ -139,23 +180,29 @@ class ACLCheckReviewers:
 				contacted_names.add(name_lower)
 			if email_lower:
 				contacted_emails.add(email_lower)
-				
+			
+			signup_entry = None
+			match = signup_index.lookupWithConfidence(name, email)
+			if match is not None:
+				signup_entry, confidence, method = match
+				if confidence < 1.0:
+					approximate_matches.append((name, email, signup_entry['name'], signup_entry['email'], confidence, method))
+					# The matched signup was contacted, even if under another name or email.
+					contacted_names.add(signup_entry['name'].lower())
+					contacted_emails.add(signup_entry['email'].lower())
 			if not email:
 				num_missing_email += 1
-			elif name_lower not in names and email_lower not in emails and chair == '' and declined == '':
+			elif signup_entry is None and chair == '' and declined == '':
 				# This reviewer hasn't signed up, didn't decline and is not a chair.
-				print '\t%s\t%s' % (name, email)
+				missing_reviewers.append((name, email))
 				num_missing_reviewers += 1
-			elif name_lower in names or email_lower in emails:
-				if name_lower in names:
-					area_choice = name_to_signup_entry[name_lower].setdefault(area_name, '')
-				elif email_lower in emails:
-					area_choice = email_to_signup_entry[email_lower].setdefault(area_name, '')
+			elif signup_entry is not None:
+				area_choice = signup_entry.get(area_name)
 					
 				num_signed_up_reviewers += 1
-				if area_choice == want_string:
+				if area_choice == self.want_string:
 					num_signed_up_reviewers_first_choice += 1
-				elif area_choice == willing_string:
+				elif area_choice == self.willing_string:
 					num_signed_up_reviewers_second_choice += 1
 				else:
 					num_signed_up_reviewers_no_choice += 1
@@ -164,50 +211,189 @@ class ACLCheckReviewers:
 			elif chair:
 				num_chair += 1
 		
-		print "Reviewers signed up who weren't contacted:"
 		not_contacted_signups = []
 		not_contacted_signups_first = 0
 		not_contacted_signups_second = 0
-		for entry in acl_reviewer_stats_contents:
+		for entry in signup_index.entries:
 			name = entry['name']
 			email = entry['email']
-			area_choice = entry.setdefault(area_name, '')
-			
-			name_lower = name.lower()
-			email_lower = email.lower()
+			area_choice = entry.get(area_name)
 			
 			choice = None
-			if area_choice == want_string:
+			if area_choice == self.want_string:
 				choice = 1
-			elif area_choice == willing_string:
+			elif area_choice == self.willing_string:
 				choice = 2
 			
-			if name_lower not in contacted_names and email_lower not in contacted_emails and choice != None:
+			if choice != None and name.lower() not in contacted_names and email.lower() not in contacted_emails:
 				not_contacted_signups.append((name, email, choice))
 				
 				if choice == 1:
 					not_contacted_signups_first += 1
 				if choice == 2:
 					not_contacted_signups_second += 1
-		
 		not_contacted_signups.sort()
-		for name, email, choice in not_contacted_signups:
-			print '\t%s\t%s\t%d' % (name, email, choice)
-		
-		print "Number of people who haven't responded: %d" % num_missing_reviewers
-		print "Number of people who are missing an email address: %d" % num_missing_email
-		print "Number of signed up reviewers from contact list: %d" % num_signed_up_reviewers
-		print '\tListed area as first choice: %d' % num_signed_up_reviewers_first_choice
-		print '\tListed area as second choice: %d' % num_signed_up_reviewers_second_choice
-		print '\tListed area as no choice: %d' % num_signed_up_reviewers_no_choice
-		print 'Number of people who declined: %d' % num_declined
-		print 'Number of people who are chairing another area: %d' % num_chair
-		print "Number of people who signed up but weren't contacted: %d" % len(not_contacted_signups)
-		print '\tFirst choice: %d' % not_contacted_signups_first
-		print '\tSecond choice: %d' % not_contacted_signups_second
-		print 'Total number of all reviewers who signed up: %d' % (len(names))
-		print 'Total number of reviewers in contact list: %d' % (len(acl_reviewer_emails_contents))
+		
+		return {
+			'area_name': area_name,
+			'missing_reviewers': missing_reviewers,
+			'approximate_matches': approximate_matches,
+			'not_contacted_signups': not_contacted_signups,
+			'num_missing_reviewers': num_missing_reviewers,
+			'num_missing_email': num_missing_email,
+			'num_signed_up_reviewers': num_signed_up_reviewers,
+			'num_signed_up_reviewers_first_choice': num_signed_up_reviewers_first_choice,
+			'num_signed_up_reviewers_second_choice': num_signed_up_reviewers_second_choice,
+			'num_signed_up_reviewers_no_choice': num_signed_up_reviewers_no_choice,
+			'num_declined': num_declined,
+			'num_chair': num_chair,
+			'not_contacted_signups_first': not_contacted_signups_first,
+			'not_contacted_signups_second': not_contacted_signups_second,
+			'num_signups': len(signup_index.names),
+			'num_contacted': num_contacted,
+		}
+	
+	def printAreaReport(self, result, output=sys.stdout):
+		output.write("Reviewers who haven't signed up yet.\n")
+		for name, email in result['missing_reviewers']:
+			output.write('\t%s\t%s\n' % (name, email))
+		output.write("Reviewers signed up who weren't contacted:\n")
+		for name, email, choice in result['not_contacted_signups']:
+			output.write('\t%s\t%s\t%d\n' % (name, email, choice))
+		if result['approximate_matches']:
+			output.write("Approximate matches (contact, signup, confidence):\n")
+			for name, email, signup_name, signup_email, confidence, method in result['approximate_matches']:
+				output.write('\t%s\t%s\t%s\t%s\t%.2f (%s)\n' % (name, email, signup_name, signup_email, confidence, method))
+		
+		output.write("Number of people who haven't responded: %d\n" % result['num_missing_reviewers'])
+		output.write("Number of people who are missing an email address: %d\n" % result['num_missing_email'])
+		output.write("Number of signed up reviewers from contact list: %d\n" % result['num_signed_up_reviewers'])
+		output.write('\tListed area as first choice: %d\n' % result['num_signed_up_reviewers_first_choice'])
+		output.write('\tListed area as second choice: %d\n' % result['num_signed_up_reviewers_second_choice'])
+		output.write('\tListed area as no choice: %d\n' % result['num_signed_up_reviewers_no_choice'])
+		output.write('Number of people who declined: %d\n' % result['num_declined'])
+		output.write('Number of people who are chairing another area: %d\n' % result['num_chair'])
+		output.write("Number of people who signed up but weren't contacted: %d\n" % len(result['not_contacted_signups']))
+		output.write('\tFirst choice: %d\n' % result['not_contacted_signups_first'])
+		output.write('\tSecond choice: %d\n' % result['not_contacted_signups_second'])
+		output.write('Total number of all reviewers who signed up: %d\n' % result['num_signups'])
+		output.write('Total number of reviewers in contact list: %d\n' % result['num_contacted'])
+	
+	# Check every contact list in contacts_path against one parse of the signup sheet.
+	def runBatch(self, acl_reviewer_stats_filename, contacts_path, output, num_processes):
+		global shared_signup_index
+		signup_loader, column_names = self.loadCSVFile(acl_reviewer_stats_filename)
+		shared_signup_index = self.createSignupIndex(signup_loader)
+		
+		jobs = []
+		unmatched_files = []
+		for filename in sorted(os.listdir(contacts_path)):
+			path = os.path.join(contacts_path, filename)
+			if filename.startswith('.') or not os.path.isfile(path):
+				continue
+			area_column = findAreaColumn(filename, column_names)
+			if area_column is None:
+				unmatched_files.append(filename)
+			else:
+				jobs.append((path, area_column))
+		
+		if num_processes > 1 and len(jobs) > 1:
+			pool = multiprocessing.Pool(min(num_processes, len(jobs)))
+			try:
+				results = pool.map(checkAreaInWorker, jobs)
+			finally:
+				pool.close()
+				pool.join()
+		else:
+			results = map(checkAreaInWorker, jobs)
+		
+		output.write('#file\tarea\tcontacted\tsigned up\tfirst choice\tsecond choice\tno choice\tnot responded\tmissing email\tdeclined\tchair\tsigned up not contacted\tapproximate matches\n')
+		for (path, area_column), result in zip(jobs, results):
+			output.write('%s\t%s\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d\n' % (os.path.basename(path), area_column, \
+				result['num_contacted'], result['num_signed_up_reviewers'], result['num_signed_up_reviewers_first_choice'], \
+				result['num_signed_up_reviewers_second_choice'], result['num_signed_up_reviewers_no_choice'], \
+				result['num_missing_reviewers'], result['num_missing_email'], result['num_declined'], result['num_chair'], \
+				len(result['not_contacted_signups']), len(result['approximate_matches'])))
+		for filename in unmatched_files:
+			output.write('Error: could not find the area for contact list %s\n' % filename)
+		
+		for (path, area_column), result in zip(jobs, results):
+			output.write('\n## %s (%s)\n' % (area_column, os.path.basename(path)))
+			self.printAreaReport(result, output)
+		
+	def run(self):
+		usage = "Usage: %prog [options] acl_reviewer_stats_filename reviews_email_list_for_area|contact_list_directory"
+		from optparse import OptionParser
+		
+		parser = OptionParser(usage = usage)
+		parser.add_option(
+				"-b",
+				"--batch",
+				dest="batch",
+				action="store_true",
+				default=False,
+				help="Check every contact list in a directory, one file per area")
+		parser.add_option(
+				"-o",
+				"--output",
+				dest="output_filename",
+				default=None,
+				help="In batch mode, write the report to this file instead of printing it")
+		parser.add_option(
+				"-j",
+				"--processes",
+				dest="num_processes",
+				type="int",
+				default=multiprocessing.cpu_count(),
+				help="In batch mode, the number of worker processes (default: the number of CPUs)")
+		
+		parser.add_option(
+				"-f",
+				"--fuzzy",
+				dest="fuzzy",
+				action="store_true",
+				default=False,
+				help="Also match contacts to signups approximately")
+		parser.add_option(
+				"-c",
+				"--min_confidence",
+				dest="min_confidence",
+				type="float",
+				default=0.8,
+				help="With --fuzzy, the minimum confidence of an approximate match (default: 0.8)")
+		
+		(options, args) = parser.parse_args()
+		
+		if options.fuzzy:
+			self.min_confidence = options.min_confidence
+		
+		if len(args) != 2:
+			parser.print_help()
+			sys.exit()
+			
+		acl_reviewer_stats_filename = args[0]
+		
+		if options.batch:
+			if options.output_filename:
+				output = open(options.output_filename, 'w')
+			else:
+				output = sys.stdout
+			self.runBatch(acl_reviewer_stats_filename, args[1], output, options.num_processes)
+			if output is not sys.stdout:
+				output.close()
+			return
+		
+		acl_reviewer_emails_filename = args[1]
+		
+		acl_reviewer_emails_contents = self.loadCSVFile(acl_reviewer_emails_filename)[0]
+		acl_reviewer_stats_contents, column_names = self.loadCSVFile(acl_reviewer_stats_filename)
+		
+		area_name = selectAreaName(self, column_names)
+		
+		signup_index = self.createSignupIndex(acl_reviewer_stats_contents)
+		result = self.checkArea(signup_index, acl_reviewer_emails_contents, area_name)
+		self.printAreaReport(result)
 
 
 if __name__ == '__main__':
-	ACLCheckReviewers().run()
\ No newline at end of file
+	ACLCheckReviewers().run()
@@ -19,51 +19,51 @@ Mark Dredze, mdredze@cs.jhu.edu
 # Once all areas are full, continue assignment but put an area in the round robin list propto the number of reviewers they need
 # Start with an assumption of 3 * number of papers / load (4) but load is adjustable
 from acl_check_reviewers import selectAreaName
+from min_cost_flow_assigner import MinCostFlowAssigner
+from csv_loader import CsvLoader
+from preference_matrix import PreferenceMatrix
+from instrumentation import Instrumentation
+from identity_resolution import resolveIdentities, parseTimestamp
+from whitelist_index import WhitelistBitset, createReviewerIndex
+from reviewer_registry import ReviewerRegistry
+from multi_start_greedy import MultiStartGreedy
+from local_search import LocalSearch
+from feasibility_check import FeasibilityCheck
+from sparse_affinity import SparseAffinityMatrix
+from paper_assigner import assignPapersInParallel
+from assignment_store import AssignmentStore
+from event_log import EventLog, DETAIL, getLevel, LEVEL_NAMES
 
-import sys, os, csv, re, glob, random
+import sys, os, re, glob, random, hashlib, cPickle, threading, Queue, multiprocessing, heapq
 
-class CsvLoader:
-	def __init__(self, filename):
-		self.__loadFile(filename)
-		
-	def __mapColumns(self, entry):
-		self.names_to_columns = {}
-		self.columns_to_names = {}
-		for ii, name in enumerate(entry):
-			self.names_to_columns[name.lower()] = ii
-			self.columns_to_names[ii] = name.lower()
+# Bump this whenever loadReviewerInformation changes what it returns, to invalidate old caches.
+REVIEWER_CACHE_VERSION = 4
 
-	def getColumn(self, entry, column):
-		column_id = self.names_to_columns[column]
-		if column_id >= len(entry):
-			return ''
-		return entry[column_id]
+# The candidate reviewers for a single area, ordered by preference.
+# Rather than popping from the front of a list (which is O(n) per call), we keep a cursor
+# into the list and advance it past reviewers that have already been used by another area.
+# Each reviewer is passed over at most once, so finding the next eligible reviewer is O(1) amortized.
+class ReviewerCandidatePool:
+	def __init__(self, reviewers):
+		self.reviewers = reviewers
+		self.cursor = 0
 	
-	def getColumnNames(self):
-		return self.names_to_columns.keys()
-		
-	def __loadFile(self, filename):
-		file = open(filename)
-		reader = csv.reader(file)
-		
-		self.contents = []
-		
-		for ii, entry in enumerate(reader):
-			if ii == 0:
-				self.__mapColumns(entry)
-				continue
-			line = {}
-			for jj in range(len(entry)):
-				line[self.columns_to_names[jj]] = entry[jj]
-			self.contents.append(line)
-
-		file.close()
-	
-	def __iter__(self):
-		return self.contents.__iter__()
+	# Return the next reviewer not in used_reviewers, or None if the pool is exhausted.
+	def nextReviewer(self, used_reviewers):
+		reviewers = self.reviewers
+		cursor = self.cursor
+		num_reviewers = len(reviewers)
+		while cursor < num_reviewers:
+			reviewer = reviewers[cursor]
+			cursor += 1
+			if reviewer not in used_reviewers:
+				self.cursor = cursor
+				return reviewer
+		self.cursor = cursor
+		return None
 	
 	def __len__(self):
-		return len(self.contents)
+		return len(self.reviewers) - self.cursor
 		
 class ACLAssignGreedyReviewers:
 	def __init__(self):
@@ -73,9 +73,15 @@ class ACLAssignGreedyReviewers:
 		self.name_field = 'name'
 		self.email_field = 'email'
 		self.start_account_username = 'start account username'
-		pass
+		# Hot-path event counts (a dict), or None when instrumentation is disabled.
+		self.counters = None
+		self.log = EventLog()
+		# The ReviewerRegistry of the last loaded signup sheet, to name reviewers in messages.
+		self.reviewer_registry = None
 	
 	
+	# Returns (reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_to_load).
+	# Reviewers are the integer ids of the ReviewerRegistry.
 	def loadReviewerInformation(self, reviewer_csv_filename):
 		csv_loader = CsvLoader(reviewer_csv_filename)
 		
@@ -86,19 +92,23 @@ class ACLAssignGreedyReviewers:
 		if 'email address' in column_names:
 			self.email_field = 'email address'
 		
-		area_entry_to_name = {}
+		# Resolve the position of each area column once, rather than per row.
+		area_columns = []
 		for entry in column_names:
 			if entry.startswith('areas ['):
 				area_name = re.search('areas \[(.+?) \(', entry).group(1)
-				area_entry_to_name[entry] = area_name
+				area_columns.append((csv_loader.names_to_columns[entry], area_name))
 				
 		
-		names = set()
-		emails = set()
-		reviewer_to_area_choices = {}
-		emails_to_reviewer_id_dict = {}
-		from_reviewer_id_dict = {}
-		reviewer_to_load = {}
+		timestamp_field = None
+		if 'timestamp' in column_names:
+			timestamp_field = 'timestamp'
+		
+		# Read every signup first, then group the signups of the same reviewer.
+		signups = []
+		signup_loads = []
+		signup_area_choices = []
+		signup_timestamps = []
 		
 		num_lines = 0
 		for entry in csv_loader:
@@ -111,42 +121,22 @@ class ACLAssignGreedyReviewers:
 			
 			load_for_reviewer = entry['reduced review load (optional)']
 			
-			reviewer_id = name.replace(' ', '_') + '_' + email.replace(' ', '_')
-			
-				
 			# Is this a valid email address.
 			if '@' not in email or ' ' in email:
-				print 'Warning: Invalid email: %s (%s)' % (name, email)
-			
-
-			duplicate_reviewer = False
-			if reviewer_id in from_reviewer_id_dict or name in names or email in emails:
-				if email in emails_to_reviewer_id_dict:
-					reviewer_id = emails_to_reviewer_id_dict[email]
-					duplicate_reviewer = True
-				else:
-					print 'Warning: duplicate reviewer name: ', name
+				self.log.warning('invalid email', 'Warning: Invalid email: %s (%s)', name, email)
 			
 			try:
 				load_for_reviewer = int(load_for_reviewer)
-				reviewer_to_load[reviewer_id] = load_for_reviewer
-				print 'Registered load limit for %s (%s): %d' % (name, email, load_for_reviewer)
+				self.log.detail('load limit', 'Registered load limit for %s (%s): %d', name, email, load_for_reviewer)
 			except:
-				pass
-			
-			names.add(name)
-			emails.add(email)
+				load_for_reviewer = None
 			
-			emails_to_reviewer_id_dict[email] = reviewer_id
-			tuple = (name, email, start_account_username)
-			
-			from_reviewer_id_dict[reviewer_id] = tuple
 			area_choices = []
-	
-			for area_entry, area_name in area_entry_to_name.iteritems():
-				if area_entry not in entry:
+			values = entry.values
+			for column_id, area_name in area_columns:
+				if column_id >= len(values):
 					continue
-				choice = entry[area_entry]
+				choice = values[column_id]
 				rating = None
 				if choice == self.want_string:
 					rating = 1
@@ -156,30 +146,166 @@ class ACLAssignGreedyReviewers:
 				if rating != None:
 					area_choices.append((area_name, rating))
 			
-			if duplicate_reviewer:
-				# Merge the reveiwers choices by always taking their higher choice.
-				old_area_choices = reviewer_to_area_choices[reviewer_id]
-				new_area_choices = {}
-				for area, rating in area_choices:
-					new_area_choices[area] = rating
-				for area, rating in old_area_choices:
-					new_area_choices[area] = max(new_area_choices.setdefault(area, 0), rating)
-				area_choices = []
-				for area, choice in new_area_choices.iteritems():
-					area_choices.append((area, choice))
-					
-			reviewer_to_area_choices[reviewer_id] = area_choices
+			signups.append((name, email, start_account_username))
+			signup_loads.append(load_for_reviewer)
+			signup_area_choices.append(area_choices)
+			if timestamp_field:
+				signup_timestamps.append(entry[timestamp_field])
+			else:
+				signup_timestamps.append('')
+		
+		groups, group_match_kinds, possible_duplicates = resolveIdentities(signups)
+		
+		# The string id of each reviewer comes from their first signup, so that ids stay the same
+		# as signups are added. Reviewers are interned to integer ids in sorted order of these.
+		group_reviewer_ids = []
+		for group in groups:
+			name, email, start_account_username = signups[group[0]]
+			group_reviewer_ids.append(name.replace(' ', '_') + '_' + email.replace(' ', '_'))
 		
-		print 'Number of lines: %d' % num_lines
-		print 'Loaded %d/%d reviewers.' % (len(from_reviewer_id_dict), len(reviewer_to_area_choices))
-		return reviewer_to_area_choices, emails_to_reviewer_id_dict, from_reviewer_id_dict, reviewer_to_load
+		reviewer_registry = ReviewerRegistry()
+		group_to_reviewer = [None] * len(groups)
+		for gg in sorted(range(len(groups)), key=lambda gg: group_reviewer_ids[gg]):
+			group_to_reviewer[gg] = reviewer_registry.add(group_reviewer_ids[gg], *signups[groups[gg][0]])
+		
+		reviewer_to_area_choices = {}
+		emails_to_reviewer_id_dict = {}
+		reviewer_to_load = {}
+		num_merged_signups = 0
+		for gg, (group, match_kinds) in enumerate(zip(groups, group_match_kinds)):
+			reviewer = group_to_reviewer[gg]
+			record = reviewer_registry[reviewer]
+			
+			# Signups in the order they were submitted (by form timestamp, otherwise file order).
+			# The latest signup gives the reviewer's name, email and username, and the latest
+			# load limit wins.
+			submitted = group
+			if len(group) > 1:
+				timestamps = dict([(ii, parseTimestamp(signup_timestamps[ii])) for ii in group])
+				submitted = sorted(group, key=lambda ii: (timestamps[ii] is not None, timestamps[ii], ii))
+			record.name, record.email, record.start_account_username = signups[submitted[-1]]
+			for ii in submitted:
+				emails_to_reviewer_id_dict[signups[ii][1]] = reviewer
+				if signup_loads[ii] is not None:
+					reviewer_to_load[reviewer] = signup_loads[ii]
+					record.load_limit = signup_loads[ii]
+			
+			# Merge the reveiwers choices by always taking their higher choice.
+			new_area_choices = {}
+			for ii in submitted:
+				for area, rating in signup_area_choices[ii]:
+					new_area_choices[area] = max(new_area_choices.get(area, 0), rating)
+			area_choices = []
+			for area, choice in new_area_choices.iteritems():
+				area_choices.append((area, choice))
+			reviewer_to_area_choices[reviewer] = area_choices
+			record.area_choices = area_choices
+			
+			if len(group) > 1:
+				num_merged_signups += len(group) - 1
+				self.log.detail('merged signups', 'Merged %d signups for %s (%s) matched on %s: %s', \
+								len(group), record.name, record.reviewer_id, ', '.join(sorted(match_kinds)), \
+								' | '.join(['%s (%s)' % (signups[ii][0], signups[ii][1]) for ii in group]), \
+								reviewer_id=record.reviewer_id, signups=[signups[ii] for ii in group], match_kinds=sorted(match_kinds))
+		
+		# People can share a name, so these are not merged and should be checked by hand.
+		for duplicate_groups in possible_duplicates:
+			self.log.warning('duplicate name', 'Warning: possible duplicate signups that only share a name: %s', \
+							' | '.join(['%s (%s)' % signups[groups[gg][0]][:2] for gg in duplicate_groups]), \
+							reviewer_ids=[reviewer_registry[group_to_reviewer[gg]].reviewer_id for gg in duplicate_groups])
+		
+		self.log.info('merged signups', 'Merged %d duplicate signups into %d reviewers.', num_merged_signups, len(groups))
+		self.log.info('stats', 'Number of lines: %d', num_lines)
+		self.log.info('stats', 'Loaded %d/%d reviewers.', len(reviewer_registry), len(reviewer_to_area_choices))
+		self.reviewer_registry = reviewer_registry
+		return reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_to_load
+	
+	def getFileDigest(self, filename):
+		digest = hashlib.md5()
+		file = open(filename, 'rb')
+		while True:
+			block = file.read(1 << 20)
+			if not block:
+				break
+			digest.update(block)
+		file.close()
+		return digest.hexdigest()
+	
+	# The same as loadReviewerInformation, but the result is stored in cache_path and reused
+	# as long as the contents of the signup sheet (and the cache version) are unchanged.
+	def loadReviewerInformationWithCache(self, reviewer_csv_filename, cache_path):
+		cache_key = '%d:%s' % (REVIEWER_CACHE_VERSION, self.getFileDigest(reviewer_csv_filename))
+		cache_filename = os.path.join(cache_path, os.path.basename(reviewer_csv_filename) + '.reviewers.cache')
+		
+		if os.path.exists(cache_filename):
+			try:
+				file = open(cache_filename, 'rb')
+				try:
+					stored_key = cPickle.load(file)
+					if stored_key == cache_key:
+						result = cPickle.load(file)
+						self.log.info('cache', 'Loaded reviewer information from cache: %s', cache_filename)
+						self.reviewer_registry = result[2]
+						self.log.info('stats', 'Loaded %d/%d reviewers.', len(result[2]), len(result[0]))
+						return result
+				finally:
+					file.close()
+			except (cPickle.UnpicklingError, EOFError, ValueError, ImportError, AttributeError), e:
+				self.log.warning('cache', 'Warning: ignoring unreadable cache %s (%s)', cache_filename, e)
+		
+		result = self.loadReviewerInformation(reviewer_csv_filename)
+		
+		if not os.path.exists(cache_path):
+			os.makedirs(cache_path)
+		# Write to a temporary file first so an interrupted run never leaves a partial cache.
+		temp_filename = cache_filename + '.tmp'
+		file = open(temp_filename, 'wb')
+		cPickle.dump(cache_key, file, cPickle.HIGHEST_PROTOCOL)
+		cPickle.dump(result, file, cPickle.HIGHEST_PROTOCOL)
+		file.close()
+		os.rename(temp_filename, cache_filename)
+		self.log.info('cache', 'Saved reviewer information to cache: %s', cache_filename)
+		return result
+	
+	# The same as loadReviewerInformation (or loadReviewerInformationWithCache with a cache_path), but
+	# the result is read from the database if it was loaded from the same signup sheet, and saved
+	# to it otherwise.
+	def loadReviewerInformationWithStore(self, reviewer_csv_filename, store, cache_path=None):
+		key = '%d:%s' % (REVIEWER_CACHE_VERSION, self.getFileDigest(reviewer_csv_filename))
+		if store.getSourceKey('reviewers') == key:
+			result = store.loadReviewers()
+			self.log.info('database', 'Loaded reviewer information from database: %s', store.filename)
+			self.reviewer_registry = result[2]
+			self.log.info('stats', 'Loaded %d/%d reviewers.', len(result[2]), len(result[0]))
+			return result
+		
+		if cache_path:
+			result = self.loadReviewerInformationWithCache(reviewer_csv_filename, cache_path)
+		else:
+			result = self.loadReviewerInformation(reviewer_csv_filename)
+		store.saveReviewers(key, result[0], result[1], result[2])
+		self.log.info('database', 'Saved reviewer information to database: %s', store.filename)
+		return result
+	
+	# The string id of a reviewer, for messages.
+	def describeReviewer(self, reviewer):
+		if self.reviewer_registry is None or reviewer not in self.reviewer_registry:
+			return str(reviewer)
+		return self.reviewer_registry[reviewer].reviewer_id
 	
 	def selectReviewerForArea(self, area, reviewers_per_area_lists, used_reviewers):
-		while len(reviewers_per_area_lists[area]) > 0:
-			reviewer = reviewers_per_area_lists[area].pop(0)
-			if reviewer not in used_reviewers:
-				return reviewer
-		return None
+		if area not in reviewers_per_area_lists:
+			return None
+		if self.counters is None:
+			return reviewers_per_area_lists[area].nextReviewer(used_reviewers)
+		
+		pool = reviewers_per_area_lists[area]
+		start_cursor = pool.cursor
+		reviewer = pool.nextReviewer(used_reviewers)
+		self.counters['selectReviewerForArea calls'] += 1
+		# Every entry passed over except the one returned was already used by another area.
+		self.counters['skipped used reviewers'] += pool.cursor - start_cursor - (reviewer is not None)
+		return reviewer
 	
 	# To handle differences in number of papers, we want to have some areas get multiple
 	# people per round so every area fills up at the same time.
@@ -200,7 +326,7 @@ class ACLAssignGreedyReviewers:
 	
 		if max / min < 2:
 			# The max isn't even twice the min area, so scale things up.
-			print 'Error: max is not greater than twice min. Using 1 for everything.'
+			self.log.error('area priority', 'Error: max is not greater than twice min. Using 1 for everything.')
 		# The min area gets one reviewer per round and every other area gets int(area/min)
 		for area, num_reviewers in reviewers_needed_per_area.iteritems():
 			area_to_num_assignments_per_round[area] = int(num_reviewers / min)
@@ -215,7 +341,7 @@ class ACLAssignGreedyReviewers:
 						reviewer_load_constraint, area_to_load, area_to_num_papers, \
 						area_to_num_assignments_per_round, area_to_paper_load, \
 						assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, \
-						min_reviewers_per_area):
+						min_reviewers_per_area, random_generator=None):
 		# For each area, we have a list of reviewers who selected that area ordered by first choice,
 		# the second choice, then by the number of total areas they picked.
 		
@@ -223,7 +349,10 @@ class ACLAssignGreedyReviewers:
 		assignments = {}
 		
 		areas = area_to_num_papers.keys()
-		print 'Assigning to %d areas.' % len(areas)
+		if random_generator is not None:
+			# Start from a fixed order so that a seed always gives the same assignment.
+			areas.sort()
+		self.log.info('assignment', 'Assigning to %d areas.', len(areas))
 		area_to_num_reviews_assigned = {}
 		for area in areas:
 			area_to_num_reviews_assigned[area] = 0
@@ -242,7 +371,7 @@ class ACLAssignGreedyReviewers:
 				while True:
 					reviewer = self.selectReviewerForArea(area, reviewers_per_area_lists, used_reviewers)
 	
-					if not reviewer:
+					if reviewer is None:
 						break
 					# Assign the reviewer to the area.
 					assignments.setdefault(area, set()).add(reviewer)
@@ -254,7 +383,9 @@ class ACLAssignGreedyReviewers:
 						# A reviewer cannot exceed the load for an area.
 						this_reviewer_load = min(load_constraint, area_to_load[area])
 						if this_reviewer_load != area_to_load[area]:
-							print 'LOAD LIMIT for %s: %d instead of %d' % (reviewer, this_reviewer_load, area_to_load[area])
+							self.log.detail('load limit', 'LOAD LIMIT for %s: %d instead of %d', self.describeReviewer(reviewer), this_reviewer_load, area_to_load[area])
+							if self.counters is not None:
+								self.counters['load limit hits'] += 1
 						else:
 							# This isn't a constraint for this area. Remove it
 							del reviewer_load_constraint[reviewer]
@@ -278,7 +409,9 @@ class ACLAssignGreedyReviewers:
 				# A reviewer cannot exceed the load for an area.
 				this_reviewer_load = min(load_constraint, area_to_load[area])
 				if this_reviewer_load != area_to_load[area]:
-					print 'LOAD LIMIT for %s: %d instead of %d' % (reviewer, this_reviewer_load, area_to_load[area])
+					self.log.detail('load limit', 'LOAD LIMIT for %s: %d instead of %d', self.describeReviewer(reviewer), this_reviewer_load, area_to_load[area])
+					if self.counters is not None:
+						self.counters['load limit hits'] += 1
 				else:
 					# This isn't a constraint for this area. Remove it
 					del reviewer_load_constraint[reviewer]
@@ -299,7 +432,10 @@ class ACLAssignGreedyReviewers:
 					
 		while True:
 			assignment_made = False
-			#random.shuffle(areas)
+			if self.counters is not None:
+				self.counters['assignment rounds'] += 1
+			if random_generator is not None:
+				random_generator.shuffle(areas)
 			for area in areas:
 				if area in full_areas and not all_areas_full:
 					continue
@@ -308,7 +444,7 @@ class ACLAssignGreedyReviewers:
 				for ii in range(0, int(area_to_num_assignments_per_round[area])):
 					# Increase until we find a reviewer. or continue if we cannot.
 					reviewer = self.selectReviewerForArea(area, reviewers_per_area_lists, used_reviewers)
-					if not reviewer:
+					if reviewer is None:
 						continue # We found no valid reviewer.
 						
 					# Assign the reviewer to the area.
@@ -323,7 +459,8 @@ class ACLAssignGreedyReviewers:
 						this_reviewer_load = min(load_constraint, area_to_load[area])
 						if this_reviewer_load != area_to_load[area]:
 							#print 'LOAD LIMIT for %s: %d instead of %d' % (reviewer, this_reviewer_load, area_to_load[area])
-							pass
+							if self.counters is not None:
+								self.counters['load limit hits'] += 1
 						else:
 							# This isn't a constraint for this area. Remove it
 							del reviewer_load_constraint[reviewer]
@@ -354,129 +491,615 @@ class ACLAssignGreedyReviewers:
 				# We can no longer make assignments and we've tried to make any assignment.
 				break
 		
-		print 'Assignments finished.'
+		self.log.info('assignment', 'Assignments finished.')
 		if all_areas_have_been_filled:
-			print 'All areas full.'
+			self.log.info('assignment', 'All areas full.')
 		else:
-			print 'Not all areas full.'
+			self.log.info('assignment', 'Not all areas full.')
 			area_list = []
 			for area in areas:
 				if area not in full_areas:
 					area_list.append(area)
-			print 'Needs reviewers: ' + '   |   '.join(area_list)
+			self.log.info('assignment', 'Needs reviewers: %s', '   |   '.join(area_list), areas=area_list)
 		
+		self.printAreaCoverage(areas, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load)
+				
+		return assignments, area_to_num_reviews_assigned
+	
+	# The number of reviews a reviewer gives to an area. Removes the reviewer's load constraint
+	# if it does not limit them in this area, as assignReviewers does.
+	def assignReviewerLoad(self, reviewer, area, reviewer_load_constraint, area_to_load):
+		if reviewer not in reviewer_load_constraint:
+			return area_to_load[area]
+		this_reviewer_load = min(reviewer_load_constraint[reviewer], area_to_load[area])
+		if this_reviewer_load != area_to_load[area]:
+			if self.counters is not None:
+				self.counters['load limit hits'] += 1
+		else:
+			del reviewer_load_constraint[reviewer]
+		return this_reviewer_load
+	
+	# The fraction of an area's needs (reviews for its papers and min_reviewers_per_area reviewers)
+	# that is still missing. Negative once the area has more than it needs. A missing fraction is
+	# multiplied by priority_factor, so priority areas fill first.
+	def getRelativeDeficit(self, num_reviews, num_reviewers, reviews_needed, min_reviewers_per_area, priority_factor=1):
+		review_deficit = float(reviews_needed - num_reviews) / max(1, reviews_needed)
+		reviewer_deficit = float(min_reviewers_per_area - num_reviewers) / max(1, min_reviewers_per_area)
+		deficit = max(review_deficit, reviewer_deficit)
+		if deficit > 0:
+			deficit *= priority_factor
+		return deficit
+	
+	# An alternative to assignReviewers without per-round quotas. The next reviewer always goes to the
+	# area with the largest relative deficit (see getRelativeDeficit), kept in a heap, so each
+	# assignment costs O(log areas). Once every area has what it needs, the remaining reviewers are
+	# spread so that areas stay evenly over covered. Areas leave the heap when they run out of candidates.
+	# The deficits of priority_areas count increase_priority_factor times.
+	def assignReviewersByDeficit(self, reviewers_per_area_lists, \
+						reviewer_load_constraint, area_to_load, area_to_num_papers, area_to_paper_load, \
+						assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, \
+						min_reviewers_per_area, priority_areas=None):
+		areas = area_to_num_papers.keys()
+		self.log.info('assignment', 'Assigning to %d areas by largest deficit.', len(areas))
+		assignments = {}
+		area_to_num_reviews_assigned = {}
+		for area in areas:
+			area_to_num_reviews_assigned[area] = 0
+		used_reviewers = set()
+		
+		scheduled_areas = set(areas)
+		if assign_all_whitelist_reviewers_to_area:
+			for area in assign_all_whitelist_reviewers_to_area:
+				while True:
+					reviewer = self.selectReviewerForArea(area, reviewers_per_area_lists, used_reviewers)
+					if reviewer is None:
+						break
+					assignments.setdefault(area, set()).add(reviewer)
+					used_reviewers.add(reviewer)
+					area_to_num_reviews_assigned[area] += self.assignReviewerLoad(reviewer, area, reviewer_load_constraint, area_to_load)
+				scheduled_areas.discard(area)
+		
+		for (reviewer, area) in forced_reviewer_to_area.iteritems():
+			assignments.setdefault(area, set()).add(reviewer)
+			used_reviewers.add(reviewer)
+			area_to_num_reviews_assigned[area] += self.assignReviewerLoad(reviewer, area, reviewer_load_constraint, area_to_load)
+		
+		area_to_reviews_needed = {}
+		area_to_priority_factor = {}
+		heap = []
+		for area in scheduled_areas:
+			area_to_reviews_needed[area] = area_to_num_papers[area] * area_to_paper_load[area]
+			area_to_priority_factor[area] = 1
+			if priority_areas != None and area in priority_areas:
+				area_to_priority_factor[area] = self.increase_priority_factor
+			deficit = self.getRelativeDeficit(area_to_num_reviews_assigned[area], len(assignments.get(area, [])), \
+											area_to_reviews_needed[area], min_reviewers_per_area, area_to_priority_factor[area])
+			heap.append((-deficit, area))
+		heapq.heapify(heap)
+		
+		while heap:
+			negative_deficit, area = heapq.heappop(heap)
+			if self.counters is not None:
+				self.counters['scheduler pops'] += 1
+			reviewer = self.selectReviewerForArea(area, reviewers_per_area_lists, used_reviewers)
+			if reviewer is None:
+				# No candidates left, so this area is done.
+				continue
+			assignments.setdefault(area, set()).add(reviewer)
+			used_reviewers.add(reviewer)
+			area_to_num_reviews_assigned[area] += self.assignReviewerLoad(reviewer, area, reviewer_load_constraint, area_to_load)
+			deficit = self.getRelativeDeficit(area_to_num_reviews_assigned[area], len(assignments[area]), \
+											area_to_reviews_needed[area], min_reviewers_per_area, area_to_priority_factor[area])
+			heapq.heappush(heap, (-deficit, area))
+		
+		self.printAssignmentSummary(areas, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load, min_reviewers_per_area)
+		return assignments, area_to_num_reviews_assigned
+	
+	def printAssignmentSummary(self, areas, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load, min_reviewers_per_area):
+		self.log.info('assignment', 'Assignments finished.')
+		area_list = []
+		for area in areas:
+			if area_to_num_reviews_assigned[area] < area_to_num_papers[area] * area_to_paper_load[area] \
+				or len(assignments.get(area, [])) < min_reviewers_per_area:
+				area_list.append(area)
+		if len(area_list) == 0:
+			self.log.info('assignment', 'All areas full.')
+		else:
+			self.log.info('assignment', 'Not all areas full.')
+			self.log.info('assignment', 'Needs reviewers: %s', '   |   '.join(area_list), areas=area_list)
+		
+		self.printAreaCoverage(areas, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load)
+	
+	# Run the greedy assignment for every start of multi_start (a MultiStartGreedy) and keep the best.
+	# Returns (assignments, area_to_num_reviews_assigned, reviewer_load_constraint) of the best start.
+	# The inputs are not modified.
+	def assignReviewersMultiStart(self, multi_start, reviewer_to_area_choices, area_to_whitelist, accept_all_reviewers, \
+						candidate_preference_matrix, preference_matrix, reviewer_load_constraint, area_to_load, \
+						area_to_num_papers, area_to_num_assignments_per_round, area_to_paper_load, \
+						assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, min_reviewers_per_area):
+		inputs = {
+			'assigner': self,
+			'error_output': sys.stderr,
+			'reviewer_to_area_choices': reviewer_to_area_choices,
+			'area_to_whitelist': area_to_whitelist,
+			'accept_all_reviewers': accept_all_reviewers,
+			'preference_matrix': candidate_preference_matrix,
+			'score_preference_matrix': preference_matrix,
+			'reviewer_load_constraint': reviewer_load_constraint,
+			'area_to_load': area_to_load,
+			'area_to_num_papers': area_to_num_papers,
+			'area_to_num_assignments_per_round': area_to_num_assignments_per_round,
+			'area_to_paper_load': area_to_paper_load,
+			'assign_all_whitelist_reviewers_to_area': assign_all_whitelist_reviewers_to_area,
+			'forced_reviewer_to_area': forced_reviewer_to_area,
+			'min_reviewers_per_area': min_reviewers_per_area,
+		}
+		self.log.info('multi start', 'Running %d greedy assignments (seed %d).', multi_start.num_starts, multi_start.seed)
+		results, best = multi_start.run(inputs)
+		# Start 0 is the unrandomized greedy, so its seed is not used.
+		for start, seed, score, assignments, area_to_num_reviews_assigned, start_load_constraint in results:
+			self.log.info('multi start', '\tStart %d (seed %s): min area coverage %.1f%%, coverage %.1f%%, average choice rating %.3f', \
+							start, start and seed or 'none', score[0] * 100, score[1] * 100, score[2], start=start, seed=seed)
+		
+		start, seed, score, assignments, area_to_num_reviews_assigned, start_load_constraint = results[best]
+		self.log.info('multi start', 'Keeping start %d.', start)
+		self.printAreaCoverage(area_to_num_papers.keys(), assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load)
+		return assignments, area_to_num_reviews_assigned, start_load_constraint
+	
+	# Improve the assignments with moves and swaps between the reviewers' whitelisted choices
+	# (see local_search.py) for at most time_budget seconds. reviewer_load_limits are the load
+	# constraints from before the assignment. Forced reviewers and areas that get their whole
+	# whitelist are left alone. Returns (assignments, area_to_num_reviews_assigned, reviewer_load_constraint).
+	def improveAssignments(self, assignments, preference_matrix, reviewer_load_limits, area_to_load, area_to_num_papers, \
+						area_to_paper_load, assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, \
+						min_reviewers_per_area, time_budget):
+		fixed_reviewers = set(forced_reviewer_to_area)
+		if assign_all_whitelist_reviewers_to_area:
+			for area in assign_all_whitelist_reviewers_to_area:
+				fixed_reviewers.update(assignments.get(area, []))
+		reviewer_to_candidate_areas = {}
+		for reviewer, area_to_rating in preference_matrix.getWhitelistedChoices().iteritems():
+			area_to_rating = dict([(area, rating) for area, rating in area_to_rating.iteritems() if area in area_to_num_papers])
+			if area_to_rating:
+				reviewer_to_candidate_areas[reviewer] = area_to_rating
+		
+		local_search = LocalSearch(area_to_load, area_to_num_papers, area_to_paper_load, min_reviewers_per_area, time_budget)
+		stats = local_search.improve(assignments, reviewer_to_candidate_areas, reviewer_load_limits, fixed_reviewers)
+		self.log.info('local search', 'Local search: %d moves, %d swaps in %d passes (%.2fs%s). Missing reviews: %d -> %d, second choices: %d -> %d', \
+						stats['moves'], stats['swaps'], stats['passes'], stats['seconds'], stats['timed_out'] and ', out of time' or '', \
+						stats['cost_before'][0], stats['cost_after'][0], stats['cost_before'][1], stats['cost_after'][1], **stats)
+		if self.counters is not None:
+			self.counters['local search moves'] += stats['moves']
+			self.counters['local search swaps'] += stats['swaps']
+		
+		area_to_num_reviews_assigned = {}
+		for area in area_to_num_papers:
+			area_to_num_reviews_assigned[area] = 0
+		reviewer_to_area = {}
+		for area, reviewers in assignments.iteritems():
+			for reviewer in reviewers:
+				reviewer_to_area[reviewer] = area
+				area_to_num_reviews_assigned[area] += local_search.getLoad(reviewer, area)
+		# As in assignReviewers, a load constraint is only kept if it is below the load of the reviewer's area.
+		reviewer_load_constraint = {}
+		for reviewer, load_limit in reviewer_load_limits.iteritems():
+			if reviewer not in reviewer_to_area or load_limit < area_to_load[reviewer_to_area[reviewer]]:
+				reviewer_load_constraint[reviewer] = load_limit
+		
+		self.printAreaCoverage(area_to_num_papers.keys(), assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load)
+		return assignments, area_to_num_reviews_assigned, reviewer_load_constraint
+	
+	# Bound the coverage and choice ratings any assignment can reach (see feasibility_check) and
+	# report areas the whitelists cannot cover. With strict, stop if some area cannot be covered.
+	# Returns the bounds, for printOptimalityGap.
+	def checkFeasibility(self, preference_matrix, reviewer_load_limits, area_to_load, area_to_num_papers, area_to_paper_load, \
+						forced_reviewer_to_area, min_reviewers_per_area, strict=False):
+		reviewer_to_candidate_areas = {}
+		for reviewer, area_to_rating in preference_matrix.getWhitelistedChoices().iteritems():
+			area_to_rating = dict([(area, rating) for area, rating in area_to_rating.iteritems() if area in area_to_num_papers])
+			if area_to_rating:
+				reviewer_to_candidate_areas[reviewer] = area_to_rating
+		preassigned = {}
+		for (reviewer, area) in forced_reviewer_to_area.iteritems():
+			preassigned.setdefault(area, set()).add(reviewer)
+		
+		def reviewerLoad(reviewer, area):
+			if reviewer in reviewer_load_limits:
+				return min(reviewer_load_limits[reviewer], area_to_load[area])
+			return area_to_load[area]
+		
+		feasibility_check = FeasibilityCheck(area_to_num_papers.keys(), area_to_num_papers, area_to_paper_load, area_to_load, min_reviewers_per_area)
+		bounds = feasibility_check.check(reviewer_to_candidate_areas, preassigned, reviewerLoad)
+		
+		num_problems = 0
+		for area in sorted(bounds['areas']):
+			area_bounds = bounds['areas'][area]
+			if area_bounds['capacity'] < area_bounds['reviews_needed']:
+				num_problems += 1
+				self.log.warning('feasibility', 'Area %s can get at most %d of the %d reviews it needs from its whitelist.', \
+								area, area_bounds['capacity'], area_bounds['reviews_needed'], area=area, **area_bounds)
+			if area_bounds['max_reviewers'] < min_reviewers_per_area:
+				num_problems += 1
+				self.log.warning('feasibility', 'Area %s can get at most %d of the %d reviewers it needs from its whitelist.', \
+								area, area_bounds['max_reviewers'], min_reviewers_per_area, area=area, **area_bounds)
+		self.log.info('feasibility', 'At most %d of the %d reviews needed can be covered (%.1f%%), and %d of the %d reviewers needed for min_reviewers_per_area.', \
+						bounds['max_reviews_covered'], bounds['reviews_needed'], 100.0 * bounds['max_reviews_covered'] / max(1, bounds['reviews_needed']), \
+						bounds['max_min_reviewers_covered'], bounds['min_reviewers_needed'], \
+						max_reviews_covered=bounds['max_reviews_covered'], reviews_needed=bounds['reviews_needed'])
+		self.log.info('feasibility', 'Best possible average choice rating: %.3f, first choices: %d', \
+						bounds['min_average_rating'], bounds['max_first_choices'])
+		
+		if strict and (bounds['max_reviews_covered'] < bounds['reviews_needed'] \
+					or bounds['max_min_reviewers_covered'] < bounds['min_reviewers_needed']):
+			self.log.error('feasibility', 'Error: the whitelists cannot cover every area (%d problems). Fix them and run again.', num_problems)
+			self.log.flush()
+			sys.exit()
+		return bounds
+	
+	# Compare an assignment with the bounds of checkFeasibility.
+	def printOptimalityGap(self, bounds, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load, \
+						min_reviewers_per_area, preference_matrix):
+		reviews_covered = 0
+		min_reviewers_covered = 0
+		for area in area_to_num_papers:
+			reviews_covered += min(area_to_num_reviews_assigned.get(area, 0), area_to_num_papers[area] * area_to_paper_load[area])
+			min_reviewers_covered += min(len(assignments.get(area, [])), min_reviewers_per_area)
+		total_rating = 0
+		num_rated = 0
+		num_first_choices = 0
+		for area, reviewers in assignments.iteritems():
+			for reviewer in reviewers:
+				rating = preference_matrix.getRating(reviewer, area)
+				if rating:
+					total_rating += rating
+					num_rated += 1
+					num_first_choices += rating == 1
+		average_rating = float(total_rating) / max(1, num_rated)
+		self.log.info('optimality gap', 'Reviews covered: %d (bound %d, gap %d). Reviewers toward min_reviewers_per_area: %d (bound %d, gap %d).', \
+						reviews_covered, bounds['max_reviews_covered'], bounds['max_reviews_covered'] - reviews_covered, \
+						min_reviewers_covered, bounds['max_min_reviewers_covered'], bounds['max_min_reviewers_covered'] - min_reviewers_covered, \
+						reviews_covered=reviews_covered, min_reviewers_covered=min_reviewers_covered)
+		self.log.info('optimality gap', 'Average choice rating: %.3f (bound %.3f, gap %.3f). First choices: %d (bound %d, gap %d).', \
+						average_rating, bounds['min_average_rating'], average_rating - bounds['min_average_rating'], \
+						num_first_choices, bounds['max_first_choices'], bounds['max_first_choices'] - num_first_choices, \
+						average_rating=average_rating, first_choices=num_first_choices)
+	
+	def printAreaCoverage(self, areas, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load):
 		areas.sort()
 		for area in areas:
 			coverage = area_to_num_reviews_assigned[area]/area_to_paper_load[area] / float(area_to_num_papers[area]) * 100
 			prefix = ''
 			if coverage < 100:
 				prefix='* '
-			print '%s%s (Reviewers: %d, Max review capacity: %d, Actual reviews needed: %d, Coverage: %.0f%%)' % (prefix, area, len(assignments[area]), area_to_num_reviews_assigned[area]/area_to_paper_load[area], area_to_num_papers[area], coverage)
-				
+			self.log.info('area coverage', '%s%s (Reviewers: %d, Max review capacity: %d, Actual reviews needed: %d, Coverage: %.0f%%)', prefix, area, len(assignments[area]), area_to_num_reviews_assigned[area]/area_to_paper_load[area], area_to_num_papers[area], coverage)
+	
+	# An alternative to assignReviewers with a min-cost flow (see min_cost_flow_assigner.py).
+	# Areas are covered first (min_reviewers_per_area, then the reviews needed for their papers),
+	# and first choices are preferred over second choices. Every eligible reviewer is assigned.
+	# The flow counts reviewers rather than reviews, so with reduced loads it is not guaranteed
+	# to cover the most reviews.
+	def assignReviewersWithFlow(self, reviewers_per_area_lists, reviewer_to_area_choices, \
+						reviewer_load_constraint, area_to_load, area_to_num_papers, area_to_paper_load, \
+						assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, \
+						min_reviewers_per_area):
+		areas = area_to_num_papers.keys()
+		self.log.info('assignment', 'Assigning to %d areas with min-cost flow.', len(areas))
+		
+		used_reviewers = set()
+		preassigned = {}
+		
+		# These areas get everyone in their whitelist that is available, so they are not part of the flow.
+		flow_areas = list(areas)
+		if assign_all_whitelist_reviewers_to_area:
+			for area in assign_all_whitelist_reviewers_to_area:
+				while True:
+					reviewer = self.selectReviewerForArea(area, reviewers_per_area_lists, used_reviewers)
+					if reviewer is None:
+						break
+					preassigned.setdefault(area, set()).add(reviewer)
+					used_reviewers.add(reviewer)
+				if area in flow_areas:
+					flow_areas.remove(area)
+		
+		for (reviewer, area) in forced_reviewer_to_area.iteritems():
+			preassigned.setdefault(area, set()).add(reviewer)
+			used_reviewers.add(reviewer)
+		
+		# The areas each remaining reviewer may be assigned to, with their rating.
+		reviewer_to_candidate_areas = {}
+		for area in flow_areas:
+			if area not in reviewers_per_area_lists:
+				continue
+			for reviewer in reviewers_per_area_lists[area].reviewers:
+				if reviewer not in used_reviewers:
+					reviewer_to_candidate_areas.setdefault(reviewer, [])
+		for reviewer in reviewer_to_candidate_areas:
+			for area, rating in reviewer_to_area_choices[reviewer]:
+				if area in reviewers_per_area_lists and area in flow_areas:
+					reviewer_to_candidate_areas[reviewer].append((area, rating))
+		# Only keep areas whose candidate pool actually contains the reviewer (i.e. they passed the whitelist).
+		area_to_candidates = {}
+		for area in flow_areas:
+			if area in reviewers_per_area_lists:
+				area_to_candidates[area] = set(reviewers_per_area_lists[area].reviewers)
+		for reviewer, area_choices in reviewer_to_candidate_areas.iteritems():
+			reviewer_to_candidate_areas[reviewer] = [(area, rating) for area, rating in area_choices if reviewer in area_to_candidates[area]]
+		
+		def reviewerLoad(reviewer, area):
+			if reviewer in reviewer_load_constraint:
+				return min(reviewer_load_constraint[reviewer], area_to_load[area])
+			return area_to_load[area]
+		
+		flow_assigner = MinCostFlowAssigner(flow_areas, area_to_num_papers, area_to_paper_load, area_to_load, min_reviewers_per_area)
+		assignments = flow_assigner.assign(reviewer_to_candidate_areas, preassigned, reviewerLoad)
+		
+		area_to_num_reviews_assigned = {}
+		for area in areas:
+			area_to_num_reviews_assigned[area] = 0
+		for area, reviewers in assignments.iteritems():
+			for reviewer in reviewers:
+				this_reviewer_load = reviewerLoad(reviewer, area)
+				if reviewer in reviewer_load_constraint and this_reviewer_load == area_to_load[area]:
+					# This isn't a constraint for this area. Remove it
+					del reviewer_load_constraint[reviewer]
+				area_to_num_reviews_assigned[area] += this_reviewer_load
+		
+		self.printAssignmentSummary(areas, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load, min_reviewers_per_area)
+		
 		return assignments, area_to_num_reviews_assigned
 	
-	# Create a map between area and reviewer, with reviewers sorted by choice.
-	def createAreaReviewerLists(self, reviewer_to_area_choices, area_to_whitelist, accept_all_reviewers=False):
+	# Create a map between area and a pool of reviewers, with reviewers sorted by choice.
+	# preference_matrix- a PreferenceMatrix of reviewer_to_area_choices with the whitelists set.
+	# 		It is built here if not given.
+	# random_generator- if given (a random.Random), reviewers with the same rating are shuffled.
+	def createAreaReviewerLists(self, reviewer_to_area_choices, area_to_whitelist, accept_all_reviewers=False, preference_matrix=None, \
+								random_generator=None):
+		if preference_matrix is None:
+			preference_matrix = PreferenceMatrix(reviewer_to_area_choices)
+			preference_matrix.setWhitelists(area_to_whitelist, accept_all_reviewers)
+		
 		reviewers_per_area_lists = {}
 		area_to_total_possible_reviewers = {}
-		for reviewer, area_choices in reviewer_to_area_choices.iteritems():
-			for area, rating in area_choices:
-				if accept_all_reviewers or (area in area_to_whitelist and reviewer in area_to_whitelist[area]):
-					reviewers_per_area_lists.setdefault(area, []).append((rating, reviewer))
-				area_to_total_possible_reviewers[area] = area_to_total_possible_reviewers.setdefault(area, 0) + 1
-		
-		for area, list in reviewers_per_area_lists.iteritems():
-			list.sort(reverse=False)
-			new_list = []
-			for num, reviewer in list:
-				new_list.append(reviewer)
-			reviewers_per_area_lists[area] = new_list
-		
-		print 'Accepted reviewers per area (not including forced reviewers).'
+		for area in preference_matrix.areas:
+			area_to_total_possible_reviewers[area] = preference_matrix.countChoices(area)
+			candidates = preference_matrix.getCandidates(area, random_generator)
+			if candidates:
+				reviewers_per_area_lists[area] = ReviewerCandidatePool(candidates)
+		
+		self.log.info('accepted reviewers', 'Accepted reviewers per area (not including forced reviewers).')
 		for area in area_to_whitelist:
-			percent = float(len(reviewers_per_area_lists[area])) / float(area_to_total_possible_reviewers[area]) * 100
-			print '\t%s %d accepted / %d total (%.2f)' % (area, len(reviewers_per_area_lists[area]), area_to_total_possible_reviewers[area], percent)
+			num_accepted = 0
+			if area in reviewers_per_area_lists:
+				num_accepted = len(reviewers_per_area_lists[area])
+			num_total = area_to_total_possible_reviewers.get(area, 0)
+			percent = 0.0
+			if num_total > 0:
+				percent = float(num_accepted) / float(num_total) * 100
+			self.log.info('accepted reviewers', '\t%s %d accepted / %d total (%.2f)', area, num_accepted, num_total, percent)
 		return reviewers_per_area_lists
+	
+	# Load a previous _all_list.csv output. Returns a dict between reviewer email and area.
+	def loadPreviousAssignments(self, previous_assignments_filename):
+		previous_assignments = {}
+		file = open(previous_assignments_filename)
+		for line in file:
+			# Only strip the line ending: the first field (the START username) may be empty.
+			line = line.rstrip('\r\n')
+			if line.startswith('#') or line.strip() == '':
+				continue
+			split_line = line.split('\t')
+			if len(split_line) < 5:
+				self.log.error('bad line', 'Error on line: "%s"', line)
+				continue
+			previous_assignments[split_line[1].strip().lower()] = split_line[4].strip()
+		file.close()
+		self.log.info('incremental', 'Loaded %d previous assignments.', len(previous_assignments))
+		return previous_assignments
+	
+	# Keep every previous assignment that is still valid, so that reviewers who have already been
+	# told their area are not moved. A previous assignment is dropped if the reviewer withdrew,
+	# is no longer whitelisted for (or no longer chose) the area, or is now forced elsewhere.
+	# Returns the baseline (a dict between reviewer and area, including forced reviewers) and the
+	# area choices of the reviewers who still need an area: new signups and dropped reviewers.
+	# These can be passed to assignReviewers as the forced reviewers and to createAreaReviewerLists.
+	def computeIncrementalBaseline(self, previous_assignments, reviewer_to_area_choices, emails_to_reviewer_id_dict, \
+									area_to_whitelist, forced_reviewer_to_area, accept_all_reviewers=False):
+		baseline = {}
+		num_withdrawn = 0
+		num_ineligible = 0
+		num_moved = 0
+		for email, area in previous_assignments.iteritems():
+			reviewer = emails_to_reviewer_id_dict.get(email)
+			if reviewer is None or reviewer not in reviewer_to_area_choices:
+				num_withdrawn += 1
+			elif reviewer in forced_reviewer_to_area:
+				if forced_reviewer_to_area[reviewer] != area:
+					num_moved += 1
+			elif area not in area_to_whitelist or area not in dict(reviewer_to_area_choices[reviewer]) \
+				or not (accept_all_reviewers or reviewer in area_to_whitelist[area]):
+				num_ineligible += 1
+			else:
+				baseline[reviewer] = area
+		num_kept = len(baseline)
+		
+		for reviewer, area in forced_reviewer_to_area.iteritems():
+			baseline[reviewer] = area
+		
+		unassigned_reviewer_to_area_choices = {}
+		for reviewer, area_choices in reviewer_to_area_choices.iteritems():
+			if reviewer not in baseline:
+				unassigned_reviewer_to_area_choices[reviewer] = area_choices
+		
+		self.log.info('incremental', 'Incremental assignment: kept %d, withdrawn %d, no longer eligible %d, moved by force %d, to assign %d.', \
+			num_kept, num_withdrawn, num_ineligible, num_moved, len(unassigned_reviewer_to_area_choices))
+		return baseline, unassigned_reviewer_to_area_choices
 
 	def getSecondArgument(self, line):
 		line = line.strip()
 
 		split_line = line.split('\t')
 		if len(split_line) < 2:
-			print 'Error on line: %s' % line
+			self.log.error('bad line', 'Error on line: %s', line)
 		argument = split_line[1]
 		
 		return argument
 		
-	def loadWhitelists(self, whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area):
+	# Read one whitelist file. Returns (header, entries, errors): header is (area name, load,
+	# paper load), or None if it can not be read, entries is a list of (name, email) and errors
+	# is a list of messages. Nothing is printed, so files can be read in parallel.
+	def parseWhitelistFile(self, filename):
+		errors = []
+		entries = []
+		file = open(filename)
+		header_lines = []
+		for line in file:
+			if len(header_lines) < 3:
+				header_lines.append(line)
+				continue
+			line = line.strip()
+			if line.startswith('#') or line == '':
+				continue
+			split_line = line.split('\t')
+			if len(split_line) != 2:
+				errors.append('Error on line in %s: "%s"' % (filename, line))
+				if len(split_line) < 2:
+					continue
+			entries.append((split_line[0].strip(), split_line[1].strip().lower()))
+		file.close()
+		
+		if len(header_lines) < 3 or not header_lines[0].startswith('#') and not header_lines[1].startswith('#') and not header_lines[2].startswith('#'):
+			errors.append('Error in whitelist file. Missing # on first three lines.  %s' % filename)
+		try:
+			header = [line.strip().split('\t')[1] for line in header_lines]
+			header = (header[0], int(header[1]), int(header[2]))
+		except (IndexError, ValueError):
+			errors.append('Error: could not read the area name, load and paper load from %s' % filename)
+			header = None
+		return header, entries, errors
+	
+	# Read the whitelist files with a pool of threads.
+	# Returns a list of (header, entries, errors), in the order of whitelist_files.
+	def readWhitelistFiles(self, whitelist_files, num_threads):
+		jobs = Queue.Queue()
+		for ii, filename in enumerate(whitelist_files):
+			jobs.put((ii, filename))
+		results = [None] * len(whitelist_files)
+		exceptions = []
+		
+		def worker():
+			while True:
+				try:
+					ii, filename = jobs.get_nowait()
+				except Queue.Empty:
+					return
+				try:
+					results[ii] = self.parseWhitelistFile(filename)
+				except Exception, e:
+					exceptions.append(e)
+		
+		threads = [threading.Thread(target=worker) for ii in range(max(1, min(num_threads, len(whitelist_files))))]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		if exceptions:
+			raise exceptions[0]
+		return results
+	
+	# Returns (area_to_whitelist, area_to_load, area_to_paper_load). Each whitelist is a WhitelistBitset.
+	# Every error in every file is reported before exiting, so they can all be fixed at once.
+	def loadWhitelists(self, whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area, num_threads=8):
 		whitelists = {}
 		area_to_load = {}
 		area_to_paper_load = {}
-		for filename in whitelist_files:
-			print 'Loading whitelist: %s' % filename
-			file = open(filename)
-			lines = file.readlines()
-			file.close()
-			
-			if not lines[0].startswith('#') and not lines[1].startswith('#') and not lines[2].startswith('#'):
-				print 'Error in whitelist file. Missing # on first three lines. ', filename
+		reviewers, reviewer_index = createReviewerIndex(emails_to_reviewer_id_dict.itervalues())
+		num_fatal_errors = 0
+		
+		results = self.readWhitelistFiles(whitelist_files, num_threads)
+		for filename, (header, entries, errors) in zip(whitelist_files, results):
+			self.log.detail('whitelist', 'Loading whitelist: %s', filename)
+			for error in errors:
+				self.log.error('whitelist', '%s', error, filename=filename)
+			if header is None:
+				num_fatal_errors += 1
+				continue
 			
-			area_name = self.getSecondArgument(lines[0])
-			area_to_load[area_name] = int(self.getSecondArgument(lines[1]))
-			area_to_paper_load[area_name] = int(self.getSecondArgument(lines[2]))
+			area_name, area_to_load[area_name], area_to_paper_load[area_name] = header
 			
 			num_loaded_reviewers = 0 
-			whitelists[area_name] = set()
-			for line in lines[3:]:
-				line = line.strip()
-				if line.startswith('#') or line == '':
-					continue
-				split_line = line.split('\t')
-				if len(split_line) != 2:
-					print 'Error on line: "%s"' % line
-				reviewer_name = split_line[0].strip()
-				reviewer_email = split_line[1].strip().lower()
-				
+			whitelisted_reviewers = []
+			for reviewer_name, reviewer_email in entries:
 				if reviewer_email not in emails_to_reviewer_id_dict:
-					print 'Error: whitelist contains unknown reviewer: "%s" "%s"' % (reviewer_name, reviewer_email)
-					sys.exit()
+					self.log.error('whitelist', 'Error: whitelist %s contains unknown reviewer: "%s" "%s"', filename, reviewer_name, reviewer_email, filename=filename)
+					num_fatal_errors += 1
+					continue
 				
+				reviewer_id = emails_to_reviewer_id_dict[reviewer_email]
 				if reviewer_name.startswith('*'):
 					reviewer_name = reviewer_name[1:]
-					print 'Forcing reviewer %s to area %s' % (reviewer_name, area_name)
-					reviewer_id = emails_to_reviewer_id_dict[reviewer_email]
+					self.log.detail('forced reviewer', 'Forcing reviewer %s to area %s', reviewer_name, area_name)
 					if reviewer_id in forced_reviewer_to_area:
-						print 'Error. %s is being forced to multiple areas.' % reviewer_name
+						self.log.error('forced reviewer', 'Error. %s is being forced to multiple areas.', reviewer_name, filename=filename)
 						area_list_to_print = [forced_reviewer_to_area[reviewer_id], area_name]
-						print '\tAreas: %s' % '|'.join(area_list_to_print)
-						sys.exit()
+						self.log.error('forced reviewer', '\tAreas: %s', '|'.join(area_list_to_print))
+						num_fatal_errors += 1
 					else:
-						forced_reviewer_to_area[emails_to_reviewer_id_dict[reviewer_email]] = area_name
+						forced_reviewer_to_area[reviewer_id] = area_name
 						num_loaded_reviewers += 1
 				else:
-					whitelists[area_name].add(emails_to_reviewer_id_dict[reviewer_email])
+					whitelisted_reviewers.append(reviewer_id)
 					num_loaded_reviewers += 1
-					
+			whitelists[area_name] = WhitelistBitset(reviewers, reviewer_index)
+			whitelists[area_name].update(whitelisted_reviewers)
 			
-			print 'Loaded %d reviewers for area %s.' % (num_loaded_reviewers, area_name)
-
-		print 'Processed %d whitelists.' % len(whitelists)
+			self.log.info('whitelist', 'Loaded %d reviewers for area %s.', num_loaded_reviewers, area_name)
+		
+		if num_fatal_errors:
+			self.log.error('whitelist', 'Error: found %d problems in the whitelists. Fix them and run again.', num_fatal_errors)
+			self.log.flush()
+			sys.exit()
+		
+		self.log.info('whitelist', 'Processed %d whitelists.', len(whitelists))
 		return whitelists, area_to_load, area_to_paper_load
 	
+	# The same as loadWhitelists, but the whitelists are read from the database if they were loaded
+	# from the same files (and signup sheet), and saved to it otherwise.
+	def loadWhitelistsWithStore(self, whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area, store):
+		digest = hashlib.md5(store.getSourceKey('reviewers') or '')
+		for filename in sorted(whitelist_files):
+			digest.update('%s\t%s\n' % (os.path.basename(filename), self.getFileDigest(filename)))
+		key = digest.hexdigest()
+		if store.getSourceKey('whitelists') == key:
+			reviewers, reviewer_index = createReviewerIndex(emails_to_reviewer_id_dict.itervalues())
+			result = store.loadWhitelists(reviewers, reviewer_index, forced_reviewer_to_area)
+			self.log.info('database', 'Loaded %d whitelists from database: %s', len(result[0]), store.filename)
+			return result
+		
+		result = self.loadWhitelists(whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area)
+		store.saveWhitelists(key, result[0], result[1], result[2], forced_reviewer_to_area)
+		self.log.info('database', 'Saved whitelists to database: %s', store.filename)
+		return result
+	
 	def getWhitelistFilenames(self, whitelist_files_prefix):
 		return glob.glob(whitelist_files_prefix + '*')
 	
-	def printFinalAssignmentStats(self, output_filename_prefix, assignments, from_reviewer_id_dict, reviewer_load_constraint):
+	# With a store (an AssignmentStore), the assignments are also saved to the database.
+	def printFinalAssignmentStats(self, output_filename_prefix, assignments, reviewer_registry, reviewer_load_constraint, store=None):
+		if store is not None:
+			store.saveAssignments(assignments, reviewer_load_constraint)
+			self.log.info('database', 'Saved assignments to database: %s', store.filename)
 		output = open(output_filename_prefix + '_all_list.csv', 'w')
 		
 		#output.write('#name\temail\tmax papers to assign\tarea\n')
 		output.write('#username\temail\tfirst\tlast\ttrack\tmax papers to assign\n')
-		for area_name, reviewers in assignments.iteritems():
+		# Areas and reviewers in sorted order, so the same assignment always gives the same files.
+		for area_name in sorted(assignments):
 			filename = area_name.replace(' ', '_').replace('/', '_').replace('&', '_')
 			area_output = open(output_filename_prefix + filename + '.csv', 'w')
 			area_output.write('#name\temail\tmax papers to assign\n')
-			for reviewer in reviewers:
-				reviewer_name, reviewer_email, start_account_username = from_reviewer_id_dict[reviewer]
+			for reviewer in sorted(assignments[area_name]):
+				record = reviewer_registry[reviewer]
+				reviewer_name, reviewer_email, start_account_username = record.name, record.email, record.start_account_username
 				load_constraint = ''
 				if reviewer in reviewer_load_constraint:
 					load_constraint = str(reviewer_load_constraint[reviewer])
@@ -490,6 +1113,110 @@ class ACLAssignGreedyReviewers:
 		
 		
 	
+	# Load a file with a line per paper: paper id \t area.
+	# Returns a dict between area and its paper ids, in the order of the file.
+	def loadPapers(self, papers_filename, area_to_num_papers):
+		area_to_papers = {}
+		file = open(papers_filename)
+		for line in file:
+			line = line.strip()
+			if line.startswith('#') or line == '':
+				continue
+			split_line = line.split('\t')
+			if len(split_line) != 2:
+				self.log.error('papers', 'Error on line in %s: "%s"', papers_filename, line)
+				continue
+			paper_id, area = split_line[0].strip(), split_line[1].strip().lower()
+			if area not in area_to_num_papers:
+				self.log.warning('papers', 'Paper %s is in unknown area %s.', paper_id, area, paper=paper_id, area=area)
+				continue
+			area_to_papers.setdefault(area, []).append(paper_id)
+		file.close()
+		
+		for area in sorted(area_to_papers):
+			if len(area_to_papers[area]) != area_to_num_papers[area]:
+				self.log.warning('papers', 'Area %s has %d papers but its area stats give %d.', area, len(area_to_papers[area]), \
+								area_to_num_papers[area], area=area)
+		return area_to_papers
+	
+	# Assign the papers of each area to the reviewers assigned to that area (see paper_assigner).
+	# The affinities file has a line per bid or affinity score: paper id \t reviewer email \t score.
+	# Writes a line per paper and reviewer to output_filename_prefix + '_paper_assignments.csv'.
+	def assignPapers(self, papers_filename, affinities_filename, output_filename_prefix, assignments, reviewer_registry, \
+					emails_to_reviewer_id_dict, reviewer_load_constraint, area_to_num_papers, area_to_load, area_to_paper_load, \
+					num_processes=1):
+		area_to_papers = self.loadPapers(papers_filename, area_to_num_papers)
+		
+		# Each area's reviewers and papers are the rows and columns of its affinity matrix.
+		area_to_reviewers = {}
+		reviewer_to_row = {}
+		paper_to_column = {}
+		for area in area_to_papers:
+			area_to_reviewers[area] = sorted(assignments.get(area, []))
+			for ii, reviewer in enumerate(area_to_reviewers[area]):
+				reviewer_to_row[reviewer] = (area, ii)
+			for ii, paper_id in enumerate(area_to_papers[area]):
+				paper_to_column[paper_id] = (area, ii)
+		
+		area_to_entries = dict((area, []) for area in area_to_papers)
+		num_skipped = 0
+		file = open(affinities_filename)
+		# This file can have millions of lines, so the loop does as little as possible per line.
+		for line in file:
+			if line.startswith('#') or not line.strip():
+				continue
+			split_line = line.split('\t')
+			try:
+				paper_id, email, score = split_line[0], split_line[1].strip().lower(), float(split_line[2])
+			except (IndexError, ValueError):
+				self.log.error('affinities', 'Error on line in %s: "%s"', affinities_filename, line.strip())
+				continue
+			paper_column = paper_to_column.get(paper_id) or paper_to_column.get(paper_id.strip())
+			reviewer_row = reviewer_to_row.get(emails_to_reviewer_id_dict.get(email))
+			if paper_column is None or reviewer_row is None or reviewer_row[0] != paper_column[0]:
+				# An unknown paper or reviewer, or a reviewer assigned to another area.
+				num_skipped += 1
+				continue
+			area_to_entries[reviewer_row[0]].append((reviewer_row[1], paper_column[1], score))
+		file.close()
+		if num_skipped:
+			self.log.info('affinities', 'Skipped %d scores for papers and reviewers not in the same area.', num_skipped, skipped=num_skipped)
+		
+		area_to_inputs = {}
+		for area in area_to_papers:
+			reviewers = area_to_reviewers[area]
+			if not reviewers:
+				self.log.warning('papers', 'Area %s has %d papers but no reviewers.', area, len(area_to_papers[area]), area=area)
+			capacities = [reviewer_load_constraint.get(reviewer, area_to_load[area]) for reviewer in reviewers]
+			area_to_inputs[area] = {'paper_load': area_to_paper_load[area], 'capacities': capacities, \
+									'affinities': SparseAffinityMatrix(len(reviewers), len(area_to_papers[area]), area_to_entries[area])}
+		del area_to_entries
+		area_to_results = assignPapersInParallel(area_to_inputs, num_processes)
+		
+		output = open(output_filename_prefix + '_paper_assignments.csv', 'w')
+		output.write('#paper\ttrack\temail\tscore\n')
+		total_needed = 0
+		total_assigned = 0
+		for area in sorted(area_to_results):
+			paper_to_reviewers, stats = area_to_results[area]
+			affinities = area_to_inputs[area]['affinities']
+			for column, reviewers in enumerate(paper_to_reviewers):
+				paper_id = area_to_papers[area][column]
+				for row in reviewers:
+					reviewer = area_to_reviewers[area][row]
+					output.write('%s\t%s\t%s\t%s\n' % (paper_id, area, reviewer_registry[reviewer].email, affinities.getScore(row, column)))
+			prefix = ''
+			if stats['reviews_assigned'] < stats['reviews_needed']:
+				prefix = '* '
+			self.log.info('paper assignment', '%s%s (Papers: %d, Reviews assigned: %d of %d, With a positive score: %d, Average score: %.2f)', \
+							prefix, area, stats['papers'], stats['reviews_assigned'], stats['reviews_needed'], stats['scored_reviews'], \
+							stats['total_score'] / max(1, stats['reviews_assigned']), area=area, **stats)
+			total_needed += stats['reviews_needed']
+			total_assigned += stats['reviews_assigned']
+		output.close()
+		self.log.info('paper assignment', 'Assigned %d of the %d paper reviews needed.', total_assigned, total_needed, \
+						reviews_assigned=total_assigned, reviews_needed=total_needed)
+	
 	# Process a filename of the following format:
 	# areaname \t reviewer load (how many papers per reviewer) \t num submissions
 	
@@ -501,17 +1228,19 @@ class ACLAssignGreedyReviewers:
 			line = line.strip()
 			if line.startswith('#') or line == '':
 				continue
-			print line
+			self.log.info('area stats', '%s', line)
 			area_name, submissions = line.split('\t')
 
 			area_to_num_papers[area_name.lower()] = int(submissions)
 			total_submissions += int(submissions)
 		file.close()
 		
-		print 'Total submissions: %d' % total_submissions
+		self.log.info('stats', 'Total submissions: %d', total_submissions)
 		return area_to_num_papers
 	
-	def computeReviewerStats(self, assignments, reviewer_to_area_choices):
+	def computeReviewerStats(self, assignments, reviewer_to_area_choices, preference_matrix=None):
+		if preference_matrix is None:
+			preference_matrix = PreferenceMatrix(reviewer_to_area_choices)
 		total_choice_scores = 0
 		total_assigned = 0
 		rating_counts = [0,0]
@@ -519,32 +1248,34 @@ class ACLAssignGreedyReviewers:
 		for area_name, reviewer_list in assignments.iteritems():
 			for reviewer in reviewer_list:
 				assigned_reviewers.add(reviewer)
-				area_choices = reviewer_to_area_choices[reviewer]
-				for choice, rating in area_choices:
-					if choice == area_name:
-						total_choice_scores += rating
-						total_assigned += 1
-						rating_counts[rating-1] += 1 
-						break
+				rating = preference_matrix.getRating(reviewer, area_name)
+				if rating:
+					total_choice_scores += rating
+					total_assigned += 1
+					rating_counts[rating-1] += 1 
 
-		print 'Average choice rating: ' + str(float(total_choice_scores) / float(total_assigned))
-		print 'Reviewers with first choice: ' + str(rating_counts[0])
-		print 'Reviewers with second choice: ' + str(rating_counts[1])
-		print 'Assigned reviewers: ' + str(total_assigned)
-		print 'Total reviewers: ' + str(len(reviewer_to_area_choices))
+		self.log.info('stats', 'Average choice rating: %s', float(total_choice_scores) / float(total_assigned))
+		self.log.info('stats', 'Reviewers with first choice: %d', rating_counts[0])
+		self.log.info('stats', 'Reviewers with second choice: %d', rating_counts[1])
+		self.log.info('stats', 'Assigned reviewers: %d', total_assigned)
+		self.log.info('stats', 'Total reviewers: %d', len(reviewer_to_area_choices))
 		
 		# Who wasn't assigned?
 		unassigned_reviewers = set()
 		for reviewer in reviewer_to_area_choices.keys():
 			if reviewer not in assigned_reviewers:
 				unassigned_reviewers.add(reviewer)
-		print 'Unassigned reviewers: %s' % ', '.join(unassigned_reviewers)
+		self.log.info('stats', 'Number of unassigned reviewers: %d', len(unassigned_reviewers))
+		# Only build the (possibly very long) list of names if someone will see it.
+		if self.log.isEnabledFor(DETAIL):
+			unassigned_reviewer_ids = sorted([self.describeReviewer(reviewer) for reviewer in unassigned_reviewers])
+			self.log.detail('unassigned reviewers', 'Unassigned reviewers: %s', ', '.join(unassigned_reviewer_ids), reviewers=unassigned_reviewer_ids)
 		
 				
 	def loadReviewerLoadConstraints(self, reviewer_load_constraints_files, email_to_reviewer_id):
 		reviewer_load_constraint = {}
 		for filename in reviewer_load_constraints_files:
-			print 'Loading constraints from file: %s' % filename
+			self.log.detail('load constraints', 'Loading constraints from file: %s', filename)
 			file = open(filename)
 		
 			for line in file:
@@ -556,7 +1287,7 @@ class ACLAssignGreedyReviewers:
 				email = email.lower()
 				
 				if email not in email_to_reviewer_id:
-					print 'Error: Loaded a constraint for %s but could not find this reviewer.' % email
+					self.log.error('load constraints', 'Error: Loaded a constraint for %s but could not find this reviewer.', email)
 				else:
 					reviewer_id = email_to_reviewer_id[email]
 					reviewer_load_constraint[reviewer_id] = int(load)
@@ -579,14 +1310,119 @@ class ACLAssignGreedyReviewers:
 		# area_to_num_assignments_per_round = {} # In the round robin assignment, give multiple reviewers to each
 		# 		area based on the number of reviewers they have total.
 		
-		if len(sys.argv) != 5:
-			print 'Usage: %s reviewer_csv area_stats_filename whitelist_files_prefix output_filename_prefix' % sys.argv[0]
+		usage = "Usage: %prog [options] reviewer_csv area_stats_filename whitelist_files_prefix output_filename_prefix"
+		from optparse import OptionParser
+		
+		parser = OptionParser(usage = usage)
+		parser.add_option(
+				"-e",
+				"--engine",
+				dest="engine",
+				type="choice",
+				choices=["greedy", "deficit", "flow"],
+				default="greedy",
+				help="The assignment algorithm: greedy round robin, greedy by largest area deficit or min-cost flow over reviewer slots (default: greedy)")
+		parser.add_option(
+				"-p",
+				"--previous",
+				dest="previous_assignments_filename",
+				default=None,
+				help="A previous _all_list.csv output. Keep its assignments where still valid and only assign the remaining reviewers")
+		parser.add_option(
+				"-c",
+				"--cache",
+				dest="cache_path",
+				default=None,
+				help="A directory in which to cache the parsed signup sheet between runs")
+		parser.add_option(
+				"-i",
+				"--instrument",
+				dest="instrument_filename",
+				default=None,
+				help="Write the time and peak memory of each phase and hot-path counters to this JSON file")
+		parser.add_option(
+				"-v",
+				"--verbosity",
+				dest="verbosity",
+				type="choice",
+				choices=LEVEL_NAMES,
+				default="detail",
+				help="The most detailed messages to print: error, warning, info or detail (per reviewer messages) (default: detail)")
+		parser.add_option(
+				"-l",
+				"--events",
+				dest="events_filename",
+				default=None,
+				help="Also write every message as a JSON object per line to this file")
+		parser.add_option(
+				"-m",
+				"--starts",
+				dest="num_starts",
+				type="int",
+				default=1,
+				help="Run this many randomized greedy assignments and keep the best (greedy engine only, default: 1)")
+		parser.add_option(
+				"-s",
+				"--seed",
+				dest="seed",
+				type="int",
+				default=0,
+				help="The random seed of the randomized greedy assignments (default: 0)")
+		parser.add_option(
+				"-j",
+				"--processes",
+				dest="num_processes",
+				type="int",
+				default=multiprocessing.cpu_count(),
+				help="The number of worker processes for the randomized greedy assignments (default: the number of CPUs)")
+		parser.add_option(
+				"-t",
+				"--local_search",
+				dest="local_search_time",
+				type="float",
+				default=0,
+				help="Improve the assignment with moves and swaps for up to this many seconds (default: 0, no local search)")
+		parser.add_option(
+				"-f",
+				"--feasibility",
+				dest="feasibility",
+				type="choice",
+				choices=["off", "report", "strict"],
+				default="off",
+				help="Bound the achievable coverage and choice ratings with a max-flow before assigning, and report how far the result is from them. strict also stops if the whitelists cannot cover every area (default: off)")
+		parser.add_option(
+				"-P",
+				"--papers",
+				dest="papers_filename",
+				default=None,
+				help="Also assign papers to the reviewers of their area. A file with a line per paper: paper id \\t area")
+		parser.add_option(
+				"-A",
+				"--affinities",
+				dest="affinities_filename",
+				default=None,
+				help="The bids or affinity scores for --papers, a line per score: paper id \\t reviewer email \\t score. Higher is better and a negative score is a conflict")
+		parser.add_option(
+				"-d",
+				"--database",
+				dest="database_filename",
+				default=None,
+				help="A SQLite database in which to store the reviewers, whitelists and assignments. Later runs with the same inputs read them from it")
+		
+		(options, args) = parser.parse_args()
+		
+		if len(args) != 4:
+			parser.print_help()
 			sys.exit()
-		reviewer_csv = sys.argv[1]
-		area_stats_filename = sys.argv[2]
-		whitelist_files_prefix = sys.argv[3]
-		output_filename_prefix = sys.argv[4]
-		#reviewer_load_constraints_prefix = sys.argv[5]
+		if options.num_starts > 1 and options.engine != 'greedy':
+			parser.error('--starts can only be used with the greedy engine')
+		if (options.papers_filename is None) != (options.affinities_filename is None):
+			parser.error('--papers and --affinities must be used together')
+		reviewer_csv = args[0]
+		area_stats_filename = args[1]
+		whitelist_files_prefix = args[2]
+		output_filename_prefix = args[3]
+		#reviewer_load_constraints_prefix = args[4]
 		
 		accept_all_reviewers = False		
 
@@ -601,37 +1437,131 @@ class ACLAssignGreedyReviewers:
 		# reviewers per area
 		min_reviewers_per_area = 10
 		################################################
-		area_to_num_papers = self.loadAreaStats(area_stats_filename)
+		self.log = EventLog(getLevel(options.verbosity), jsonl_filename=options.events_filename)
+		try:
+			instrumentation = Instrumentation(options.instrument_filename is not None)
+			self.counters = instrumentation.counters
 		
-		# Dedpue and normalize reviewer list
-		# emails_to_reviewer_id_dict # A dictionary between emails to reviewer ids.
-		# from_reviewer_id_dict # A dictionary containing reviewer names and emails (tuple) from reviewer id.
+			with instrumentation.phase('loadAreaStats'):
+				area_to_num_papers = self.loadAreaStats(area_stats_filename)
 		
-		reviewer_to_area_choices, emails_to_reviewer_id_dict, from_reviewer_id_dict, reviewer_load_constraint = self.loadReviewerInformation(reviewer_csv)
-		# Load whitelists and normalize reviewers.
-		# A dictionary mapping area to a set of reviewer_ids
+			# Dedpue and normalize reviewer list
+			# emails_to_reviewer_id_dict # A dictionary between emails to reviewer ids.
+			# reviewer_registry # A ReviewerRegistry with the name, email and username of each (integer) reviewer id.
 		
-		#reviewer_load_constraints_files = self.getWhitelistFilenames(reviewer_load_constraints_prefix)
-		#reviewer_load_constraint = self.loadReviewerLoadConstraints(reviewer_load_constraints_files, emails_to_reviewer_id_dict)
+			store = None
+			if options.database_filename:
+				store = AssignmentStore(options.database_filename)
+			with instrumentation.phase('loadReviewerInformation'):
+				if store is not None:
+					reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_load_constraint = \
+						self.loadReviewerInformationWithStore(reviewer_csv, store, options.cache_path)
+				elif options.cache_path:
+					reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_load_constraint = \
+						self.loadReviewerInformationWithCache(reviewer_csv, options.cache_path)
+				else:
+					reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_load_constraint = self.loadReviewerInformation(reviewer_csv)
+			# Load whitelists and normalize reviewers.
+			# A dictionary mapping area to a set of reviewer_ids
 		
-		forced_reviewer_to_area = {}
-		whitelist_files = self.getWhitelistFilenames(whitelist_files_prefix)
-		area_to_whitelist, area_to_load, area_to_paper_load = self.loadWhitelists(whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area)
-		# normalize reviewers by unique keys based on email and username so we can match against whitelists
-		reviewers_per_area_lists = self.createAreaReviewerLists(reviewer_to_area_choices, area_to_whitelist, accept_all_reviewers=accept_all_reviewers)
+			#reviewer_load_constraints_files = self.getWhitelistFilenames(reviewer_load_constraints_prefix)
+			#reviewer_load_constraint = self.loadReviewerLoadConstraints(reviewer_load_constraints_files, emails_to_reviewer_id_dict)
 		
-		# area_to_paper_load- the number of reviewers needed for each paper in each area
+			forced_reviewer_to_area = {}
+			with instrumentation.phase('loadWhitelists'):
+				whitelist_files = self.getWhitelistFilenames(whitelist_files_prefix)
+				if store is not None:
+					area_to_whitelist, area_to_load, area_to_paper_load = \
+						self.loadWhitelistsWithStore(whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area, store)
+				else:
+					area_to_whitelist, area_to_load, area_to_paper_load = self.loadWhitelists(whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area)
+			# Build the reviewer x area preference matrix once for the candidate lists and final stats.
+			with instrumentation.phase('buildPreferenceMatrix'):
+				preference_matrix = PreferenceMatrix(reviewer_to_area_choices)
+				preference_matrix.setWhitelists(area_to_whitelist, accept_all_reviewers)
 		
-		area_to_num_assignments_per_round = self.computeNumAreaAssignmentPerRound(area_to_load, area_to_num_papers, area_to_paper_load, priority_areas)
-						
-						
-		assignments, area_to_num_reviews_assigned = \
-			self.assignReviewers(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
-								area_to_num_papers, area_to_num_assignments_per_round, area_to_paper_load, \
-								assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, min_reviewers_per_area)
+			candidate_reviewer_to_area_choices = reviewer_to_area_choices
+			candidate_preference_matrix = preference_matrix
+			if options.previous_assignments_filename:
+				# Only repair the previous assignments: keep valid ones in place (as forced reviewers) and
+				# build the candidate lists from the reviewers who still need an area.
+				with instrumentation.phase('computeIncrementalBaseline'):
+					previous_assignments = self.loadPreviousAssignments(options.previous_assignments_filename)
+					forced_reviewer_to_area, candidate_reviewer_to_area_choices = \
+						self.computeIncrementalBaseline(previous_assignments, reviewer_to_area_choices, emails_to_reviewer_id_dict, \
+														area_to_whitelist, forced_reviewer_to_area, accept_all_reviewers)
+				candidate_preference_matrix = None
+		
+			# normalize reviewers by unique keys based on email and username so we can match against whitelists
+			with instrumentation.phase('createAreaReviewerLists'):
+				reviewers_per_area_lists = self.createAreaReviewerLists(candidate_reviewer_to_area_choices, area_to_whitelist, \
+											accept_all_reviewers=accept_all_reviewers, preference_matrix=candidate_preference_matrix)
+		
+			# area_to_paper_load- the number of reviewers needed for each paper in each area
+		
+			# The assignment removes load constraints that do not limit a reviewer's area.
+			reviewer_load_limits = dict(reviewer_load_constraint)
+			if options.feasibility != 'off':
+				with instrumentation.phase('checkFeasibility'):
+					bounds = self.checkFeasibility(preference_matrix, reviewer_load_limits, area_to_load, area_to_num_papers, area_to_paper_load, \
+											forced_reviewer_to_area, min_reviewers_per_area, options.feasibility == 'strict')
+		
+			with instrumentation.phase('assignReviewers'):
+				if options.engine == 'deficit':
+					assignments, area_to_num_reviews_assigned = \
+						self.assignReviewersByDeficit(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
+											area_to_num_papers, area_to_paper_load, \
+											assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, min_reviewers_per_area, \
+											priority_areas)
+				elif options.engine == 'flow':
+					assignments, area_to_num_reviews_assigned = \
+						self.assignReviewersWithFlow(reviewers_per_area_lists, reviewer_to_area_choices, reviewer_load_constraint, \
+											area_to_load, area_to_num_papers, area_to_paper_load, \
+											assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, min_reviewers_per_area)
+				else:
+					area_to_num_assignments_per_round = self.computeNumAreaAssignmentPerRound(area_to_load, area_to_num_papers, area_to_paper_load, priority_areas)
+				
+					if options.num_starts > 1:
+						assignments, area_to_num_reviews_assigned, reviewer_load_constraint = \
+							self.assignReviewersMultiStart(MultiStartGreedy(options.num_starts, options.seed, options.num_processes), \
+											candidate_reviewer_to_area_choices, area_to_whitelist, accept_all_reviewers, \
+											candidate_preference_matrix, preference_matrix, reviewer_load_constraint, area_to_load, \
+											area_to_num_papers, area_to_num_assignments_per_round, area_to_paper_load, \
+											assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, min_reviewers_per_area)
+					else:
+						assignments, area_to_num_reviews_assigned = \
+							self.assignReviewers(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
+												area_to_num_papers, area_to_num_assignments_per_round, area_to_paper_load, \
+												assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, min_reviewers_per_area)
+		
+			if options.local_search_time > 0:
+				with instrumentation.phase('localSearch'):
+					assignments, area_to_num_reviews_assigned, reviewer_load_constraint = \
+						self.improveAssignments(assignments, preference_matrix, reviewer_load_limits, area_to_load, area_to_num_papers, \
+											area_to_paper_load, assign_all_whitelist_reviewers_to_area, forced_reviewer_to_area, \
+											min_reviewers_per_area, options.local_search_time)
+		
+			if options.feasibility != 'off':
+				self.printOptimalityGap(bounds, assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load, \
+									min_reviewers_per_area, preference_matrix)
+		
+			with instrumentation.phase('writeOutput'):
+				self.computeReviewerStats(assignments, reviewer_to_area_choices, preference_matrix)
+				self.printFinalAssignmentStats(output_filename_prefix, assignments, reviewer_registry, reviewer_load_constraint, store)
+		
+			if options.papers_filename:
+				with instrumentation.phase('assignPapers'):
+					self.assignPapers(options.papers_filename, options.affinities_filename, output_filename_prefix, assignments, \
+									reviewer_registry, emails_to_reviewer_id_dict, reviewer_load_constraint, area_to_num_papers, \
+									area_to_load, area_to_paper_load, options.num_processes)
 		
-		self.computeReviewerStats(assignments, reviewer_to_area_choices)
-		self.printFinalAssignmentStats(output_filename_prefix, assignments, from_reviewer_id_dict, reviewer_load_constraint)
+			if store is not None:
+				store.close()
+		finally:
+			# Write out what was logged even if the run fails.
+			self.log.close()
+		if options.instrument_filename:
+			instrumentation.writeReport(options.instrument_filename)
 
 if __name__ == '__main__':
 	ACLAssignGreedyReviewers().run()
\ No newline at end of file
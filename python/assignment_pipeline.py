@@ -0,0 +1,253 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# An importable pipeline that runs the steps of the scripts in one process.
+#
+# The usual workflow writes whitelists with create_reviewer_csv_per_area.py, has the chairs edit
+# them, and then runs acl_greedy_assign_reviewers.py, which parses the signup sheet and every
+# whitelist again. The pipeline parses the signup sheet once and keeps it in memory. Whitelists
+# are AreaWhitelist objects that can be created from the signups, loaded from or written to
+# whitelist files, and edited. The assignment and output stages of ACLAssignGreedyReviewers are
+# then called directly, as often as needed:
+#
+#	pipeline = AssignmentPipeline()
+#	pipeline.loadSignups('signup.csv')
+#	pipeline.loadAreaStats('area_stats.txt')
+#	whitelists = pipeline.createWhitelists(area_load=4, paper_load=3)
+#	whitelists['machine translation'].remove('someone@example.org')
+#	whitelists['machine translation'].force('chair@example.org')
+#	area_to_emails = pipeline.assign(engine='deficit')
+#	pipeline.writeOutput('output/acl2013_')
+#
+# Whitelists hold reviewer emails, as the whitelist files do. Problems (unknown emails, reviewers
+# forced to several areas) raise a ValueError listing all of them, rather than exiting.
+import os, sys
+
+from acl_greedy_assign_reviewers import ACLAssignGreedyReviewers
+from preference_matrix import PreferenceMatrix
+from whitelist_index import WhitelistBitset, createReviewerIndex
+from event_log import EventLog, WARNING
+
+class AreaWhitelist:
+	def __init__(self, area, area_load, paper_load, emails=(), forced_emails=()):
+		self.area = area
+		self.area_load = area_load
+		self.paper_load = paper_load
+		self.emails = set([email.lower() for email in emails])
+		# Reviewers that must be assigned to this area.
+		self.forced_emails = set([email.lower() for email in forced_emails])
+
+	def add(self, email):
+		self.emails.add(email.lower())
+
+	def remove(self, email):
+		self.emails.discard(email.lower())
+		self.forced_emails.discard(email.lower())
+
+	def force(self, email):
+		self.emails.discard(email.lower())
+		self.forced_emails.add(email.lower())
+
+	def __contains__(self, email):
+		return email.lower() in self.emails or email.lower() in self.forced_emails
+
+	def __len__(self):
+		return len(self.emails) + len(self.forced_emails)
+
+class AssignmentPipeline:
+	# log- an EventLog for the messages of every stage (default: warnings and errors on stderr).
+	def __init__(self, min_reviewers_per_area=10, accept_all_reviewers=False, log=None):
+		self.assigner = ACLAssignGreedyReviewers()
+		if log is None:
+			log = EventLog(WARNING, output=sys.stderr)
+		self.assigner.log = log
+		self.log = log
+		self.assigner.increase_priority_factor = 2
+		self.min_reviewers_per_area = min_reviewers_per_area
+		self.accept_all_reviewers = accept_all_reviewers
+		self.reviewer_to_area_choices = None
+		self.emails_to_reviewer_id_dict = None
+		self.reviewer_registry = None
+		self.reviewer_load_limits = None
+		self.area_to_num_papers = None
+		# A dict between area and AreaWhitelist.
+		self.whitelists = {}
+		self.assignments = None
+
+	def loadSignups(self, reviewer_csv_filename, cache_path=None):
+		if cache_path:
+			result = self.assigner.loadReviewerInformationWithCache(reviewer_csv_filename, cache_path)
+		else:
+			result = self.assigner.loadReviewerInformation(reviewer_csv_filename)
+		self.reviewer_to_area_choices, self.emails_to_reviewer_id_dict, self.reviewer_registry, self.reviewer_load_limits = result
+		self.log.flush()
+
+	def loadAreaStats(self, area_stats_filename):
+		self.area_to_num_papers = self.assigner.loadAreaStats(area_stats_filename)
+		self.log.flush()
+
+	def setAreaStats(self, area_to_num_papers):
+		self.area_to_num_papers = dict((area.lower(), num_papers) for area, num_papers in area_to_num_papers.iteritems())
+
+	# Every reviewer who gave an area one of ratings (1 for a first choice, 2 for a second) is put
+	# in its whitelist, as create_reviewer_csv_per_area.py does. Areas are those of the area stats
+	# if they are loaded, otherwise every area someone chose. Returns the whitelists.
+	def createWhitelists(self, area_load=4, paper_load=3, ratings=(1, 2)):
+		areas = self.area_to_num_papers
+		if areas is None:
+			areas = set([area for area_choices in self.reviewer_to_area_choices.itervalues() for area, rating in area_choices])
+		self.whitelists = dict((area, AreaWhitelist(area, area_load, paper_load)) for area in areas)
+		for reviewer, area_choices in self.reviewer_to_area_choices.iteritems():
+			email = self.reviewer_registry[reviewer].email
+			for area, rating in area_choices:
+				if rating in ratings and area in self.whitelists:
+					self.whitelists[area].add(email)
+		return self.whitelists
+
+	# Load whitelist files (see ACLAssignGreedyReviewers.loadWhitelists). Returns the whitelists.
+	def loadWhitelists(self, whitelist_files_prefix, num_threads=8):
+		whitelist_files = self.assigner.getWhitelistFilenames(whitelist_files_prefix)
+		whitelists = {}
+		problems = []
+		for filename, (header, entries, errors) in zip(whitelist_files, self.assigner.readWhitelistFiles(whitelist_files, num_threads)):
+			problems.extend(errors)
+			if header is None:
+				continue
+			area, area_load, paper_load = header
+			whitelist = AreaWhitelist(area, area_load, paper_load)
+			for reviewer_name, reviewer_email in entries:
+				if reviewer_name.startswith('*'):
+					whitelist.force(reviewer_email)
+				else:
+					whitelist.add(reviewer_email)
+			whitelists[area] = whitelist
+		self.raiseProblems(problems)
+		self.whitelists = whitelists
+		return self.whitelists
+
+	# Write the whitelists as files the chairs can edit and loadWhitelists (or the assigner) can read.
+	def writeWhitelists(self, output_path):
+		if not os.path.exists(output_path):
+			os.makedirs(output_path)
+		for area in sorted(self.whitelists):
+			whitelist = self.whitelists[area]
+			lines = ['#Area:\t%s\n' % area, '#Area Load:\t%d\n' % whitelist.area_load, '#Paper Load:\t%d\n' % whitelist.paper_load]
+			for prefix, emails in (('*', whitelist.forced_emails), ('', whitelist.emails)):
+				for email in sorted(emails):
+					name = email
+					if email in self.emails_to_reviewer_id_dict:
+						name = self.reviewer_registry[self.emails_to_reviewer_id_dict[email]].name
+					lines.append('%s%s\t%s\n' % (prefix, name, email))
+			filename = area.replace(' ', '_').replace('/', '_').replace('&', '_').lower() + '.tsv'
+			output = open(os.path.join(output_path, filename), 'w')
+			output.write(''.join(lines))
+			output.close()
+
+	def raiseProblems(self, problems):
+		if problems:
+			for problem in problems:
+				self.log.error('whitelist', '%s', problem)
+			self.log.flush()
+			raise ValueError('Found %d problems in the whitelists:\n%s' % (len(problems), '\n'.join(problems)))
+
+	# The whitelists in the form the assignment takes. Returns (area_to_whitelist, area_to_load,
+	# area_to_paper_load, forced_reviewer_to_area).
+	def getWhitelistInputs(self):
+		reviewers, reviewer_index = createReviewerIndex(self.emails_to_reviewer_id_dict.itervalues())
+		area_to_whitelist = {}
+		area_to_load = {}
+		area_to_paper_load = {}
+		forced_reviewer_to_area = {}
+		problems = []
+		for area in sorted(self.whitelists):
+			whitelist = self.whitelists[area]
+			area_to_load[area] = whitelist.area_load
+			area_to_paper_load[area] = whitelist.paper_load
+			area_to_whitelist[area] = WhitelistBitset(reviewers, reviewer_index)
+			for email in sorted(whitelist.emails | whitelist.forced_emails):
+				if email not in self.emails_to_reviewer_id_dict:
+					problems.append('Error: whitelist %s contains unknown reviewer: "%s"' % (area, email))
+					continue
+				reviewer = self.emails_to_reviewer_id_dict[email]
+				if email not in whitelist.forced_emails:
+					area_to_whitelist[area].add(reviewer)
+				elif reviewer in forced_reviewer_to_area:
+					problems.append('Error. %s is being forced to multiple areas: %s|%s' % (email, forced_reviewer_to_area[reviewer], area))
+				else:
+					forced_reviewer_to_area[reviewer] = area
+		self.raiseProblems(problems)
+		return area_to_whitelist, area_to_load, area_to_paper_load, forced_reviewer_to_area
+
+	# Assign reviewers to areas with the current whitelists. engine is greedy, deficit or flow (see
+	# acl_greedy_assign_reviewers.py). Can be called again after editing the whitelists.
+	# Returns a dict between area and the sorted emails of its reviewers.
+	def assign(self, engine='greedy', priority_areas=None, assign_all_areas=None, local_search_time=0):
+		if engine not in ('greedy', 'deficit', 'flow'):
+			raise ValueError('Unknown engine: %s' % engine)
+		area_to_whitelist, area_to_load, area_to_paper_load, forced_reviewer_to_area = self.getWhitelistInputs()
+		area_to_num_papers = self.area_to_num_papers
+		min_reviewers_per_area = self.min_reviewers_per_area
+		if assign_all_areas is not None:
+			assign_all_areas = set(assign_all_areas)
+		assigner = self.assigner
+
+		preference_matrix = PreferenceMatrix(self.reviewer_to_area_choices)
+		preference_matrix.setWhitelists(area_to_whitelist, self.accept_all_reviewers)
+		reviewers_per_area_lists = assigner.createAreaReviewerLists(self.reviewer_to_area_choices, area_to_whitelist, \
+									accept_all_reviewers=self.accept_all_reviewers, preference_matrix=preference_matrix)
+		# The assignment removes load constraints that do not limit a reviewer's area.
+		reviewer_load_constraint = dict(self.reviewer_load_limits)
+		if engine == 'deficit':
+			assignments, area_to_num_reviews_assigned = \
+				assigner.assignReviewersByDeficit(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
+									area_to_num_papers, area_to_paper_load, assign_all_areas, forced_reviewer_to_area, \
+									min_reviewers_per_area, priority_areas)
+		elif engine == 'flow':
+			assignments, area_to_num_reviews_assigned = \
+				assigner.assignReviewersWithFlow(reviewers_per_area_lists, self.reviewer_to_area_choices, reviewer_load_constraint, \
+									area_to_load, area_to_num_papers, area_to_paper_load, assign_all_areas, forced_reviewer_to_area, \
+									min_reviewers_per_area)
+		else:
+			area_to_num_assignments_per_round = assigner.computeNumAreaAssignmentPerRound(area_to_load, area_to_num_papers, \
+									area_to_paper_load, priority_areas)
+			assignments, area_to_num_reviews_assigned = \
+				assigner.assignReviewers(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
+									area_to_num_papers, area_to_num_assignments_per_round, area_to_paper_load, \
+									assign_all_areas, forced_reviewer_to_area, min_reviewers_per_area)
+		if local_search_time > 0:
+			assignments, area_to_num_reviews_assigned, reviewer_load_constraint = \
+				assigner.improveAssignments(assignments, preference_matrix, self.reviewer_load_limits, area_to_load, area_to_num_papers, \
+									area_to_paper_load, assign_all_areas, forced_reviewer_to_area, \
+									min_reviewers_per_area, local_search_time)
+		self.log.flush()
+
+		self.assignments = assignments
+		self.area_to_num_reviews_assigned = area_to_num_reviews_assigned
+		self.reviewer_load_constraint = reviewer_load_constraint
+		self.area_to_load = area_to_load
+		self.area_to_paper_load = area_to_paper_load
+		self.preference_matrix = preference_matrix
+		return self.getAssignedEmails()
+
+	def getAssignedEmails(self):
+		area_to_emails = {}
+		for area, reviewers in self.assignments.iteritems():
+			area_to_emails[area] = sorted([self.reviewer_registry[reviewer].email for reviewer in reviewers])
+		return area_to_emails
+
+	# Write the assignment files of acl_greedy_assign_reviewers.py (see printFinalAssignmentStats).
+	# store- an optional AssignmentStore to also save the assignments to.
+	def writeOutput(self, output_filename_prefix, store=None):
+		self.assigner.computeReviewerStats(self.assignments, self.reviewer_to_area_choices, self.preference_matrix)
+		self.assigner.printFinalAssignmentStats(output_filename_prefix, self.assignments, self.reviewer_registry, \
+									self.reviewer_load_constraint, store)
+		self.log.flush()
+
+	# Assign papers to the reviewers of their area (see ACLAssignGreedyReviewers.assignPapers).
+	def assignPapers(self, papers_filename, affinities_filename, output_filename_prefix, num_processes=1):
+		self.assigner.assignPapers(papers_filename, affinities_filename, output_filename_prefix, self.assignments, \
+									self.reviewer_registry, self.emails_to_reviewer_id_dict, self.reviewer_load_constraint, \
+									self.area_to_num_papers, self.area_to_load, self.area_to_paper_load, num_processes)
+		self.log.flush()
@@ -0,0 +1,157 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# An optional SQLite database with the reviewers, choices, whitelists, load limits and
+# assignments of a run.
+#
+# The assigner writes what it loads into the database, together with a key of the input files
+# it came from (their digests). The next run with the same inputs reads the database instead of
+# parsing the signup sheet and whitelists again. The final assignment is stored as well, so
+# questions like "which areas is this reviewer whitelisted in" are an indexed query:
+#
+#    sqlite3 run.db "select area from whitelists join emails using (reviewer) where email = 'mdredze@cs.jhu.edu'"
+#
+# or: python assignment_store.py run.db mdredze@cs.jhu.edu
+#
+# Reviewers are stored by their integer ids (see reviewer_registry), which only stay the same
+# for the same signup sheet, so whitelists and assignments are replaced whenever reviewers are.
+# Every save is one transaction with executemany, so a large pool loads in a few seconds.
+import sys, sqlite3
+
+from reviewer_registry import ReviewerRegistry
+from whitelist_index import WhitelistBitset
+
+SCHEMA = '''
+create table if not exists sources (name text primary key, key text not null);
+create table if not exists reviewers (reviewer integer primary key, reviewer_id text not null unique, name text,
+	email text, start_account_username text, load_limit integer);
+create table if not exists emails (email text primary key, reviewer integer not null);
+create index if not exists emails_reviewer on emails (reviewer);
+create table if not exists choices (reviewer integer not null, area text not null, rating integer not null,
+	position integer not null, primary key (reviewer, area));
+create index if not exists choices_area on choices (area, rating);
+create table if not exists areas (area text primary key, area_load integer, paper_load integer);
+create table if not exists whitelists (area text not null, reviewer integer not null, forced integer not null,
+	primary key (area, reviewer, forced));
+create index if not exists whitelists_reviewer on whitelists (reviewer);
+create table if not exists assignments (reviewer integer primary key, area text not null, load_limit integer);
+create index if not exists assignments_area on assignments (area);
+'''
+
+class AssignmentStore:
+	def __init__(self, filename):
+		self.filename = filename
+		self.connection = sqlite3.connect(filename)
+		self.connection.text_factory = str
+		self.connection.executescript(SCHEMA)
+
+	def close(self):
+		self.connection.close()
+
+	# The key of the inputs that name (reviewers or whitelists) was loaded from, or None.
+	def getSourceKey(self, name):
+		row = self.connection.execute('select key from sources where name = ?', (name,)).fetchone()
+		if row is None:
+			return None
+		return row[0]
+
+	def saveReviewers(self, key, reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry):
+		with self.connection:
+			for table in ('reviewers', 'emails', 'choices', 'areas', 'whitelists', 'assignments'):
+				self.connection.execute('delete from %s' % table)
+			self.connection.execute("delete from sources where name in ('reviewers', 'whitelists')")
+			self.connection.executemany('insert into reviewers values (?, ?, ?, ?, ?, ?)', \
+				[(ii, record.reviewer_id, record.name, record.email, record.start_account_username, record.load_limit) \
+					for ii, record in enumerate(reviewer_registry.records)])
+			self.connection.executemany('insert into emails values (?, ?)', emails_to_reviewer_id_dict.iteritems())
+			# The position keeps the order of each reviewer's choices.
+			self.connection.executemany('insert into choices values (?, ?, ?, ?)', \
+				[(reviewer, area, rating, ii) for reviewer, area_choices in reviewer_to_area_choices.iteritems() \
+					for ii, (area, rating) in enumerate(area_choices)])
+			self.connection.execute('insert into sources values (?, ?)', ('reviewers', key))
+
+	# Returns what ACLAssignGreedyReviewers.loadReviewerInformation returns.
+	def loadReviewers(self):
+		reviewer_registry = ReviewerRegistry()
+		reviewer_to_load = {}
+		for reviewer, reviewer_id, name, email, start_account_username, load_limit in \
+				self.connection.execute('select * from reviewers order by reviewer'):
+			reviewer_registry.add(reviewer_id, name, email, start_account_username, load_limit)
+			if load_limit is not None:
+				reviewer_to_load[reviewer] = load_limit
+		reviewer_to_area_choices = dict((reviewer, []) for reviewer in range(len(reviewer_registry)))
+		for reviewer, area, rating in self.connection.execute('select reviewer, area, rating from choices order by reviewer, position'):
+			reviewer_to_area_choices[reviewer].append((area, rating))
+		for reviewer, area_choices in reviewer_to_area_choices.iteritems():
+			reviewer_registry[reviewer].area_choices = area_choices
+		emails_to_reviewer_id_dict = dict(self.connection.execute('select email, reviewer from emails'))
+		return reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_to_load
+
+	def saveWhitelists(self, key, area_to_whitelist, area_to_load, area_to_paper_load, forced_reviewer_to_area):
+		with self.connection:
+			self.connection.execute('delete from areas')
+			self.connection.execute('delete from whitelists')
+			self.connection.execute("delete from sources where name = 'whitelists'")
+			self.connection.executemany('insert into areas values (?, ?, ?)', \
+				[(area, area_to_load[area], area_to_paper_load[area]) for area in area_to_load])
+			for area, whitelist in area_to_whitelist.iteritems():
+				self.connection.executemany('insert into whitelists values (?, ?, 0)', [(area, reviewer) for reviewer in whitelist])
+			self.connection.executemany('insert into whitelists values (?, ?, 1)', \
+				[(area, reviewer) for reviewer, area in forced_reviewer_to_area.iteritems()])
+			self.connection.execute('insert into sources values (?, ?)', ('whitelists', key))
+
+	# Returns what ACLAssignGreedyReviewers.loadWhitelists returns, and fills forced_reviewer_to_area.
+	# reviewers and reviewer_index are those of the WhitelistBitsets (see createReviewerIndex).
+	def loadWhitelists(self, reviewers, reviewer_index, forced_reviewer_to_area):
+		area_to_whitelist = {}
+		area_to_load = {}
+		area_to_paper_load = {}
+		for area, area_load, paper_load in self.connection.execute('select * from areas'):
+			area_to_load[area] = area_load
+			area_to_paper_load[area] = paper_load
+			area_to_whitelist[area] = WhitelistBitset(reviewers, reviewer_index)
+		for area, reviewer, forced in self.connection.execute('select * from whitelists'):
+			if forced:
+				forced_reviewer_to_area[reviewer] = area
+			else:
+				area_to_whitelist[area].addIndex(reviewer_index[reviewer])
+		return area_to_whitelist, area_to_load, area_to_paper_load
+
+	# reviewer_load_constraint- the load limits written as "max papers to assign".
+	def saveAssignments(self, assignments, reviewer_load_constraint):
+		with self.connection:
+			self.connection.execute('delete from assignments')
+			self.connection.executemany('insert into assignments values (?, ?, ?)', \
+				[(reviewer, area, reviewer_load_constraint.get(reviewer)) for area, reviewers in assignments.iteritems() for reviewer in reviewers])
+
+	# A dict with what is known about the reviewer with this email, or None.
+	def describeReviewer(self, email):
+		row = self.connection.execute('select reviewer from emails where email = ?', (email.lower(),)).fetchone()
+		if row is None:
+			return None
+		reviewer = row[0]
+		name, reviewer_id, load_limit = self.connection.execute( \
+			'select name, reviewer_id, load_limit from reviewers where reviewer = ?', (reviewer,)).fetchone()
+		assigned = self.connection.execute('select area from assignments where reviewer = ?', (reviewer,)).fetchone()
+		return {'reviewer_id': reviewer_id, 'name': name, 'load_limit': load_limit, \
+				'choices': self.connection.execute('select area, rating from choices where reviewer = ? order by rating, area', (reviewer,)).fetchall(), \
+				'whitelisted': [area for area, in self.connection.execute('select area from whitelists where reviewer = ? order by area', (reviewer,))], \
+				'assigned': assigned and assigned[0]}
+
+if __name__ == '__main__':
+	if len(sys.argv) != 3:
+		print 'Usage: %s database email' % sys.argv[0]
+		sys.exit()
+	store = AssignmentStore(sys.argv[1])
+	description = store.describeReviewer(sys.argv[2])
+	store.close()
+	if description is None:
+		print 'Unknown reviewer: %s' % sys.argv[2]
+		sys.exit()
+	print '%s (%s)' % (description['name'], description['reviewer_id'])
+	print 'Load limit: %s' % description['load_limit']
+	print 'Choices: %s' % ', '.join(['%s (%d)' % choice for choice in description['choices']])
+	print 'Whitelisted in: %s' % ', '.join(description['whitelisted'])
+	print 'Assigned to: %s' % description['assigned']
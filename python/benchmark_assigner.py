@@ -0,0 +1,130 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+import os, sys, time, json, shutil, tempfile
+
+from acl_greedy_assign_reviewers import ACLAssignGreedyReviewers
+from generate_synthetic_data import addGeneratorOptions, createGenerator
+from event_log import EventLog, DiscardOutput, ERROR
+
+'''
+This script measures how each phase of the greedy reviewer assignment scales.
+
+For every requested size it generates a synthetic signup sheet, area stats file and
+whitelists (see generate_synthetic_data.py), then times loadAreaStats,
+loadReviewerInformation, loadWhitelists, createAreaReviewerLists,
+computeNumAreaAssignmentPerRound and assignReviewers. The output of the assigner is
+discarded while timing.
+
+The results are written as JSON, one record per size and phase, so that runs can be
+compared to catch performance regressions.
+'''
+
+class AssignerBenchmark:
+	def __init__(self, engine='greedy'):
+		self.engine = engine
+
+	# Time a call with the assigner's printing suppressed.
+	def timePhase(self, timings, phase, function, *args, **kwargs):
+		stdout = sys.stdout
+		sys.stdout = DiscardOutput()
+		try:
+			start = time.time()
+			result = function(*args, **kwargs)
+			timings[phase] = time.time() - start
+		finally:
+			sys.stdout = stdout
+		return result
+
+	def runPipeline(self, signup_filename, area_stats_filename, whitelist_files_prefix):
+		assigner = ACLAssignGreedyReviewers()
+		# Time a quiet run: only errors are formatted, and they go to stderr.
+		assigner.log = EventLog(ERROR, output=sys.stderr)
+		assigner.increase_priority_factor = 2
+		min_reviewers_per_area = 10
+		timings = {}
+
+		area_to_num_papers = self.timePhase(timings, 'loadAreaStats', assigner.loadAreaStats, area_stats_filename)
+		reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_load_constraint = \
+			self.timePhase(timings, 'loadReviewerInformation', assigner.loadReviewerInformation, signup_filename)
+		forced_reviewer_to_area = {}
+		whitelist_files = assigner.getWhitelistFilenames(whitelist_files_prefix)
+		area_to_whitelist, area_to_load, area_to_paper_load = \
+			self.timePhase(timings, 'loadWhitelists', assigner.loadWhitelists, whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area)
+		reviewers_per_area_lists = self.timePhase(timings, 'createAreaReviewerLists', assigner.createAreaReviewerLists, \
+			reviewer_to_area_choices, area_to_whitelist)
+
+		if self.engine == 'flow':
+			self.timePhase(timings, 'assignReviewersWithFlow', assigner.assignReviewersWithFlow, reviewers_per_area_lists, \
+				reviewer_to_area_choices, reviewer_load_constraint, area_to_load, area_to_num_papers, area_to_paper_load, \
+				None, forced_reviewer_to_area, min_reviewers_per_area)
+		elif self.engine == 'deficit':
+			self.timePhase(timings, 'assignReviewersByDeficit', assigner.assignReviewersByDeficit, reviewers_per_area_lists, \
+				reviewer_load_constraint, area_to_load, area_to_num_papers, area_to_paper_load, \
+				None, forced_reviewer_to_area, min_reviewers_per_area)
+		else:
+			area_to_num_assignments_per_round = self.timePhase(timings, 'computeNumAreaAssignmentPerRound', \
+				assigner.computeNumAreaAssignmentPerRound, area_to_load, area_to_num_papers, area_to_paper_load, None)
+			self.timePhase(timings, 'assignReviewers', assigner.assignReviewers, reviewers_per_area_lists, \
+				reviewer_load_constraint, area_to_load, area_to_num_papers, area_to_num_assignments_per_round, \
+				area_to_paper_load, None, forced_reviewer_to_area, min_reviewers_per_area)
+		assigner.log.flush()
+		return timings
+
+	# Returns a list of result records, one per size and phase.
+	def run(self, options, sizes, repeat=1):
+		results = []
+		for num_reviewers in sizes:
+			data_path = tempfile.mkdtemp(prefix='assigner_benchmark_')
+			try:
+				start = time.time()
+				signup_filename, area_stats_filename, whitelist_files_prefix = createGenerator(options, num_reviewers).generate(data_path)
+				generate_time = time.time() - start
+
+				# Keep the fastest time of each phase over the repeats.
+				best_timings = {}
+				for ii in range(repeat):
+					timings = self.runPipeline(signup_filename, area_stats_filename, whitelist_files_prefix)
+					for phase, seconds in timings.iteritems():
+						if phase not in best_timings or seconds < best_timings[phase]:
+							best_timings[phase] = seconds
+			finally:
+				shutil.rmtree(data_path)
+
+			for phase, seconds in sorted(best_timings.items(), key=lambda item: item[1], reverse=True):
+				results.append({'reviewers': num_reviewers, 'areas': options.num_areas, 'engine': self.engine, \
+								'phase': phase, 'seconds': round(seconds, 6)})
+			sys.stderr.write('%d reviewers: generated in %.2fs, pipeline %.2fs\n' % (num_reviewers, generate_time, sum(best_timings.values())))
+		return results
+
+if __name__ == '__main__':
+	usage = "Usage: %prog [options] [output_json]"
+	from optparse import OptionParser
+
+	parser = OptionParser(usage = usage)
+	addGeneratorOptions(parser)
+	parser.add_option("-n", "--sizes", dest="sizes", default="1000,5000,20000,50000,200000",
+			help="Comma separated reviewer counts (default: 1000,5000,20000,50000,200000)")
+	parser.add_option("-r", "--repeat", dest="repeat", type="int", default=1,
+			help="Run each size this many times and keep the fastest time per phase (default: 1)")
+	parser.add_option("-e", "--engine", dest="engine", type="choice", choices=["greedy", "deficit", "flow"], default="greedy",
+			help="The assignment algorithm to benchmark (default: greedy)")
+	(options, args) = parser.parse_args()
+
+	if len(args) > 1:
+		parser.print_help()
+		sys.exit()
+
+	sizes = [int(size) for size in options.sizes.split(',')]
+	results = AssignerBenchmark(options.engine).run(options, sizes, options.repeat)
+
+	if len(args) == 1:
+		output = open(args[0], 'w')
+	else:
+		output = sys.stdout
+	json.dump(results, output, indent=1, sort_keys=True)
+	output.write('\n')
+	if output is not sys.stdout:
+		output.close()
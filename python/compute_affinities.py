@@ -0,0 +1,262 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+import os, sys, re, math, cPickle
+
+from event_log import EventLog, INFO
+
+'''
+This script scores how well each paper fits each reviewer of its area by the TF-IDF cosine
+similarity of the paper's abstract and the reviewer's profile text. The scores are written in
+the format of the --affinities option of acl_greedy_assign_reviewers.py, so a paper assignment
+can use topical fit within an area and not only the area choices of the signup sheet.
+
+The inputs are:
+    1. The output prefix of acl_greedy_assign_reviewers.py. The reviewers of each area are read
+       from its _all_list.csv.
+    2. A papers file with a line per paper: paper id \t area (the same as --papers).
+    3. A directory of reviewer profiles, one text file per reviewer named by their email
+       (e.g. mdredze@cs.jhu.edu.txt).
+    4. A directory of abstracts, one text file per paper named by its id (e.g. 123.txt).
+    5. The output affinities file: paper id \t reviewer email \t score.
+
+Each text is stored as a sparse vector of term counts. Term weights are (1 + log tf) * idf,
+with the idf computed over the profiles and abstracts together, and vectors are normalized
+so a dot product is a cosine similarity. The reviewer vectors of an area are turned into an
+inverted index (term -> reviewers and weights), so the scores of a batch of papers against
+every reviewer of the area are a sparse matrix product that only touches shared terms.
+Only the top --top reviewers of each paper are written.
+
+With --cache, the term counts of every file are kept in a cache directory and only files
+whose size or modification time changed are read again.
+'''
+
+# Bump this whenever tokenize changes, to invalidate old caches.
+TERM_CACHE_VERSION = 1
+
+STOP_WORDS = set('''a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has have having he
+her here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not now
+of off on once only or other our ours ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours yourself yourselves paper papers propose proposed
+present presents show shows using use used based approach approaches method methods new results work'''.split())
+
+TOKEN_PATTERN = re.compile('[a-z][a-z0-9\-]+')
+
+# Returns a dict between term and count.
+def tokenize(text):
+	term_counts = {}
+	for term in TOKEN_PATTERN.findall(text.lower()):
+		if term not in STOP_WORDS:
+			term_counts[term] = term_counts.get(term, 0) + 1
+	return term_counts
+
+# Term counts of the text files in a directory, reusing a cache of earlier runs.
+class TermCountCache:
+	def __init__(self, cache_path, name, log):
+		self.cache_filename = None
+		if cache_path:
+			self.cache_filename = os.path.join(cache_path, name + '.terms.cache')
+		self.log = log
+		# filename -> ((size, mtime), term_counts)
+		self.entries = {}
+		self.changed = False
+		if self.cache_filename and os.path.exists(self.cache_filename):
+			try:
+				file = open(self.cache_filename, 'rb')
+				try:
+					if cPickle.load(file) == TERM_CACHE_VERSION:
+						self.entries = cPickle.load(file)
+				finally:
+					file.close()
+			except (cPickle.UnpicklingError, EOFError, ValueError, ImportError, AttributeError), e:
+				self.log.warning('cache', 'Warning: ignoring unreadable cache %s (%s)', self.cache_filename, e)
+
+	def getTermCounts(self, filename):
+		stat = os.stat(filename)
+		key = (stat.st_size, stat.st_mtime)
+		entry = self.entries.get(filename)
+		if entry is not None and entry[0] == key:
+			return entry[1]
+		file = open(filename)
+		term_counts = tokenize(file.read())
+		file.close()
+		self.entries[filename] = (key, term_counts)
+		self.changed = True
+		return term_counts
+
+	def save(self):
+		if not self.cache_filename or not self.changed:
+			return
+		cache_path = os.path.dirname(self.cache_filename)
+		if cache_path and not os.path.exists(cache_path):
+			os.makedirs(cache_path)
+		# Write to a temporary file first so an interrupted run never leaves a partial cache.
+		temp_filename = self.cache_filename + '.tmp'
+		file = open(temp_filename, 'wb')
+		cPickle.dump(TERM_CACHE_VERSION, file, cPickle.HIGHEST_PROTOCOL)
+		cPickle.dump(self.entries, file, cPickle.HIGHEST_PROTOCOL)
+		file.close()
+		os.rename(temp_filename, self.cache_filename)
+		self.changed = False
+
+# Returns a dict between term and idf over a list of term count dicts.
+def computeIdf(documents):
+	document_frequency = {}
+	for term_counts in documents:
+		for term in term_counts:
+			document_frequency[term] = document_frequency.get(term, 0) + 1
+	num_documents = float(len(documents))
+	return dict((term, math.log(num_documents / count)) for term, count in document_frequency.iteritems())
+
+# A normalized TF-IDF vector, as a dict between term and weight.
+def getTfidfVector(term_counts, idf):
+	vector = {}
+	for term, count in term_counts.iteritems():
+		weight = (1 + math.log(count)) * idf.get(term, 0.0)
+		if weight > 0:
+			vector[term] = weight
+	norm = math.sqrt(sum([weight * weight for weight in vector.itervalues()]))
+	if norm > 0:
+		for term in vector:
+			vector[term] /= norm
+	return vector
+
+# Scores of papers against reviewers with an inverted index over the reviewer vectors.
+class AffinityScorer:
+	def __init__(self, reviewer_vectors):
+		self.index = {}
+		for row, vector in enumerate(reviewer_vectors):
+			for term, weight in vector.iteritems():
+				self.index.setdefault(term, []).append((row, weight))
+
+	# Returns, for each paper vector, its top (score, row) pairs, best first.
+	def scoreBatch(self, paper_vectors, top):
+		index = self.index
+		results = []
+		for vector in paper_vectors:
+			scores = {}
+			for term, weight in vector.iteritems():
+				for row, reviewer_weight in index.get(term, ()):
+					scores[row] = scores.get(row, 0.0) + weight * reviewer_weight
+			best = sorted([(-score, row) for row, score in scores.iteritems()])[:top]
+			results.append([(-score, row) for score, row in best])
+		return results
+
+class ACLComputeAffinities:
+	def __init__(self):
+		self.log = EventLog(INFO)
+
+	# Returns a dict between area and the emails of its reviewers.
+	def loadAreaReviewers(self, all_list_filename):
+		area_to_emails = {}
+		file = open(all_list_filename)
+		for line in file:
+			if line.startswith('#') or line.strip() == '':
+				continue
+			split_line = line.rstrip('\n').split('\t')
+			email, area = split_line[1].lower(), split_line[4]
+			area_to_emails.setdefault(area, []).append(email)
+		file.close()
+		return area_to_emails
+
+	# Returns a dict between area and its paper ids.
+	def loadPapers(self, papers_filename):
+		area_to_papers = {}
+		file = open(papers_filename)
+		for line in file:
+			line = line.strip()
+			if line.startswith('#') or line == '':
+				continue
+			paper_id, area = line.split('\t')
+			area_to_papers.setdefault(area.strip().lower(), []).append(paper_id.strip())
+		file.close()
+		return area_to_papers
+
+	# Term counts of the named files in a directory. Returns a dict between name and term counts.
+	def loadTermCounts(self, path, names, cache, kind):
+		name_to_term_counts = {}
+		num_missing = 0
+		for name in names:
+			filename = os.path.join(path, name + '.txt')
+			if not os.path.exists(filename):
+				num_missing += 1
+				self.log.detail(kind, 'No %s file: %s', kind, filename)
+				continue
+			name_to_term_counts[name] = cache.getTermCounts(filename)
+		if num_missing:
+			self.log.warning(kind, 'Warning: %d of %d %s files are missing.', num_missing, len(names), kind)
+		cache.save()
+		return name_to_term_counts
+
+	def run(self):
+		usage = "Usage: %prog [options] assignment_output_prefix papers_filename profiles_path abstracts_path affinities_filename"
+		from optparse import OptionParser
+
+		parser = OptionParser(usage = usage)
+		parser.add_option(
+				"-k",
+				"--top",
+				dest="top",
+				type="int",
+				default=50,
+				help="Write the scores of this many best reviewers per paper (default: 50)")
+		parser.add_option(
+				"-b",
+				"--batch_size",
+				dest="batch_size",
+				type="int",
+				default=256,
+				help="The number of papers scored at a time (default: 256)")
+		parser.add_option(
+				"-c",
+				"--cache",
+				dest="cache_path",
+				default=None,
+				help="A directory in which to cache the term counts of the profiles and abstracts between runs")
+
+		(options, args) = parser.parse_args()
+
+		if len(args) != 5:
+			parser.print_help()
+			sys.exit()
+		output_filename_prefix, papers_filename, profiles_path, abstracts_path, affinities_filename = args
+
+		area_to_emails = self.loadAreaReviewers(output_filename_prefix + '_all_list.csv')
+		area_to_papers = self.loadPapers(papers_filename)
+
+		emails = sorted(set([email for emails in area_to_emails.itervalues() for email in emails]))
+		paper_ids = sorted(set([paper_id for paper_ids in area_to_papers.itervalues() for paper_id in paper_ids]))
+		email_to_term_counts = self.loadTermCounts(profiles_path, emails, TermCountCache(options.cache_path, 'profiles', self.log), 'profile')
+		paper_to_term_counts = self.loadTermCounts(abstracts_path, paper_ids, TermCountCache(options.cache_path, 'abstracts', self.log), 'abstract')
+		self.log.info('affinities', 'Loaded %d reviewer profiles and %d abstracts.', len(email_to_term_counts), len(paper_to_term_counts))
+
+		idf = computeIdf(email_to_term_counts.values() + paper_to_term_counts.values())
+
+		output = open(affinities_filename, 'w')
+		output.write('#paper\temail\tscore\n')
+		num_scores = 0
+		for area in sorted(area_to_papers):
+			emails = [email for email in area_to_emails.get(area, []) if email in email_to_term_counts]
+			if not emails:
+				self.log.warning('affinities', 'Warning: no reviewer profiles for area %s.', area, area=area)
+				continue
+			scorer = AffinityScorer([getTfidfVector(email_to_term_counts[email], idf) for email in emails])
+			paper_ids = [paper_id for paper_id in area_to_papers[area] if paper_id in paper_to_term_counts]
+			for start in range(0, len(paper_ids), options.batch_size):
+				batch = paper_ids[start:start + options.batch_size]
+				results = scorer.scoreBatch([getTfidfVector(paper_to_term_counts[paper_id], idf) for paper_id in batch], options.top)
+				for paper_id, top_reviewers in zip(batch, results):
+					for score, row in top_reviewers:
+						output.write('%s\t%s\t%.4f\n' % (paper_id, emails[row], score))
+						num_scores += 1
+			self.log.info('affinities', '%s: %d papers, %d reviewers', area, len(paper_ids), len(emails))
+		output.close()
+		self.log.info('affinities', 'Wrote %d scores to %s', num_scores, affinities_filename)
+		self.log.close()
+
+if __name__ == '__main__':
+	ACLComputeAffinities().run()
@@ -3,7 +3,8 @@ Copyright 2013 Mark Dredze. All rights reserved.
 This software is released under the 2-clause BSD license.
 Mark Dredze, mdredze@cs.jhu.edu
 '''
-import os, sys, csv, re
+import os, sys, re, threading, Queue
+from csv_loader import CsvLoader
 
 '''
 Author: Mark Dredze (mdredze@cs.jhu.edu)
@@ -17,6 +18,10 @@ The two arguments are:
         (File -> Download As -> CSV)
     2. output path
         A directory in which to create the output files.
+
+The signup sheet is read once and each reviewer is placed in every area they
+marked as a first or second choice. The area files are then written by a small
+pool of threads.
 '''
 
 class ACLAreaReviwerCSVCreater:
@@ -37,40 +42,10 @@ class ACLAreaReviwerCSVCreater:
         pass
 
 
-    def mapColumns(self, entry):
-        names_to_columns = {}
-        columns_to_names = {}
-        for ii, name in enumerate(entry):
-            names_to_columns[name.lower()] = ii
-            columns_to_names[ii] = name.lower()
-
-        return names_to_columns, columns_to_names
-
-    def getColumn(self, entry, names_to_columns, column):
-        column_id = names_to_columns[column]
-        if column_id >= len(entry):
-            return ''
-        return entry[column_id]
-
-
+    # Returns a streaming loader over the file and its lowercased column names.
     def loadCSVFile(self, filename):
-        file = open(filename)
-        reader = csv.reader(file)
-
-        contents = []
-
-        for ii, entry in enumerate(reader):
-            if ii == 0:
-                names_to_columns, columns_to_names = self.mapColumns(entry)
-                continue
-            line = {}
-            print len(entry), entry 
-            for jj in range(len(entry)):
-                line[columns_to_names[jj]] = entry[jj]
-            contents.append(line)
-
-        file.close()
-        return contents, names_to_columns.keys()    
+        csv_loader = CsvLoader(filename)
+        return csv_loader, csv_loader.getColumnNames()
 
     def run(self):
 
@@ -92,6 +67,13 @@ class ACLAreaReviwerCSVCreater:
                 type="int",
                 default=3,
                 help="The number of reviewers needed for each paper (default: 3)")
+        parser.add_option(
+                "-t",
+                "--threads",
+                dest="num_threads",
+                type="int",
+                default=8,
+                help="The number of threads writing area files (default: 8)")
 
         (options, args) = parser.parse_args()
 
@@ -106,7 +88,7 @@ class ACLAreaReviwerCSVCreater:
         willing_string = 'Willing to review (2nd Choices)'
         will_not_string = 'Will not review'
 
-        acl_reviewer_stats_contents, column_names = self.loadCSVFile(acl_reviewer_stats_filename)
+        csv_loader, column_names = self.loadCSVFile(acl_reviewer_stats_filename)
 
         area_names = self.getAreaNames(column_names)
 
@@ -116,36 +98,77 @@ class ACLAreaReviwerCSVCreater:
             self.name_field = ('surname or family name', 'first name')
         if 'email address' in column_names:
             self.email_field = 'email address'
-        if 'start account username' in column_names:
-            self.account_field = 'start account username'
+
+        area_to_reviewers = self.bucketReviewersByArea(csv_loader, area_names, (want_string, willing_string))
 
         for column_name, area_name in area_names:
-            possible_reviewers = []
-            for entry in acl_reviewer_stats_contents:
-                if type(self.name_field) == tuple:
-                    name = '%s %s' % (entry[self.name_field[0]], entry[self.name_field[1]])
-                else:
-                    name = entry[self.name_field]
-                email = entry[self.email_field]
-                account = entry[self.account_field]
+            print '%s: %d' % (area_name, len(area_to_reviewers[area_name]))
 
+        self.writeAreaFiles(output_path, area_names, area_to_reviewers, options.reviewer_load, options.paper_load, options.num_threads)
+
+    # Read the signup sheet once and put each reviewer in every area where their choice is
+    # one of accepted_choices. Returns a dict between area name and a list of (name, email).
+    def bucketReviewersByArea(self, csv_loader, area_names, accepted_choices):
+        accepted_choices = set(accepted_choices)
+        area_columns = [(csv_loader.names_to_columns[column_name], area_name) for column_name, area_name in area_names]
+        area_to_reviewers = dict((area_name, []) for column_name, area_name in area_names)
+
+        for entry in csv_loader:
+            values = entry.values
+            name = None
+            for column_id, area_name in area_columns:
                 # What did this person choose for this area.
-                area_choice = entry.setdefault(column_name, '')
-
-                # if area_choice == want_string:
-                if area_choice == want_string or area_choice == willing_string:
-                    possible_reviewers.append((name, email, account))
-
-            print '%s: %d' % (area_name, len(possible_reviewers))
-            output_filename = os.path.join(output_path, area_name.replace(' ', '_').replace('/', '_').replace('&', '_').lower() + '.tsv')
-            output = open(output_filename, 'w')
-
-            output.write('#Area:\t%s\n' % (area_name))
-            output.write('#Area Load:\t%d\n' % (options.reviewer_load))
-            output.write('#Paper Load:\t%d\n' % (options.paper_load))
-            for name, email, account in possible_reviewers:
-                output.write('%s\t%s\n' % (name, email))
-            output.close()
+                if column_id >= len(values) or values[column_id] not in accepted_choices:
+                    continue
+                if name is None:
+                    if type(self.name_field) == tuple:
+                        name = '%s %s' % (entry[self.name_field[0]], entry[self.name_field[1]])
+                    else:
+                        name = entry[self.name_field]
+                    email = entry[self.email_field]
+                area_to_reviewers[area_name].append((name, email))
+
+        return area_to_reviewers
+
+    def getAreaFilename(self, output_path, area_name):
+        return os.path.join(output_path, area_name.replace(' ', '_').replace('/', '_').replace('&', '_').lower() + '.tsv')
+
+    def writeAreaFile(self, output_path, area_name, reviewers, reviewer_load, paper_load):
+        lines = ['#Area:\t%s\n' % (area_name),
+                 '#Area Load:\t%d\n' % (reviewer_load),
+                 '#Paper Load:\t%d\n' % (paper_load)]
+        for name, email in reviewers:
+            lines.append('%s\t%s\n' % (name, email))
+
+        output = open(self.getAreaFilename(output_path, area_name), 'w')
+        output.write(''.join(lines))
+        output.close()
+
+    # Write the area files with a bounded pool of threads. Errors are raised in the calling thread.
+    def writeAreaFiles(self, output_path, area_names, area_to_reviewers, reviewer_load, paper_load, num_threads):
+        jobs = Queue.Queue()
+        for column_name, area_name in area_names:
+            jobs.put(area_name)
+        errors = []
+
+        def worker():
+            while True:
+                try:
+                    area_name = jobs.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    self.writeAreaFile(output_path, area_name, area_to_reviewers[area_name], reviewer_load, paper_load)
+                except Exception, e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=worker) for ii in range(max(1, num_threads))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,72 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# A streaming CSV loader shared by the reviewer scripts.
+# The header is read once to map lowercased column names to positions. Iterating over the
+# loader re-reads the file and yields one CsvRow per line, so a large signup sheet never
+# has to be held in memory and no dict is built per row.
+import csv
+
+class CsvRow(object):
+	__slots__ = ('values', 'names_to_columns')
+
+	def __init__(self, values, names_to_columns):
+		self.values = values
+		self.names_to_columns = names_to_columns
+
+	# Look up a column by its lowercased name. Short rows return '' for trailing columns.
+	def __getitem__(self, column):
+		column_id = self.names_to_columns[column]
+		if column_id >= len(self.values):
+			return ''
+		return self.values[column_id]
+
+	def get(self, column, default=''):
+		if column not in self:
+			return default
+		return self[column]
+
+	# True if the column exists and this row has a value for it.
+	def __contains__(self, column):
+		column_id = self.names_to_columns.get(column)
+		return column_id is not None and column_id < len(self.values)
+
+	def __len__(self):
+		return len(self.values)
+
+class CsvLoader:
+	def __init__(self, filename):
+		self.filename = filename
+		file = open(filename)
+		reader = csv.reader(file)
+		try:
+			header = reader.next()
+		except StopIteration:
+			header = []
+		file.close()
+		self.header = header
+		self.__mapColumns(header)
+
+	def __mapColumns(self, entry):
+		self.names_to_columns = {}
+		self.columns_to_names = {}
+		for ii, name in enumerate(entry):
+			self.names_to_columns[name.lower()] = ii
+			self.columns_to_names[ii] = name.lower()
+
+	def getColumnNames(self):
+		return self.names_to_columns.keys()
+
+	def __iter__(self):
+		names_to_columns = self.names_to_columns
+		file = open(self.filename)
+		try:
+			reader = csv.reader(file)
+			for ii, entry in enumerate(reader):
+				if ii == 0:
+					continue
+				yield CsvRow(entry, names_to_columns)
+		finally:
+			file.close()
@@ -0,0 +1,94 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Buffered, level controlled output of warnings, errors and statistics.
+#
+# Every event has a level, a kind (a short name such as "load limit") and a message. Events
+# above the verbosity level are dropped before their message is formatted, so per-reviewer
+# events cost a comparison on quiet runs. Text lines are buffered and written in blocks.
+# Optionally every event is also written as one JSON object per line to a JSONL file.
+import sys, time, json
+
+ERROR = 0
+WARNING = 1
+INFO = 2
+# Per-reviewer and per-file details.
+DETAIL = 3
+
+LEVEL_NAMES = ['error', 'warning', 'info', 'detail']
+
+def getLevel(name):
+	return LEVEL_NAMES.index(name.lower())
+
+# A file that drops everything written to it, to silence sys.stdout around a call.
+class DiscardOutput:
+	def write(self, text):
+		pass
+
+	def flush(self):
+		pass
+
+class EventLog:
+	# level- the most detailed level written as text.
+	# output- a file for the text, or None for the current sys.stdout (looked up on every flush).
+	# jsonl_filename- if given, every event is also written to this file, whatever the level.
+	# buffer_lines- the number of text lines kept before they are written.
+	def __init__(self, level=DETAIL, output=None, jsonl_filename=None, buffer_lines=1000):
+		self.level = level
+		self.output = output
+		self.buffer_lines = buffer_lines
+		self.lines = []
+		self.jsonl_output = None
+		if jsonl_filename:
+			self.jsonl_output = open(jsonl_filename, 'w')
+		self.max_level = level
+		if self.jsonl_output is not None:
+			self.max_level = DETAIL
+
+	def isEnabledFor(self, level):
+		return level <= self.max_level
+
+	def event(self, level, kind, message, *args, **fields):
+		if level > self.max_level:
+			return
+		if args:
+			message = message % args
+		if level <= self.level:
+			self.lines.append(message)
+			self.lines.append('\n')
+			if len(self.lines) >= 2 * self.buffer_lines:
+				self.flush()
+		if self.jsonl_output is not None:
+			record = {'time': round(time.time(), 3), 'level': LEVEL_NAMES[level], 'kind': kind, 'message': message}
+			record.update(fields)
+			self.jsonl_output.write(json.dumps(record, sort_keys=True))
+			self.jsonl_output.write('\n')
+
+	def error(self, kind, message, *args, **fields):
+		self.event(ERROR, kind, message, *args, **fields)
+
+	def warning(self, kind, message, *args, **fields):
+		self.event(WARNING, kind, message, *args, **fields)
+
+	def info(self, kind, message, *args, **fields):
+		self.event(INFO, kind, message, *args, **fields)
+
+	def detail(self, kind, message, *args, **fields):
+		self.event(DETAIL, kind, message, *args, **fields)
+
+	def flush(self):
+		if self.lines:
+			output = self.output or sys.stdout
+			output.write(''.join(self.lines))
+			self.lines = []
+		if self.jsonl_output is not None:
+			self.jsonl_output.flush()
+
+	def close(self):
+		self.flush()
+		if self.jsonl_output is not None:
+			self.jsonl_output.close()
+			self.jsonl_output = None
+			self.max_level = self.level
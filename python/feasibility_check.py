@@ -0,0 +1,185 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Check before the assignment whether the whitelists can cover every area, and bound how good
+# any assignment can be.
+#
+# Coverage is bounded with a max-flow over source -> reviewer -> area -> sink. A reviewer can give
+# an area their load there (the area load, or their load limit if lower), an area takes the
+# reviews it still needs and a reviewer supplies at most their largest load. A reviewer may split
+# their load over areas in the flow, so it is an upper bound on the reviews any assignment covers.
+# A second max-flow with one unit per reviewer and min_reviewers_per_area units per area gives the
+# most reviewers toward min_reviewers_per_area, exactly. Only the totals of the flows are bounds:
+# how a flow splits over the areas is one of many maximum flows, so per area only the capacity of
+# the whitelist is reported.
+#
+# Reviewers who may go to the same areas with the same loads are one node with their count as a
+# multiplier, so the networks have a few thousand nodes even for very large reviewer pools.
+# Every reviewer is assigned to some area, so the average choice rating is at least the average
+# of every reviewer's best whitelisted rating.
+import collections
+
+class MaxFlow:
+	def __init__(self, num_nodes):
+		self.num_nodes = num_nodes
+		self.edges_from = [[] for ii in range(num_nodes)]
+		# Edge ii goes to edge_to[ii] with edge_capacity[ii] left. Edge ii ^ 1 is its reverse.
+		self.edge_to = []
+		self.edge_capacity = []
+
+	# Returns the index of the edge, to read its flow with getFlow.
+	def addEdge(self, a, b, capacity):
+		ii = len(self.edge_to)
+		self.edges_from[a].append(ii)
+		self.edge_to.append(b)
+		self.edge_capacity.append(capacity)
+		self.edges_from[b].append(ii + 1)
+		self.edge_to.append(a)
+		self.edge_capacity.append(0)
+		return ii
+
+	def getFlow(self, ii):
+		return self.edge_capacity[ii + 1]
+
+	# Dinic's algorithm. Returns the value of the maximum flow from source to sink.
+	def solve(self, source, sink):
+		edge_to = self.edge_to
+		edge_capacity = self.edge_capacity
+		edges_from = self.edges_from
+		total = 0
+		while True:
+			level = [-1] * self.num_nodes
+			level[source] = 0
+			queue = collections.deque([source])
+			while queue:
+				a = queue.popleft()
+				for ii in edges_from[a]:
+					if edge_capacity[ii] > 0 and level[edge_to[ii]] < 0:
+						level[edge_to[ii]] = level[a] + 1
+						queue.append(edge_to[ii])
+			if level[sink] < 0:
+				return total
+			next_edge = [0] * self.num_nodes
+
+			def push(a, amount):
+				if a == sink:
+					return amount
+				edges = edges_from[a]
+				while next_edge[a] < len(edges):
+					ii = edges[next_edge[a]]
+					b = edge_to[ii]
+					if edge_capacity[ii] > 0 and level[b] == level[a] + 1:
+						pushed = push(b, min(amount, edge_capacity[ii]))
+						if pushed > 0:
+							edge_capacity[ii] -= pushed
+							edge_capacity[ii ^ 1] += pushed
+							return pushed
+					next_edge[a] += 1
+				return 0
+
+			while True:
+				pushed = push(source, float('inf'))
+				if pushed == 0:
+					break
+				total += pushed
+
+class FeasibilityCheck:
+	def __init__(self, areas, area_to_num_papers, area_to_paper_load, area_to_load, min_reviewers_per_area):
+		self.areas = sorted(areas)
+		self.area_to_num_papers = area_to_num_papers
+		self.area_to_paper_load = area_to_paper_load
+		self.area_to_load = area_to_load
+		self.min_reviewers_per_area = min_reviewers_per_area
+
+	def getReviewsNeeded(self, area):
+		return self.area_to_num_papers[area] * self.area_to_paper_load[area]
+
+	# reviewer_to_candidate_areas- for each reviewer, a dict from the areas they may be assigned to
+	# (chosen and whitelisted) to their rating.
+	# preassigned- a dict from area to the set of reviewers already there (e.g. forced reviewers).
+	# reviewer_load- a function giving the number of reviews a reviewer contributes to an area.
+	# Returns a dict with the bounds, see the keys below.
+	def check(self, reviewer_to_candidate_areas, preassigned, reviewer_load):
+		areas = self.areas
+		area_index = dict((area, ii) for ii, area in enumerate(areas))
+		preassigned_reviewers = set()
+		area_to_preassigned_reviews = dict((area, 0) for area in areas)
+		area_to_preassigned_count = dict((area, 0) for area in areas)
+		total_rating = 0
+		num_rated = 0
+		num_first_choices = 0
+		for area, reviewers in preassigned.iteritems():
+			if area not in area_index:
+				continue
+			for reviewer in reviewers:
+				preassigned_reviewers.add(reviewer)
+				area_to_preassigned_reviews[area] += reviewer_load(reviewer, area)
+				area_to_preassigned_count[area] += 1
+				rating = reviewer_to_candidate_areas.get(reviewer, {}).get(area)
+				if rating:
+					total_rating += rating
+					num_rated += 1
+					num_first_choices += rating == 1
+
+		# Group the free reviewers by their (area, load) options.
+		group_counts = collections.defaultdict(int)
+		for reviewer, area_to_rating in reviewer_to_candidate_areas.iteritems():
+			if reviewer in preassigned_reviewers:
+				continue
+			options = tuple(sorted([(area_index[area], reviewer_load(reviewer, area)) for area in area_to_rating if area in area_index]))
+			if not options:
+				continue
+			group_counts[options] += 1
+			best_rating = min([rating for area, rating in area_to_rating.iteritems() if area in area_index])
+			total_rating += best_rating
+			num_rated += 1
+			num_first_choices += best_rating == 1
+		groups = sorted(group_counts.iteritems())
+
+		area_to_capacity = dict(area_to_preassigned_reviews)
+		area_to_max_reviewers = dict(area_to_preassigned_count)
+		for options, count in groups:
+			for a, load in options:
+				area_to_capacity[areas[a]] += count * load
+				area_to_max_reviewers[areas[a]] += count
+
+		max_flow_covered = self.solveFlow(groups, lambda area: max(0, self.getReviewsNeeded(area) - area_to_preassigned_reviews[area]), \
+											lambda options, count: count * max([load for a, load in options]), \
+											lambda load, count: count * load)
+		max_flow_min_reviewers = self.solveFlow(groups, lambda area: max(0, self.min_reviewers_per_area - area_to_preassigned_count[area]), \
+											lambda options, count: count, \
+											lambda load, count: count)
+
+		bounds = {'areas': {}, 'reviews_needed': 0, 'max_reviews_covered': max_flow_covered, \
+				'min_reviewers_needed': 0, 'max_min_reviewers_covered': max_flow_min_reviewers, \
+				'min_average_rating': float(total_rating) / max(1, num_rated), 'max_first_choices': num_first_choices}
+		for area in areas:
+			reviews_needed = self.getReviewsNeeded(area)
+			min_reviewers_needed = self.min_reviewers_per_area
+			bounds['areas'][area] = {'reviews_needed': reviews_needed, 'capacity': area_to_capacity[area], \
+									'max_reviewers': area_to_max_reviewers[area]}
+			bounds['reviews_needed'] += reviews_needed
+			bounds['max_reviews_covered'] += min(reviews_needed, area_to_preassigned_reviews[area])
+			bounds['min_reviewers_needed'] += min_reviewers_needed
+			bounds['max_min_reviewers_covered'] += min(min_reviewers_needed, area_to_preassigned_count[area])
+		return bounds
+
+	# Max-flow from the reviewer groups to the areas. area_demand gives the capacity of an area,
+	# group_supply of a group and edge_capacity of a group's edge to one of its areas.
+	# Returns the value of the maximum flow.
+	def solveFlow(self, groups, area_demand, group_supply, edge_capacity):
+		areas = self.areas
+		source = 0
+		sink = 1
+		first_area = 2
+		first_group = first_area + len(areas)
+		flow = MaxFlow(first_group + len(groups))
+		for a, area in enumerate(areas):
+			flow.addEdge(first_area + a, sink, area_demand(area))
+		for g, (options, count) in enumerate(groups):
+			flow.addEdge(source, first_group + g, group_supply(options, count))
+			for a, load in options:
+				flow.addEdge(first_group + g, first_area + a, edge_capacity(load, count))
+		return flow.solve(source, sink)
@@ -7,6 +7,7 @@ Jiang Guo, jguo@ir.hit.edu.cn
 import re, csv, sys
 import datetime, time
 import operator
+from csv_loader import CsvLoader
 
 ''' 
 Author: Jiang Guo (jguo@ir.hit.edu.cn)
@@ -24,8 +25,10 @@ The three arguments are:
         the reviewers who accepted in START, but not signed up in the Google form.
         It follows the format of csv_Google
 
-Note: you need to concatenate the csv_output and csv_Google
+Note: by default you need to concatenate the csv_output and csv_Google
 after running this script, in order to obtain a complete reviewers list.
+With the --merge option the csv_output is written as the complete list:
+the header and rows of csv_Google followed by the additional START reviewers.
 '''
 
 class ReviewerCSVCreater:
@@ -33,38 +36,11 @@ class ReviewerCSVCreater:
     def __init__(self):
         pass
 
-    def mapColumns(self, entry):
-        names_to_columns = {}
-        columns_to_names = {}
-        for ii, name in enumerate(entry):
-            names_to_columns[name.lower()] = ii
-            columns_to_names[ii] = name.lower()
-
-        return names_to_columns, columns_to_names
-
-    def getColumn(self, entry, names_to_columns, column):
-        column_id = names_to_columns[column]
-        if column_id >= len(entry):
-            return ''
-        return entry[column_id]
-
+    # Returns a streaming loader over the file and a dict between
+    # lowercased column names and their positions.
     def loadCSVFile(self, filename):
-        file = open(filename)
-        reader = csv.reader(file)
-
-        contents = []
-
-        for ii, entry in enumerate(reader):
-            if ii == 0:
-                names_to_columns, columns_to_names = self.mapColumns(entry)
-                continue
-            line = {}
-            for jj in range(len(entry)):
-                line[columns_to_names[jj]] = entry[jj]
-            contents.append(line)
-
-        file.close()
-        return contents, names_to_columns
+        csv_loader = CsvLoader(filename)
+        return csv_loader, csv_loader.names_to_columns
 
 def getAreaNames(column_names):
     ordered_column_names = sorted(column_names.iteritems(),
@@ -79,15 +55,19 @@ def getAreaNames(column_names):
     return areas
 
 def getAccounts(contents, field="username"):
-    accounts = []
+    accounts = set()
     for entry in contents:
-        accounts.append(entry[field].lower())
+        account = entry[field].lower()
+        if account:
+            accounts.add(account)
     return accounts
 
 def getEmails(contents, field="email"):
-    emails = []
+    emails = set()
     for entry in contents:
-        emails.append(entry[field].lower())
+        email = entry[field].lower()
+        if email:
+            emails.add(email)
     return emails
 
 def parseAreaStr(area_str):
@@ -113,7 +93,7 @@ def makeRecord(s_account, s_email, s_name,
 
     if "" in s_areas:
         print s_account
-    area_ids = [area_to_ids[area] for area in s_areas]
+    area_ids = set([area_to_ids[area] for area in s_areas])
     for ii in range(len(area_to_ids)):
         if ii in area_ids:
             record.append(want_string)
@@ -127,18 +107,32 @@ if __name__ == '__main__':
         but not signed up in the google spreadsheet
     '''
 
-    usage = "Usage: %s csv_START csv_Google csv_output" % (sys.argv[0])
-    if len(sys.argv) != 4:
-        print >> sys.stderr, usage
+    usage = "Usage: %prog [options] csv_START csv_Google csv_output"
+    from optparse import OptionParser
+
+    parser = OptionParser(usage = usage)
+    parser.add_option(
+            "-m",
+            "--merge",
+            dest="merge",
+            action="store_true",
+            default=False,
+            help="Write csv_Google followed by the additional reviewers, i.e. the complete reviewers list")
+
+    (options, args) = parser.parse_args()
+
+    if len(args) != 3:
+        print >> sys.stderr, parser.get_usage()
         sys.exit()
 
-    start_csv = sys.argv[1]
-    google_csv  = sys.argv[2]
-    output_csv = sys.argv[3]
+    start_csv = args[0]
+    google_csv  = args[1]
+    output_csv = args[2]
 
     g_info, g_column_names = ReviewerCSVCreater().loadCSVFile(google_csv)
     s_info, s_column_names = ReviewerCSVCreater().loadCSVFile(start_csv)
 
+    # Hashed indexes, so each START row is checked in constant time.
     g_accounts = getAccounts(g_info, "start account username")
     g_emails   = getEmails(g_info, "email address")
 
@@ -147,8 +141,16 @@ if __name__ == '__main__':
     for area,id in area_to_ids.items():
         print area, id
 
-    output = csv.writer(open(output_csv, "wb"))
+    output_file = open(output_csv, "wb")
+    output = csv.writer(output_file)
+
+    if options.merge:
+        output.writerow(g_info.header)
+        for entry in g_info:
+            output.writerow(entry.values)
 
+    s_time = time.strftime("%Y/%m/%d %H:%M:%S", time.localtime())
+    num_added = 0
     for entry in s_info:
 
         s_account  = entry["username"]
@@ -156,7 +158,6 @@ if __name__ == '__main__':
         s_area_str = entry["access"]
 
         s_name = "%s %s" % (entry["first name"], entry["last name"])
-        s_time = time.strftime("%Y/%m/%d %H:%M:%S", time.localtime())
 
         s_affiliation = entry["affiliation"]
 
@@ -177,4 +178,7 @@ if __name__ == '__main__':
                               area_to_ids)
 
         output.writerow(s_record)
+        num_added += 1
 
+    output_file.close()
+    print 'Added %d reviewers from START.' % num_added
@@ -0,0 +1,179 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+import os, sys, csv, random, bisect
+
+'''
+This script generates synthetic input files for the reviewer assignment scripts, so
+that their performance can be measured on conferences of any size.
+
+It writes the following files into the output directory:
+    signup.csv- a reviewer signup sheet in the format of the Google form download.
+    area_stats.txt- the number of submissions per area.
+    whitelist_<area>.tsv- one whitelist per area, as created by create_reviewer_csv_per_area.py.
+
+The data is parameterized by the number of reviewers and areas, the fraction of reviewers
+who submit the form twice, the fraction with a reduced review load and the skew of area
+popularity (0 is uniform, larger values concentrate reviewers in a few areas).
+'''
+
+class SyntheticDataGenerator:
+	want_string = 'Want to review (1st Choices)'
+	willing_string = 'Willing to review (2nd Choices)'
+
+	def __init__(self, num_reviewers, num_areas, duplicate_rate=0.02, load_limit_rate=0.05, \
+					preference_skew=1.0, whitelist_rate=0.85, area_load=4, paper_load=3, seed=0):
+		self.num_reviewers = num_reviewers
+		self.num_areas = num_areas
+		self.duplicate_rate = duplicate_rate
+		self.load_limit_rate = load_limit_rate
+		self.preference_skew = preference_skew
+		self.whitelist_rate = whitelist_rate
+		self.area_load = area_load
+		self.paper_load = paper_load
+		self.random = random.Random(seed)
+
+	def getAreaNames(self):
+		return ['topic %d' % ii for ii in range(self.num_areas)]
+
+	# Zipf-like popularity weights for each area.
+	def getAreaWeights(self):
+		weights = [1.0 / (ii + 1) ** self.preference_skew for ii in range(self.num_areas)]
+		total = sum(weights)
+		return [weight / total for weight in weights]
+
+	def sampleArea(self, cumulative_weights):
+		area_id = bisect.bisect_left(cumulative_weights, self.random.random())
+		return min(area_id, len(cumulative_weights) - 1)
+
+	# Each reviewer picks between one and five areas, weighted by popularity.
+	def sampleChoices(self, cumulative_weights):
+		num_choices = min(self.num_areas, self.random.randint(1, 5))
+		choices = {}
+		while len(choices) < num_choices:
+			area_id = self.sampleArea(cumulative_weights)
+			if area_id in choices:
+				continue
+			if self.random.random() < 0.5:
+				choices[area_id] = self.want_string
+			else:
+				choices[area_id] = self.willing_string
+		return choices
+
+	def writeSignupSheet(self, filename, area_names, weights):
+		cumulative_weights = []
+		total = 0.0
+		for weight in weights:
+			total += weight
+			cumulative_weights.append(total)
+
+		output = open(filename, 'wb')
+		writer = csv.writer(output)
+		header = ['Timestamp', 'Name', 'Email', 'START Account Username', 'Reduced review load (optional)']
+		for area_name in area_names:
+			header.append('Areas [%s (%s)]' % (area_name.title(), area_name.replace(' ', '').upper()))
+		writer.writerow(header)
+
+		reviewers = []
+		for ii in range(self.num_reviewers):
+			name = 'First%d Last%d' % (ii, ii)
+			email = 'reviewer%d@example.org' % ii
+			username = 'reviewer%d' % ii
+			load = ''
+			if self.random.random() < self.load_limit_rate:
+				load = str(self.random.randint(1, self.area_load - 1))
+			choices = self.sampleChoices(cumulative_weights)
+			reviewers.append((name, email, username, choices))
+			self.writeSignupRow(writer, ii, name, email, username, load, choices)
+
+		# Duplicate submissions reuse the email with new choices.
+		num_duplicates = int(self.num_reviewers * self.duplicate_rate)
+		for jj in range(num_duplicates):
+			name, email, username, choices = reviewers[self.random.randrange(len(reviewers))]
+			self.writeSignupRow(writer, self.num_reviewers + jj, name, email, username, '', self.sampleChoices(cumulative_weights))
+		output.close()
+		return reviewers
+
+	def writeSignupRow(self, writer, row_number, name, email, username, load, choices):
+		timestamp = '2013/01/01 %02d:%02d:%02d' % ((row_number / 3600) % 24, (row_number / 60) % 60, row_number % 60)
+		row = [timestamp, name, email, username, load]
+		for area_id in range(self.num_areas):
+			row.append(choices.get(area_id, ''))
+		writer.writerow(row)
+
+	# Give each area submissions proportional to its popularity, sized so the pool can cover them.
+	def writeAreaStats(self, filename, area_names, weights):
+		total_papers = int(self.num_reviewers * self.area_load / self.paper_load * 0.6)
+		output = open(filename, 'w')
+		output.write('#area\tsubmissions\n')
+		for area_name, weight in zip(area_names, weights):
+			output.write('%s\t%d\n' % (area_name, max(1, int(total_papers * weight))))
+		output.close()
+
+	def writeWhitelists(self, output_path, area_names, reviewers):
+		area_to_reviewers = {}
+		for name, email, username, choices in reviewers:
+			for area_id in choices:
+				if self.random.random() < self.whitelist_rate:
+					area_to_reviewers.setdefault(area_id, []).append((name, email))
+
+		filenames = []
+		for area_id, area_name in enumerate(area_names):
+			filename = os.path.join(output_path, 'whitelist_' + area_name.replace(' ', '_') + '.tsv')
+			output = open(filename, 'w')
+			output.write('#Area:\t%s\n' % area_name)
+			output.write('#Area Load:\t%d\n' % self.area_load)
+			output.write('#Paper Load:\t%d\n' % self.paper_load)
+			for name, email in area_to_reviewers.get(area_id, []):
+				output.write('%s\t%s\n' % (name, email))
+			output.close()
+			filenames.append(filename)
+		return filenames
+
+	# Returns the signup csv, area stats filename and whitelist files prefix.
+	def generate(self, output_path):
+		if not os.path.exists(output_path):
+			os.makedirs(output_path)
+		area_names = self.getAreaNames()
+		weights = self.getAreaWeights()
+		signup_filename = os.path.join(output_path, 'signup.csv')
+		area_stats_filename = os.path.join(output_path, 'area_stats.txt')
+		reviewers = self.writeSignupSheet(signup_filename, area_names, weights)
+		self.writeAreaStats(area_stats_filename, area_names, weights)
+		self.writeWhitelists(output_path, area_names, reviewers)
+		return signup_filename, area_stats_filename, os.path.join(output_path, 'whitelist_')
+
+def addGeneratorOptions(parser):
+	parser.add_option("-a", "--areas", dest="num_areas", type="int", default=50,
+			help="The number of areas (default: 50)")
+	parser.add_option("-d", "--duplicate_rate", dest="duplicate_rate", type="float", default=0.02,
+			help="The fraction of reviewers who submit the form twice (default: 0.02)")
+	parser.add_option("-l", "--load_limit_rate", dest="load_limit_rate", type="float", default=0.05,
+			help="The fraction of reviewers with a reduced review load (default: 0.05)")
+	parser.add_option("-k", "--preference_skew", dest="preference_skew", type="float", default=1.0,
+			help="The Zipf exponent of area popularity (default: 1.0)")
+	parser.add_option("-w", "--whitelist_rate", dest="whitelist_rate", type="float", default=0.85,
+			help="The fraction of area choices accepted in the whitelists (default: 0.85)")
+	parser.add_option("-s", "--seed", dest="seed", type="int", default=0,
+			help="The random seed (default: 0)")
+
+def createGenerator(options, num_reviewers):
+	return SyntheticDataGenerator(num_reviewers, options.num_areas, duplicate_rate=options.duplicate_rate, \
+					load_limit_rate=options.load_limit_rate, preference_skew=options.preference_skew, \
+					whitelist_rate=options.whitelist_rate, seed=options.seed)
+
+if __name__ == '__main__':
+	usage = "Usage: %prog [options] num_reviewers output_path"
+	from optparse import OptionParser
+
+	parser = OptionParser(usage = usage)
+	addGeneratorOptions(parser)
+	(options, args) = parser.parse_args()
+
+	if len(args) != 2:
+		parser.print_help()
+		sys.exit()
+
+	createGenerator(options, int(args[0])).generate(args[1])
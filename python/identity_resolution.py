@@ -0,0 +1,111 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Group signups that belong to the same reviewer.
+#
+# Reviewers sometimes sign up more than once, with a new email, a different spelling of their
+# name or the same START username. Each signup has up to two identity keys: the email and the
+# START username. Signups that share a key are joined in a union-find, so chains (A shares an
+# email with B, B shares a username with C) end up in one group. This takes near-linear time in
+# the number of signups.
+#
+# Different people share names ("Wei Wang"), and the normalized name ignores word order
+# ("Liu Yang" and "Yang Liu"), so a name alone never joins signups. Groups that only share a
+# normalized name (see reviewer_matching.normalizeName) are returned as possible duplicates to
+# be checked by hand.
+import time
+
+from reviewer_matching import normalizeName
+
+TIMESTAMP_FORMATS = ['%Y/%m/%d %H:%M:%S', '%m/%d/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M', '%Y/%m/%d %H:%M']
+
+# The form timestamp in seconds, or None if it is missing or in an unknown format.
+def parseTimestamp(value):
+	value = value.strip()
+	if not value:
+		return None
+	for timestamp_format in TIMESTAMP_FORMATS:
+		try:
+			return time.mktime(time.strptime(value, timestamp_format))
+		except ValueError:
+			pass
+	return None
+
+class DisjointSet:
+	def __init__(self, size):
+		self.parents = range(size)
+		self.ranks = [0] * size
+
+	def find(self, ii):
+		parents = self.parents
+		root = ii
+		while parents[root] != root:
+			root = parents[root]
+		# Path compression.
+		while parents[ii] != root:
+			parents[ii], ii = root, parents[ii]
+		return root
+
+	# Returns True if ii and jj were in different sets.
+	def union(self, ii, jj):
+		root_ii = self.find(ii)
+		root_jj = self.find(jj)
+		if root_ii == root_jj:
+			return False
+		if self.ranks[root_ii] < self.ranks[root_jj]:
+			root_ii, root_jj = root_jj, root_ii
+		self.parents[root_jj] = root_ii
+		if self.ranks[root_ii] == self.ranks[root_jj]:
+			self.ranks[root_ii] += 1
+		return True
+
+def getIdentityKeys(email, username):
+	keys = []
+	email = email.strip().lower()
+	if email:
+		keys.append(('email', email))
+	username = username.strip().lower()
+	if username:
+		keys.append(('username', username))
+	return keys
+
+# signups- a list of (name, email, start account username).
+# Returns (groups, group_match_kinds, possible_duplicates). groups is a list of lists of signup
+# indices, ordered by their first signup, with the indices of each group in file order.
+# group_match_kinds has the set of key kinds ('email', 'username') that joined the signups of
+# each group. possible_duplicates is a list of lists of groups (indices into groups) whose
+# signups share a normalized name but no email or username.
+def resolveIdentities(signups):
+	disjoint_set = DisjointSet(len(signups))
+	key_to_signup = {}
+	links = []
+	for ii, (name, email, username) in enumerate(signups):
+		for key in getIdentityKeys(email, username):
+			if key in key_to_signup:
+				disjoint_set.union(key_to_signup[key], ii)
+				links.append((ii, key[0]))
+			else:
+				key_to_signup[key] = ii
+
+	root_to_group = {}
+	groups = []
+	for ii in range(len(signups)):
+		root = disjoint_set.find(ii)
+		if root not in root_to_group:
+			root_to_group[root] = len(groups)
+			groups.append([])
+		groups[root_to_group[root]].append(ii)
+
+	group_match_kinds = [set() for group in groups]
+	for ii, kind in links:
+		group_match_kinds[root_to_group[disjoint_set.find(ii)]].add(kind)
+
+	name_to_groups = {}
+	for gg, group in enumerate(groups):
+		for name_key in set([normalizeName(signups[ii][0]) for ii in group]):
+			if name_key:
+				name_to_groups.setdefault(name_key, []).append(gg)
+	possible_duplicates = sorted([name_groups for name_groups in name_to_groups.itervalues() if len(name_groups) > 1])
+	return groups, group_match_kinds, possible_duplicates
@@ -0,0 +1,74 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Opt-in timing and counters for the assignment scripts.
+#
+# Each phase records its wall time and the process's peak memory (the resident set high-water
+# mark) when it finished. Counters record hot-path events. When instrumentation is disabled,
+# phases do nothing and counters is None, so hot paths only pay for an "is not None" check.
+import time, json, collections
+try:
+	import resource
+except ImportError:
+	resource = None
+
+def getPeakMemoryKb():
+	if resource is None:
+		return None
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class Phase:
+	def __init__(self, instrumentation, name):
+		self.instrumentation = instrumentation
+		self.name = name
+
+	def __enter__(self):
+		self.start_memory = getPeakMemoryKb()
+		self.start = time.time()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		seconds = time.time() - self.start
+		peak_memory = getPeakMemoryKb()
+		record = {'phase': self.name, 'seconds': round(seconds, 6), 'peak_memory_kb': peak_memory}
+		if peak_memory is not None:
+			record['peak_memory_increase_kb'] = peak_memory - self.start_memory
+		self.instrumentation.phases.append(record)
+		return False
+
+class NullPhase:
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		return False
+
+class Instrumentation:
+	def __init__(self, enabled=False):
+		self.enabled = enabled
+		self.phases = []
+		if enabled:
+			self.counters = collections.defaultdict(int)
+		else:
+			self.counters = None
+
+	# Use as: with instrumentation.phase('loadWhitelists'): ...
+	def phase(self, name):
+		if not self.enabled:
+			return NullPhase()
+		return Phase(self, name)
+
+	def getReport(self):
+		return {
+			'phases': self.phases,
+			'total_seconds': round(sum([phase['seconds'] for phase in self.phases]), 6),
+			'counters': dict(self.counters or {}),
+		}
+
+	def writeReport(self, filename):
+		output = open(filename, 'w')
+		json.dump(self.getReport(), output, indent=1, sort_keys=True)
+		output.write('\n')
+		output.close()
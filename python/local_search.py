@@ -0,0 +1,177 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Improve a finished assignment with moves and swaps (hill climbing).
+#
+# The cost of an assignment is DEFICIT_WEIGHT * the coverage deficit + the number of reviewers in
+# a second choice area. The coverage deficit of an area is the number of reviews it still needs
+# plus the number of reviewers it is short of min_reviewers_per_area. A move takes one reviewer to
+# another of their areas, and a swap exchanges the areas of two reviewers. Only moves and swaps
+# that lower the cost are made. The change in cost only depends on the running review and reviewer
+# counts of the two areas involved, so each candidate is evaluated in O(1).
+#
+# Reviewers only go to areas they chose and whose whitelist accepts them. Fixed reviewers (forced
+# or in areas that get their whole whitelist) are never moved, and the review load of a reviewer
+# in an area respects their load limit. The search stops when no move or swap helps, or when the
+# time budget runs out.
+import time
+
+# A deficit of one review costs more than any change in ratings of a swap (at most 2).
+DEFICIT_WEIGHT = 3
+
+class LocalSearch:
+	def __init__(self, area_to_load, area_to_num_papers, area_to_paper_load, min_reviewers_per_area, time_budget=10.0):
+		self.area_to_load = area_to_load
+		self.min_reviewers_per_area = min_reviewers_per_area
+		self.time_budget = time_budget
+		self.area_to_demand = {}
+		for area in area_to_num_papers:
+			self.area_to_demand[area] = area_to_num_papers[area] * area_to_paper_load[area]
+
+	def getDeficit(self, area, num_reviews, num_reviewers):
+		return max(0, self.area_to_demand[area] - num_reviews) + max(0, self.min_reviewers_per_area - num_reviewers)
+
+	def getLoad(self, reviewer, area):
+		if reviewer in self.reviewer_load_limits:
+			return min(self.reviewer_load_limits[reviewer], self.area_to_load[area])
+		return self.area_to_load[area]
+
+	# The change in cost from moving reviewer from area_from (None if unassigned) to area_to.
+	def getMoveDelta(self, reviewer, area_from, area_to):
+		reviews = self.area_to_num_reviews
+		counts = self.area_to_num_reviewers
+		ratings = self.reviewer_to_candidate_areas[reviewer]
+		delta = 0
+		if area_from is not None:
+			delta += DEFICIT_WEIGHT * (self.getDeficit(area_from, reviews[area_from] - self.getLoad(reviewer, area_from), counts[area_from] - 1) \
+										- self.getDeficit(area_from, reviews[area_from], counts[area_from]))
+			delta -= ratings[area_from] - 1
+		delta += DEFICIT_WEIGHT * (self.getDeficit(area_to, reviews[area_to] + self.getLoad(reviewer, area_to), counts[area_to] + 1) \
+									- self.getDeficit(area_to, reviews[area_to], counts[area_to]))
+		delta += ratings[area_to] - 1
+		return delta
+
+	# The change in cost from exchanging reviewer1 in area1 with reviewer2 in area2.
+	def getSwapDelta(self, reviewer1, area1, reviewer2, area2):
+		reviews = self.area_to_num_reviews
+		counts = self.area_to_num_reviewers
+		ratings1 = self.reviewer_to_candidate_areas[reviewer1]
+		ratings2 = self.reviewer_to_candidate_areas[reviewer2]
+		new_reviews1 = reviews[area1] - self.getLoad(reviewer1, area1) + self.getLoad(reviewer2, area1)
+		new_reviews2 = reviews[area2] - self.getLoad(reviewer2, area2) + self.getLoad(reviewer1, area2)
+		delta = DEFICIT_WEIGHT * (self.getDeficit(area1, new_reviews1, counts[area1]) - self.getDeficit(area1, reviews[area1], counts[area1]) \
+								+ self.getDeficit(area2, new_reviews2, counts[area2]) - self.getDeficit(area2, reviews[area2], counts[area2]))
+		delta += ratings1[area2] - ratings1[area1] + ratings2[area1] - ratings2[area2]
+		return delta
+
+	def moveReviewer(self, reviewer, area_from, area_to):
+		if area_from is not None:
+			self.assignments[area_from].discard(reviewer)
+			self.area_to_num_reviews[area_from] -= self.getLoad(reviewer, area_from)
+			self.area_to_num_reviewers[area_from] -= 1
+			for area in self.reviewer_to_candidate_areas[reviewer]:
+				if (area_from, area) in self.movable:
+					self.movable[(area_from, area)].discard(reviewer)
+		self.assignments.setdefault(area_to, set()).add(reviewer)
+		self.area_to_num_reviews[area_to] += self.getLoad(reviewer, area_to)
+		self.area_to_num_reviewers[area_to] += 1
+		self.addMovable(reviewer, area_to)
+		self.reviewer_to_area[reviewer] = area_to
+
+	# movable[(area_from, area_to)] are the reviewers in area_from who like area_to at least as much.
+	def addMovable(self, reviewer, area):
+		ratings = self.reviewer_to_candidate_areas[reviewer]
+		for other_area, rating in ratings.iteritems():
+			if other_area != area and rating <= ratings[area]:
+				self.movable.setdefault((area, other_area), set()).add(reviewer)
+
+	# Find an improving swap for reviewer (in area) and make it. Only areas the reviewer prefers are
+	# tried, with reviewers there who would not mind the reviewer's area, so that every swap looked
+	# at gains on ratings and is only rejected if it hurts coverage.
+	def trySwap(self, reviewer, area):
+		ratings = self.reviewer_to_candidate_areas[reviewer]
+		for other_area in sorted(ratings):
+			if ratings[other_area] >= ratings[area]:
+				continue
+			for other_reviewer in self.movable.get((other_area, area), ()):
+				if self.getSwapDelta(reviewer, area, other_reviewer, other_area) < 0:
+					self.moveReviewer(reviewer, area, other_area)
+					self.moveReviewer(other_reviewer, other_area, area)
+					return True
+		return False
+
+	# assignments- a dict from area to a set of reviewers. It is modified.
+	# reviewer_to_candidate_areas- for each reviewer, a dict from the areas they may be assigned
+	# to (chosen and whitelisted) to their rating (1 or 2).
+	# reviewer_load_limits- the load limit of reviewers with one.
+	# fixed_reviewers- reviewers that must stay where they are.
+	# Returns a dict of statistics.
+	def improve(self, assignments, reviewer_to_candidate_areas, reviewer_load_limits, fixed_reviewers):
+		start_time = time.time()
+		deadline = start_time + self.time_budget
+		self.assignments = assignments
+		self.reviewer_to_candidate_areas = reviewer_to_candidate_areas
+		self.reviewer_load_limits = reviewer_load_limits
+		self.reviewer_to_area = {}
+		self.area_to_num_reviews = dict((area, 0) for area in self.area_to_demand)
+		self.area_to_num_reviewers = dict((area, 0) for area in self.area_to_demand)
+		for area, reviewers in assignments.iteritems():
+			for reviewer in reviewers:
+				self.reviewer_to_area[reviewer] = area
+				self.area_to_num_reviews[area] += self.getLoad(reviewer, area)
+				self.area_to_num_reviewers[area] += 1
+
+		self.movable = {}
+		reviewers = []
+		for reviewer in sorted(reviewer_to_candidate_areas):
+			area = self.reviewer_to_area.get(reviewer)
+			if reviewer in fixed_reviewers or area is not None and area not in reviewer_to_candidate_areas[reviewer]:
+				continue
+			reviewers.append(reviewer)
+			if area is not None:
+				self.addMovable(reviewer, area)
+
+		stats = {'moves': 0, 'swaps': 0, 'passes': 0, 'cost_before': self.getCost(), 'timed_out': False}
+		improved = True
+		while improved:
+			improved = False
+			stats['passes'] += 1
+			for reviewer in reviewers:
+				if time.time() > deadline:
+					stats['timed_out'] = True
+					break
+				area = self.reviewer_to_area.get(reviewer)
+				best_area = None
+				best_delta = 0
+				for other_area in sorted(reviewer_to_candidate_areas[reviewer]):
+					if other_area == area:
+						continue
+					delta = self.getMoveDelta(reviewer, area, other_area)
+					if delta < best_delta:
+						best_area, best_delta = other_area, delta
+				if best_area is not None:
+					self.moveReviewer(reviewer, area, best_area)
+					stats['moves'] += 1
+					improved = True
+				elif area is not None and self.trySwap(reviewer, area):
+					stats['swaps'] += 1
+					improved = True
+			if stats['timed_out']:
+				break
+
+		stats['cost_after'] = self.getCost()
+		stats['seconds'] = time.time() - start_time
+		return stats
+
+	# Returns the current cost, as (deficit, number of second choices) for reporting.
+	def getCost(self):
+		deficit = 0
+		for area in self.area_to_demand:
+			deficit += self.getDeficit(area, self.area_to_num_reviews[area], self.area_to_num_reviewers[area])
+		second_choices = 0
+		for reviewer, area in self.reviewer_to_area.iteritems():
+			if self.reviewer_to_candidate_areas.get(reviewer, {}).get(area) == 2:
+				second_choices += 1
+		return deficit, second_choices
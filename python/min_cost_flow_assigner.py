@@ -0,0 +1,234 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Assign reviewers to areas by solving a min-cost flow instead of the greedy round robin.
+#
+# The network is source -> reviewer -> area -> sink. Each reviewer carries one unit of flow.
+# The cost of a reviewer -> area edge is the reviewer's rating for that area (1 for a first
+# choice, 2 for a second choice). Each area has three tiers of slots into the sink:
+#	1. min_reviewers_per_area slots with a very large negative cost,
+#	2. the remaining slots needed to cover the area's papers with a large negative cost,
+#	3. unlimited overflow slots with zero cost.
+# The slot costs dominate the rating costs, so the flow fills as many slots as it can before it
+# optimizes choice ratings. Every reviewer with an eligible area is assigned somewhere, as in the
+# greedy algorithm.
+#
+# The flow is optimal for slots, not for reviews: a slot is one reviewer, whatever their load.
+# Reviewers with reduced loads leave areas short even with every slot filled, and the extra slots
+# of assign are a heuristic for that. With tight whitelists and many reduced loads the greedy
+# assignment with local search (--local_search) can cover more reviews, so compare the two
+# with --feasibility report.
+#
+# With tens of thousands of reviewers but only tens of areas, we never build per-reviewer
+# nodes. Reviewers are kept in buckets keyed by the area they can move into and the change in
+# rating the move would cause, so the residual graph is a dense graph over the areas alone.
+# Successive shortest paths are found with Bellman-Ford over that small graph, and each path
+# is augmented by as many reviewers as its buckets and slots allow. The default benchmark
+# (benchmark_assigner.py -e flow -n 20000, 50 areas) takes about 5 seconds in this step with
+# CPython 2.7 on one core of a server CPU.
+import collections, itertools
+
+class MinCostFlowAssigner:
+	def __init__(self, areas, area_to_num_papers, area_to_paper_load, area_to_load, min_reviewers_per_area):
+		self.areas = list(areas)
+		self.area_to_num_papers = area_to_num_papers
+		self.area_to_paper_load = area_to_paper_load
+		self.area_to_load = area_to_load
+		self.min_reviewers_per_area = min_reviewers_per_area
+		# Any path through the area graph changes the rating cost by less than this.
+		self.big_cost = 4 * (len(self.areas) + 2)
+
+	# reviewer_to_candidate_areas- for each reviewer, a list of (area, rating) they may be assigned to.
+	# area_to_slots- for each area, the number of reviewers needed in the first two slot tiers.
+	# Returns a dict between reviewer and assigned area.
+	def solve(self, reviewer_to_candidate_areas, area_to_slots):
+		areas = self.areas
+		num_areas = len(areas)
+		area_index = dict((area, ii) for ii, area in enumerate(areas))
+		big_cost = self.big_cost
+
+		# Slot tiers for each area: [remaining capacity, cost]. None is unlimited capacity.
+		tiers = []
+		for area in areas:
+			min_slots, needed_slots = area_to_slots[area]
+			tiers.append([[min_slots, -2 * big_cost], [needed_slots, -big_cost], [None, 0]])
+
+		# reviewer -> list of (area index, cost)
+		candidates = {}
+		# source_buckets[b][cost]- unassigned reviewers who can enter area b at this cost.
+		source_buckets = [{} for ii in range(num_areas)]
+		for reviewer, area_choices in reviewer_to_candidate_areas.iteritems():
+			choices = [(area_index[area], rating) for area, rating in area_choices if area in area_index]
+			if not choices:
+				continue
+			candidates[reviewer] = choices
+			for b, cost in choices:
+				source_buckets[b].setdefault(cost, set()).add(reviewer)
+
+		# move_buckets[a][b][delta]- reviewers in area a who can move to area b, changing cost by delta.
+		move_buckets = [collections.defaultdict(dict) for ii in range(num_areas)]
+		reviewer_to_area = {}
+
+		def addToArea(reviewer, a):
+			reviewer_to_area[reviewer] = a
+			choices = candidates[reviewer]
+			cost_a = [cost for area, cost in choices if area == a][0]
+			for b, cost in choices:
+				if b != a:
+					move_buckets[a][b].setdefault(cost - cost_a, set()).add(reviewer)
+
+		def removeFromArea(reviewer, a):
+			choices = candidates[reviewer]
+			cost_a = [cost for area, cost in choices if area == a][0]
+			for b, cost in choices:
+				if b != a:
+					move_buckets[a][b][cost - cost_a].discard(reviewer)
+
+		def removeFromSource(reviewer):
+			for b, cost in candidates[reviewer]:
+				source_buckets[b][cost].discard(reviewer)
+
+		def openTier(a):
+			for tier in tiers[a]:
+				if tier[0] is None or tier[0] > 0:
+					return tier
+
+		num_unassigned = len(candidates)
+		while num_unassigned > 0:
+			# Bellman-Ford (queue based) from the source over the area graph.
+			dist = [None] * num_areas
+			parent = [None] * num_areas
+			queue = collections.deque()
+			in_queue = [False] * num_areas
+			for b in range(num_areas):
+				for cost, bucket in source_buckets[b].iteritems():
+					if bucket and (dist[b] is None or cost < dist[b]):
+						dist[b] = cost
+						parent[b] = (None, cost)
+				if dist[b] is not None:
+					queue.append(b)
+					in_queue[b] = True
+			while queue:
+				a = queue.popleft()
+				in_queue[a] = False
+				dist_a = dist[a]
+				for b, buckets in move_buckets[a].iteritems():
+					best_delta = None
+					for delta, bucket in buckets.iteritems():
+						if bucket and (best_delta is None or delta < best_delta):
+							best_delta = delta
+					if best_delta is None:
+						continue
+					if dist[b] is None or dist_a + best_delta < dist[b]:
+						dist[b] = dist_a + best_delta
+						parent[b] = (a, best_delta)
+						if not in_queue[b]:
+							queue.append(b)
+							in_queue[b] = True
+
+			# Pick the area whose sink slot completes the cheapest path.
+			end_area = None
+			end_cost = None
+			for a in range(num_areas):
+				if dist[a] is None:
+					continue
+				path_cost = dist[a] + openTier(a)[1]
+				if end_cost is None or path_cost < end_cost:
+					end_area = a
+					end_cost = path_cost
+			if end_area is None:
+				break
+
+			# Walk back along the path to find the edges and the bottleneck.
+			path = []
+			b = end_area
+			while True:
+				a, cost = parent[b]
+				path.append((a, b, cost))
+				if a is None:
+					break
+				b = a
+			path.reverse()
+
+			tier = openTier(end_area)
+			amount = num_unassigned
+			if tier[0] is not None:
+				amount = min(amount, tier[0])
+			for a, b, cost in path:
+				if a is None:
+					amount = min(amount, len(source_buckets[b][cost]))
+				else:
+					amount = min(amount, len(move_buckets[a][b][cost]))
+
+			# Choose the reviewers for every edge before moving anyone.
+			moves = []
+			for a, b, cost in path:
+				if a is None:
+					bucket = source_buckets[b][cost]
+				else:
+					bucket = move_buckets[a][b][cost]
+				chosen = list(itertools.islice(bucket, amount))
+				moves.append((a, b, chosen))
+			for a, b, chosen in moves:
+				for reviewer in chosen:
+					if a is None:
+						removeFromSource(reviewer)
+						num_unassigned -= 1
+					else:
+						removeFromArea(reviewer, a)
+					addToArea(reviewer, b)
+			if tier[0] is not None:
+				tier[0] -= amount
+
+		return dict((reviewer, areas[a]) for reviewer, a in reviewer_to_area.iteritems())
+
+	# Assign every eligible reviewer to an area.
+	# reviewer_to_candidate_areas- for each reviewer, a list of (area, rating) allowed by the whitelists.
+	# preassigned- a dict between area and the set of reviewers already assigned (e.g. forced reviewers).
+	# reviewer_load- a function giving the number of reviews a reviewer contributes to an area.
+	# Returns a dict between area and the set of assigned reviewers.
+	def assign(self, reviewer_to_candidate_areas, preassigned, reviewer_load, max_iterations=5):
+		# Reviews already covered by preassigned reviewers.
+		preassigned_reviews = {}
+		for area in self.areas:
+			preassigned_reviews[area] = sum([reviewer_load(reviewer, area) for reviewer in preassigned.get(area, [])])
+
+		# Reviewers with reduced loads contribute fewer reviews than a full slot, so if an area
+		# fills its slots but still falls short of reviews we give it more slots and solve again.
+		extra_slots = dict((area, 0) for area in self.areas)
+		for iteration in range(max_iterations):
+			area_to_slots = {}
+			for area in self.areas:
+				num_preassigned = len(preassigned.get(area, []))
+				min_slots = max(0, self.min_reviewers_per_area - num_preassigned)
+				needed_reviews = self.area_to_num_papers[area] * self.area_to_paper_load[area] - preassigned_reviews[area]
+				needed_slots = max(0, (needed_reviews + self.area_to_load[area] - 1) / self.area_to_load[area])
+				needed_slots = max(min_slots, needed_slots + extra_slots[area])
+				area_to_slots[area] = (min_slots, needed_slots - min_slots)
+
+			reviewer_to_area = self.solve(reviewer_to_candidate_areas, area_to_slots)
+
+			area_to_reviews = dict(preassigned_reviews)
+			area_to_num_reviewers = dict((area, 0) for area in self.areas)
+			for reviewer, area in reviewer_to_area.iteritems():
+				area_to_reviews[area] += reviewer_load(reviewer, area)
+				area_to_num_reviewers[area] += 1
+
+			changed = False
+			for area in self.areas:
+				shortfall = self.area_to_num_papers[area] * self.area_to_paper_load[area] - area_to_reviews[area]
+				if shortfall > 0 and area_to_num_reviewers[area] >= sum(area_to_slots[area]):
+					# Every slot was filled, so more slots may raise its coverage.
+					extra_slots[area] += (shortfall + self.area_to_load[area] - 1) / self.area_to_load[area]
+					changed = True
+			if not changed:
+				break
+
+		assignments = {}
+		for area, reviewers in preassigned.iteritems():
+			assignments.setdefault(area, set()).update(reviewers)
+		for reviewer, area in reviewer_to_area.iteritems():
+			assignments.setdefault(area, set()).add(reviewer)
+		return assignments
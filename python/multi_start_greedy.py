@@ -0,0 +1,142 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Run the greedy assignment several times with different random choices and keep the best.
+#
+# The greedy visits areas in a fixed order and takes reviewers with the same rating in id order,
+# so the areas early in the order fill first. Each randomized start shuffles the area order on
+# every round and the reviewers with the same rating in each area, using its own seed. Start 0
+# is the unrandomized greedy, so the result is never worse than a single greedy run.
+#
+# Starts run in a pool of worker processes. The inputs are set in a module global before the
+# workers are forked. The seed of every start is drawn from the master seed, so the same master
+# seed and number of starts always give the same result. Each start counts its instrumentation
+# events on its own and the counts are added to the assigner's counters in the parent.
+import copy, random, collections, multiprocessing
+
+from event_log import EventLog, ERROR
+
+# The inputs of the assignment, set in the parent before the worker processes are forked.
+shared_start_inputs = None
+
+# Returns (min_coverage, coverage, average_rating). Coverage is the fraction of the reviews
+# needed by an area (and of min_reviewers_per_area) that were assigned, capped at 1.
+def scoreAssignment(assignments, area_to_num_reviews_assigned, area_to_num_papers, area_to_paper_load, \
+					min_reviewers_per_area, preference_matrix):
+	total_needed = 0
+	total_covered = 0
+	min_coverage = 1.0
+	for area in area_to_num_papers:
+		reviews_needed = area_to_num_papers[area] * area_to_paper_load[area]
+		reviews_assigned = area_to_num_reviews_assigned.get(area, 0)
+		num_reviewers = len(assignments.get(area, []))
+		needed = reviews_needed + min_reviewers_per_area
+		covered = min(reviews_assigned, reviews_needed) + min(num_reviewers, min_reviewers_per_area)
+		total_needed += needed
+		total_covered += covered
+		if needed > 0:
+			min_coverage = min(min_coverage, float(covered) / needed)
+
+	total_rating = 0
+	num_rated = 0
+	for area, reviewers in assignments.iteritems():
+		for reviewer in reviewers:
+			rating = preference_matrix.getRating(reviewer, area)
+			if rating:
+				total_rating += rating
+				num_rated += 1
+	coverage = 1.0
+	if total_needed > 0:
+		coverage = float(total_covered) / total_needed
+	average_rating = float(total_rating) / max(1, num_rated)
+	return min_coverage, coverage, average_rating
+
+# Better results have a higher minimum area coverage, then a higher total coverage, then a lower
+# (closer to first choice) average rating.
+def getScoreKey(score):
+	min_coverage, coverage, average_rating = score
+	return (round(min_coverage, 9), round(coverage, 9), -round(average_rating, 9))
+
+# Run one start on the shared inputs. Returns (start, seed, score, assignments,
+# area_to_num_reviews_assigned, reviewer_load_constraint, counters). counters is None when
+# instrumentation is disabled.
+def runStart(start_and_seed):
+	start, seed = start_and_seed
+	inputs = shared_start_inputs
+	assigner = inputs['assigner']
+	log = assigner.log
+	assigner.log = EventLog(ERROR, output=inputs['error_output'])
+	counters = assigner.counters
+	if counters is not None:
+		assigner.counters = collections.defaultdict(int)
+	try:
+		random_generator = None
+		if start > 0:
+			random_generator = random.Random(seed)
+		reviewers_per_area_lists = assigner.createAreaReviewerLists(inputs['reviewer_to_area_choices'], inputs['area_to_whitelist'], \
+									accept_all_reviewers=inputs['accept_all_reviewers'], preference_matrix=inputs['preference_matrix'], \
+									random_generator=random_generator)
+		# The assignment modifies these, so every start gets its own copy.
+		reviewer_load_constraint = dict(inputs['reviewer_load_constraint'])
+		assign_all_areas = copy.copy(inputs['assign_all_whitelist_reviewers_to_area'])
+		assignments, area_to_num_reviews_assigned = \
+			assigner.assignReviewers(reviewers_per_area_lists, reviewer_load_constraint, inputs['area_to_load'], \
+								inputs['area_to_num_papers'], inputs['area_to_num_assignments_per_round'], inputs['area_to_paper_load'], \
+								assign_all_areas, dict(inputs['forced_reviewer_to_area']), inputs['min_reviewers_per_area'], \
+								random_generator)
+		assigner.log.flush()
+		start_counters = assigner.counters
+	finally:
+		assigner.log = log
+		assigner.counters = counters
+	if start_counters is not None:
+		start_counters = dict(start_counters)
+	score = scoreAssignment(assignments, area_to_num_reviews_assigned, inputs['area_to_num_papers'], inputs['area_to_paper_load'], \
+							inputs['min_reviewers_per_area'], inputs['score_preference_matrix'])
+	return start, seed, score, assignments, area_to_num_reviews_assigned, reviewer_load_constraint, start_counters
+
+class MultiStartGreedy:
+	def __init__(self, num_starts, seed=0, num_processes=1):
+		self.num_starts = num_starts
+		self.seed = seed
+		self.num_processes = num_processes
+
+	def getSeeds(self):
+		seed_generator = random.Random(self.seed)
+		return [seed_generator.randint(0, 2 ** 31 - 1) for ii in range(self.num_starts)]
+
+	# inputs- a dict with the assigner and the arguments of createAreaReviewerLists and assignReviewers
+	# (see runStart). Returns the results of every start, (start, seed, score, assignments,
+	# area_to_num_reviews_assigned, reviewer_load_constraint), and the index of the best one.
+	def run(self, inputs):
+		global shared_start_inputs
+		shared_start_inputs = inputs
+		starts = list(enumerate(self.getSeeds()))
+		try:
+			if self.num_processes == 1 or len(starts) == 1:
+				results = map(runStart, starts)
+			else:
+				pool = multiprocessing.Pool(min(self.num_processes, len(starts)))
+				try:
+					results = pool.map(runStart, starts)
+				finally:
+					pool.close()
+					pool.join()
+		finally:
+			shared_start_inputs = None
+
+		counters = inputs['assigner'].counters
+		if counters is not None:
+			for result in results:
+				for name, count in result[-1].iteritems():
+					counters[name] += count
+		results = [result[:-1] for result in results]
+
+		# Ties go to the earlier start, so the unrandomized greedy wins unless a start is better.
+		best = 0
+		for ii in range(1, len(results)):
+			if getScoreKey(results[ii][2]) > getScoreKey(results[best][2]):
+				best = ii
+		return results, best
@@ -0,0 +1,112 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Assign the papers of each area to the reviewers assigned to that area.
+#
+# Every paper needs paper_load different reviewers and a reviewer takes at most their capacity
+# (the area load, or their load limit). Bids or affinity scores are kept in a
+# sparse_affinity.SparseAffinityMatrix (reviewer x paper). Higher scores are better, a missing
+# score is 0 and a negative score is a conflict that is never assigned.
+#
+# The assignment is greedy in paper_load rounds. In round k, the scored (reviewer, paper) pairs
+# are taken from the highest score down and a pair is used if the paper has fewer than k
+# reviewers and the reviewer has capacity left, so every paper gets its first reviewer before
+# any paper gets its second. Papers still short after the rounds are then filled, again one
+# round at a time, from the reviewers with the most capacity left.
+#
+# Areas are independent, so they are solved in a pool of worker processes. The inputs of every
+# area are set in a module global before the workers are forked.
+import heapq, multiprocessing
+
+# A dict from area to its inputs (see assignAreaPapers), set in the parent before the worker
+# processes are forked.
+shared_area_inputs = None
+
+class PaperAssigner:
+	def __init__(self, paper_load):
+		self.paper_load = paper_load
+
+	# affinities- a SparseAffinityMatrix with a row per reviewer and a column per paper.
+	# capacities- the number of papers each reviewer (row) can take.
+	# Returns (paper_to_reviewers, stats). paper_to_reviewers is a list with the reviewers
+	# (rows) of every paper.
+	def assign(self, affinities, capacities):
+		num_papers = affinities.num_columns
+		remaining = list(capacities)
+		paper_to_reviewers = [[] for ii in range(num_papers)]
+		stats = {'papers': num_papers, 'reviews_needed': num_papers * self.paper_load, 'reviews_assigned': 0, \
+				'scored_reviews': 0, 'total_score': 0.0}
+
+		scored = []
+		paper_to_conflicts = {}
+		for reviewer, paper, score in affinities.iterEntries():
+			if score > 0:
+				scored.append((-score, reviewer, paper))
+			elif score < 0:
+				paper_to_conflicts.setdefault(paper, set()).add(reviewer)
+		scored.sort()
+
+		for target in range(1, self.paper_load + 1):
+			for negative_score, reviewer, paper in scored:
+				reviewers = paper_to_reviewers[paper]
+				if len(reviewers) < target and remaining[reviewer] > 0 and reviewer not in reviewers:
+					reviewers.append(reviewer)
+					remaining[reviewer] -= 1
+					stats['scored_reviews'] += 1
+					stats['total_score'] -= negative_score
+
+		# Fill the remaining slots from the reviewers with the most capacity left.
+		heap = [(-capacity, reviewer) for reviewer, capacity in enumerate(remaining) if capacity > 0]
+		heapq.heapify(heap)
+		for target in range(1, self.paper_load + 1):
+			for paper in range(num_papers):
+				reviewers = paper_to_reviewers[paper]
+				if len(reviewers) >= target:
+					continue
+				conflicts = paper_to_conflicts.get(paper, ())
+				skipped = []
+				while heap:
+					negative_capacity, reviewer = heapq.heappop(heap)
+					if reviewer in reviewers or reviewer in conflicts:
+						skipped.append((negative_capacity, reviewer))
+						continue
+					reviewers.append(reviewer)
+					if negative_capacity < -1:
+						heapq.heappush(heap, (negative_capacity + 1, reviewer))
+					break
+				for entry in skipped:
+					heapq.heappush(heap, entry)
+
+		for reviewers in paper_to_reviewers:
+			stats['reviews_assigned'] += len(reviewers)
+		return paper_to_reviewers, stats
+
+# Solve one area. Its inputs are a dict with paper_load, affinities and capacities.
+# Returns (area, paper_to_reviewers, stats).
+def assignAreaPapers(area):
+	inputs = shared_area_inputs[area]
+	paper_to_reviewers, stats = PaperAssigner(inputs['paper_load']).assign(inputs['affinities'], inputs['capacities'])
+	return area, paper_to_reviewers, stats
+
+# area_to_inputs- a dict from area to the inputs of assignAreaPapers.
+# Returns a dict from area to (paper_to_reviewers, stats).
+def assignPapersInParallel(area_to_inputs, num_processes=1):
+	global shared_area_inputs
+	shared_area_inputs = area_to_inputs
+	# The largest areas go first so that they do not finish last.
+	areas = sorted(area_to_inputs, key=lambda area: (-len(area_to_inputs[area]['affinities']), area))
+	try:
+		if num_processes == 1 or len(areas) <= 1:
+			results = map(assignAreaPapers, areas)
+		else:
+			pool = multiprocessing.Pool(min(num_processes, len(areas)))
+			try:
+				results = pool.map(assignAreaPapers, areas, chunksize=1)
+			finally:
+				pool.close()
+				pool.join()
+	finally:
+		shared_area_inputs = None
+	return dict((area, (paper_to_reviewers, stats)) for area, paper_to_reviewers, stats in results)
@@ -0,0 +1,118 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# A dense reviewer x area matrix of choice ratings, with the whitelists as a mask.
+#
+# The matrix is stored column major, one bytearray (an int8 array) per area with one byte per
+# reviewer. The low two bits of a byte hold the rating (0 for no choice, 1 for a first choice,
+# 2 for a second choice) and the WHITELISTED bit is set for reviewers in the area's whitelist.
+# Finding the candidates of an area or counting choices then uses bytearray.find and
+# bytearray.count, which scan in C, instead of a Python loop over every reviewer's choices.
+#
+# Reviewers are indexed in sorted order of their ids, so scanning a column returns reviewers
+# in the same order as sorting (rating, reviewer) tuples. This is also the order of the integer
+# ids of whitelist_index.WhitelistBitset, so whitelist bitsets over the same reviewers are
+# copied into the columns by index.
+from whitelist_index import WhitelistBitset
+
+RATING_MASK = 3
+WHITELISTED = 4
+
+# Translation tables that set or clear the whitelist bit of every byte in a column.
+SET_WHITELISTED = ''.join([chr(value | WHITELISTED) for value in range(256)])
+CLEAR_WHITELISTED = ''.join([chr(value & ~WHITELISTED) for value in range(256)])
+
+class PreferenceMatrix:
+	def __init__(self, reviewer_to_area_choices):
+		self.reviewers = sorted(reviewer_to_area_choices.keys())
+		self.reviewer_index = dict((reviewer, ii) for ii, reviewer in enumerate(self.reviewers))
+		# A reviewer list known to equal self.reviewers, to compare each whitelist's list only once.
+		self.same_reviewers = None
+		areas = set()
+		for area_choices in reviewer_to_area_choices.itervalues():
+			for area, rating in area_choices:
+				areas.add(area)
+		self.areas = sorted(areas)
+		self.area_index = dict((area, ii) for ii, area in enumerate(self.areas))
+
+		num_reviewers = len(self.reviewers)
+		self.columns = [bytearray(num_reviewers) for area in self.areas]
+		for reviewer, area_choices in reviewer_to_area_choices.iteritems():
+			ii = self.reviewer_index[reviewer]
+			for area, rating in area_choices:
+				self.columns[self.area_index[area]][ii] = rating
+
+	# Mark each area's whitelisted reviewers. With accept_all_reviewers, everyone is whitelisted.
+	def setWhitelists(self, area_to_whitelist, accept_all_reviewers=False):
+		reviewer_index = self.reviewer_index
+		for area, column in zip(self.areas, self.columns):
+			if accept_all_reviewers:
+				column[:] = column.translate(SET_WHITELISTED)
+				continue
+			column[:] = column.translate(CLEAR_WHITELISTED)
+			if area not in area_to_whitelist:
+				continue
+			whitelist = area_to_whitelist[area]
+			if isinstance(whitelist, WhitelistBitset) and self.hasSameReviewers(whitelist.reviewers):
+				# The bitset uses the same integer ids, so no reviewer id lookups are needed.
+				for ii in whitelist.getIndices():
+					column[ii] |= WHITELISTED
+				continue
+			for reviewer in whitelist:
+				if reviewer in reviewer_index:
+					column[reviewer_index[reviewer]] |= WHITELISTED
+
+	def hasSameReviewers(self, reviewers):
+		if reviewers is not self.same_reviewers:
+			if reviewers != self.reviewers:
+				return False
+			self.same_reviewers = reviewers
+		return True
+
+	def getRating(self, reviewer, area):
+		if reviewer not in self.reviewer_index or area not in self.area_index:
+			return 0
+		return self.columns[self.area_index[area]][self.reviewer_index[reviewer]] & RATING_MASK
+
+	# The indices of the reviewers whose byte in the area's column equals value.
+	def findReviewers(self, area, value):
+		column = self.columns[self.area_index[area]]
+		value = chr(value)
+		indices = []
+		ii = column.find(value)
+		while ii != -1:
+			indices.append(ii)
+			ii = column.find(value, ii + 1)
+		return indices
+
+	# The whitelisted reviewers who chose the area, first choices before second choices.
+	# random_generator- if given (a random.Random), reviewers with the same rating are shuffled.
+	def getCandidates(self, area, random_generator=None):
+		reviewers = self.reviewers
+		candidates = []
+		for rating in (1, 2):
+			rating_candidates = [reviewers[ii] for ii in self.findReviewers(area, rating | WHITELISTED)]
+			if random_generator is not None:
+				random_generator.shuffle(rating_candidates)
+			candidates.extend(rating_candidates)
+		return candidates
+
+	# For every reviewer with a whitelisted choice, a dict from those areas to their rating.
+	def getWhitelistedChoices(self):
+		reviewers = self.reviewers
+		reviewer_to_areas = {}
+		for area in self.areas:
+			for rating in (1, 2):
+				for ii in self.findReviewers(area, rating | WHITELISTED):
+					reviewer_to_areas.setdefault(reviewers[ii], {})[area] = rating
+		return reviewer_to_areas
+
+	# The number of reviewers who chose the area, whether whitelisted or not.
+	def countChoices(self, area):
+		column = self.columns[self.area_index[area]]
+		total = 0
+		for rating in (1, 2):
+			total += column.count(chr(rating)) + column.count(chr(rating | WHITELISTED))
+		return total
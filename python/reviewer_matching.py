@@ -0,0 +1,164 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Approximate matching of reviewers (e.g. a contact list) against signups.
+#
+# Reviewers often sign up with a different email or a different spelling of their name, so
+# exact matching misses them. Comparing every contact with every signup is too slow for large
+# conferences, so candidates are found through keys and a blocking index:
+#	1. the exact email,
+#	2. the name with accents folded, punctuation removed and tokens sorted,
+#	3. the email local part (ignoring dots and +tags), if the names are also similar and few
+#	   records share it (not info@ or office@),
+#	4. the first initial and last name,
+#	5. character trigrams of the name key. Only signups sharing trigrams with the contact are
+#	   compared, and very common trigrams are skipped, so each lookup does bounded work.
+# Each match is reported with a confidence between 0 and 1.
+import re, unicodedata
+
+def foldAccents(text):
+	if isinstance(text, str):
+		# Most names are plain ascii and need no folding.
+		try:
+			text.decode('ascii')
+			return text
+		except UnicodeDecodeError:
+			pass
+		text = text.decode('utf-8', 'ignore')
+	text = unicodedata.normalize('NFKD', text)
+	return ''.join([c for c in text if not unicodedata.combining(c)]).encode('ascii', 'ignore')
+
+def getNameTokens(name):
+	return re.sub('[^a-z0-9 ]', ' ', foldAccents(name).lower()).split()
+
+# The name with accents folded, punctuation removed and tokens sorted, so that
+# "Dredze, Mark" and "mark dredze" get the same key.
+def normalizeName(name):
+	return ' '.join(sorted(getNameTokens(name)))
+
+# The first initial and the last name, e.g. "m dredze" for "Mark H. Dredze".
+def getInitialsKey(name):
+	tokens = getNameTokens(name)
+	if len(tokens) < 2:
+		return ''
+	return tokens[0][0] + ' ' + tokens[-1]
+
+# The email local part without dots or +tags, and the domain.
+def splitEmail(email):
+	email = email.strip().lower()
+	if '@' not in email:
+		return '', ''
+	local_part, domain = email.rsplit('@', 1)
+	local_part = local_part.split('+', 1)[0].replace('.', '')
+	return local_part, domain
+
+def getTrigrams(key):
+	padded = ' ' + key + ' '
+	return set([padded[ii:ii + 3] for ii in range(len(padded) - 2)])
+
+def diceSimilarity(trigrams1, trigrams2):
+	if not trigrams1 or not trigrams2:
+		return 0.0
+	return 2.0 * len(trigrams1 & trigrams2) / (len(trigrams1) + len(trigrams2))
+
+class ReviewerMatcher:
+	# records- a list of (name, email, value) for the signups. value is returned on a match.
+	# min_confidence- matches with a lower confidence are not returned.
+	# max_block_size- trigrams shared by more records than this are too common to use for blocking.
+	# max_local_part_records- email local parts shared by more records than this are not matched.
+	# min_local_part_similarity- the name similarity a local part match needs.
+	def __init__(self, records, min_confidence=0.8, max_block_size=500, max_local_part_records=3, \
+				min_local_part_similarity=0.5):
+		self.min_confidence = min_confidence
+		self.max_block_size = max_block_size
+		self.max_local_part_records = max_local_part_records
+		self.min_local_part_similarity = min_local_part_similarity
+		self.values = []
+		self.name_keys = []
+		self.name_trigrams = []
+		self.domains = []
+		self.email_index = {}
+		self.name_index = {}
+		self.local_part_index = {}
+		self.initials_index = {}
+		self.trigram_index = {}
+		for name, email, value in records:
+			ii = len(self.values)
+			self.values.append(value)
+			name_key = normalizeName(name)
+			local_part, domain = splitEmail(email)
+			trigrams = getTrigrams(name_key)
+			self.name_keys.append(name_key)
+			self.name_trigrams.append(trigrams)
+			self.domains.append(domain)
+
+			email = email.strip().lower()
+			if email:
+				self.email_index.setdefault(email, ii)
+			if name_key:
+				self.name_index.setdefault(name_key, []).append(ii)
+			if local_part:
+				self.local_part_index.setdefault(local_part, []).append(ii)
+			initials_key = getInitialsKey(name)
+			if initials_key:
+				self.initials_index.setdefault(initials_key, []).append(ii)
+			for trigram in trigrams:
+				self.trigram_index.setdefault(trigram, []).append(ii)
+
+	# Returns (value, confidence, method) for the best match, or None.
+	def match(self, name, email):
+		email = email.strip().lower()
+		if email in self.email_index:
+			return self.values[self.email_index[email]], 1.0, 'email'
+
+		name_key = normalizeName(name)
+		local_part, domain = splitEmail(email)
+		if name_key in self.name_index:
+			ii = self.name_index[name_key][0]
+			return self.values[ii], 0.95, 'name'
+
+		query_trigrams = getTrigrams(name_key)
+		best = None
+		# Same email local part at another domain, if the names are also similar. A local part
+		# that many records share (info, office) says nothing about who it is.
+		local_part_matches = self.local_part_index.get(local_part, [])
+		if len(local_part_matches) > self.max_local_part_records:
+			local_part_matches = []
+		for ii in local_part_matches:
+			similarity = diceSimilarity(query_trigrams, self.name_trigrams[ii])
+			if similarity < self.min_local_part_similarity:
+				continue
+			confidence = 0.8 + 0.15 * similarity
+			if best is None or confidence > best[1]:
+				best = (ii, confidence, 'email local part')
+
+		# Same initial and last name, only if it is unambiguous.
+		initials_matches = self.initials_index.get(getInitialsKey(name), [])
+		if len(initials_matches) == 1:
+			ii = initials_matches[0]
+			confidence = 0.75 + 0.1 * (domain != '' and domain == self.domains[ii])
+			if best is None or confidence > best[1]:
+				best = (ii, confidence, 'initials')
+
+		# Similar names among the records that share a trigram.
+		shared_counts = {}
+		for trigram in query_trigrams:
+			postings = self.trigram_index.get(trigram, [])
+			if len(postings) > self.max_block_size:
+				continue
+			for ii in postings:
+				shared_counts[ii] = shared_counts.get(ii, 0) + 1
+		if shared_counts:
+			most_shared = sorted(shared_counts.iteritems(), key=lambda item: item[1], reverse=True)[:20]
+			for ii, count in most_shared:
+				similarity = diceSimilarity(query_trigrams, self.name_trigrams[ii])
+				confidence = 0.9 * similarity + 0.1 * (domain != '' and domain == self.domains[ii])
+				if best is None or confidence > best[1]:
+					best = (ii, confidence, 'similar name')
+
+		if best is None or best[1] < self.min_confidence:
+			return None
+		ii, confidence, method = best
+		return self.values[ii], confidence, method
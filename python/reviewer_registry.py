@@ -0,0 +1,58 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Interned reviewers.
+#
+# Each reviewer is known by a string id (name_email), but the assigner keeps reviewers in many
+# sets and dicts, and hashing and storing long strings adds up for large pools. The registry
+# gives every reviewer a dense integer id (0, 1, 2, ...) and keeps what is known about them in a
+# slotted record, so the rest of the assigner only handles small ints.
+#
+# Ids are given in sorted order of the string ids, so sorting integer ids gives the same order
+# as sorting the string ids, and assignments do not depend on which ids are used.
+
+class ReviewerRecord(object):
+	__slots__ = ('reviewer_id', 'name', 'email', 'start_account_username', 'load_limit', 'area_choices')
+
+	def __init__(self, reviewer_id, name, email, start_account_username, load_limit, area_choices):
+		self.reviewer_id = reviewer_id
+		self.name = name
+		self.email = email
+		self.start_account_username = start_account_username
+		# The reduced review load from the signup sheet, or None.
+		self.load_limit = load_limit
+		# A list of (area, rating) tuples.
+		self.area_choices = area_choices
+
+	def __getstate__(self):
+		return tuple([getattr(self, name) for name in self.__slots__])
+
+	def __setstate__(self, state):
+		for name, value in zip(self.__slots__, state):
+			setattr(self, name, value)
+
+class ReviewerRegistry:
+	def __init__(self):
+		self.records = []
+		self.reviewer_id_to_index = {}
+
+	# Add a reviewer and return their integer id.
+	def add(self, reviewer_id, name, email, start_account_username, load_limit=None, area_choices=None):
+		ii = len(self.records)
+		self.records.append(ReviewerRecord(reviewer_id, name, email, start_account_username, load_limit, area_choices or []))
+		self.reviewer_id_to_index[reviewer_id] = ii
+		return ii
+
+	def getIndex(self, reviewer_id):
+		return self.reviewer_id_to_index[reviewer_id]
+
+	def __getitem__(self, ii):
+		return self.records[ii]
+
+	def __contains__(self, ii):
+		return 0 <= ii < len(self.records)
+
+	def __len__(self):
+		return len(self.records)
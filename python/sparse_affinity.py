@@ -0,0 +1,56 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# A sparse reviewer x paper matrix of bid or affinity scores in compressed sparse row (CSR) form.
+#
+# Most reviewers bid on a few dozen of an area's papers, so a dense matrix would be almost all
+# zeros. Row r keeps its column (paper) indices in indices[indptr[r]:indptr[r + 1]], sorted, and
+# their scores at the same positions of data. The three arrays are typed (array.array), so a
+# matrix with a million scores takes about 16MB and pickles quickly to worker processes.
+import array, bisect
+
+class SparseAffinityMatrix:
+	# entries- (row, column, score) triples. A later score for the same cell replaces an earlier one.
+	def __init__(self, num_rows, num_columns, entries=()):
+		self.num_rows = num_rows
+		self.num_columns = num_columns
+		rows = [{} for ii in range(num_rows)]
+		for row, column, score in entries:
+			rows[row][column] = score
+		self.indptr = array.array('l', [0])
+		self.indices = array.array('l')
+		self.data = array.array('d')
+		for cells in rows:
+			columns = sorted(cells)
+			self.indices.extend(columns)
+			self.data.extend([cells[column] for column in columns])
+			self.indptr.append(len(self.indices))
+
+	# The columns and scores of a row.
+	def getRow(self, row):
+		start, end = self.indptr[row], self.indptr[row + 1]
+		return self.indices[start:end], self.data[start:end]
+
+	# The score of a cell, or default if it has none.
+	def getScore(self, row, column, default=0.0):
+		start, end = self.indptr[row], self.indptr[row + 1]
+		ii = bisect.bisect_left(self.indices, column, start, end)
+		if ii < end and self.indices[ii] == column:
+			return self.data[ii]
+		return default
+
+	# Every (row, column, score), by row and then column.
+	def iterEntries(self):
+		indptr, indices, data = self.indptr, self.indices, self.data
+		for row in range(self.num_rows):
+			for ii in range(indptr[row], indptr[row + 1]):
+				yield row, indices[ii], data[ii]
+
+	# The column x row matrix, e.g. paper x reviewer.
+	def transpose(self):
+		return SparseAffinityMatrix(self.num_columns, self.num_rows, [(column, row, score) for row, column, score in self.iterEntries()])
+
+	def __len__(self):
+		return len(self.data)
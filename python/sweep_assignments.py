@@ -0,0 +1,245 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+import os, sys, copy, itertools, multiprocessing
+
+from acl_greedy_assign_reviewers import ACLAssignGreedyReviewers
+from event_log import EventLog, DiscardOutput, ERROR
+
+'''
+This script runs the reviewer assignment for a grid of tuning parameters and prints one
+table comparing the results, so that a tuning session does not require editing run().
+
+The inputs are the same as acl_greedy_assign_reviewers.py. They are parsed once and shared
+with a pool of worker processes, one assignment per configuration.
+
+The grid is given by options that accept several values:
+    --min_reviewers 5,10,15
+    --priority_factor 1,2,3
+    --priority_areas "area one|area two"  (repeat for more sets, "none" for no areas)
+    --assign_all_areas "area one"  (repeat for more sets, "none" for no areas)
+    --area_load "*=4"  --area_load "*=3|machine translation=5"  (repeat for more settings)
+    --engines greedy,deficit,flow
+
+The output has one row per configuration with the coverage of every area, the minimum
+coverage, the average choice rating and the number of unassigned reviewers.
+'''
+
+# The parsed inputs, set in the parent before the worker processes are forked.
+shared_inputs = None
+
+def parseAreaSet(value):
+	if value.lower() == 'none':
+		return None
+	return set([area.strip().lower() for area in value.split('|') if area.strip()])
+
+# "*=3|machine translation=5" gives every area a load of 3 except machine translation.
+def parseAreaLoads(value):
+	if value.lower() == 'default':
+		return None
+	area_loads = {}
+	for item in value.split('|'):
+		area, load = item.rsplit('=', 1)
+		area_loads[area.strip().lower()] = int(load)
+	return area_loads
+
+def formatAreaSet(areas):
+	if areas is None:
+		return 'none'
+	return '|'.join(sorted(areas))
+
+def formatAreaLoads(area_loads):
+	if area_loads is None:
+		return 'default'
+	return '|'.join(['%s=%d' % (area, load) for area, load in sorted(area_loads.items())])
+
+class AssignmentSweep:
+	def __init__(self, reviewer_csv, area_stats_filename, whitelist_files_prefix):
+		self.reviewer_csv = reviewer_csv
+		self.area_stats_filename = area_stats_filename
+		self.whitelist_files_prefix = whitelist_files_prefix
+
+	def loadInputs(self):
+		assigner = ACLAssignGreedyReviewers()
+		assigner.log = EventLog(ERROR, output=sys.stderr)
+		area_to_num_papers = assigner.loadAreaStats(self.area_stats_filename)
+		reviewer_to_area_choices, emails_to_reviewer_id_dict, reviewer_registry, reviewer_load_constraint = \
+			assigner.loadReviewerInformation(self.reviewer_csv)
+		forced_reviewer_to_area = {}
+		whitelist_files = assigner.getWhitelistFilenames(self.whitelist_files_prefix)
+		area_to_whitelist, area_to_load, area_to_paper_load = \
+			assigner.loadWhitelists(whitelist_files, emails_to_reviewer_id_dict, forced_reviewer_to_area)
+		assigner.log.flush()
+		return {
+			'area_to_num_papers': area_to_num_papers,
+			'reviewer_to_area_choices': reviewer_to_area_choices,
+			'reviewer_load_constraint': reviewer_load_constraint,
+			'forced_reviewer_to_area': forced_reviewer_to_area,
+			'area_to_whitelist': area_to_whitelist,
+			'area_to_load': area_to_load,
+			'area_to_paper_load': area_to_paper_load,
+		}
+
+	# Every combination of the grid values, as a list of dicts.
+	def getConfigurations(self, grid):
+		names = sorted(grid.keys())
+		configurations = []
+		for values in itertools.product(*[grid[name] for name in names]):
+			configurations.append(dict(zip(names, values)))
+		return configurations
+
+	def run(self, grid, num_processes):
+		global shared_inputs
+		shared_inputs = self.loadInputs()
+		configurations = self.getConfigurations(grid)
+		print >> sys.stderr, 'Running %d configurations.' % len(configurations)
+
+		if num_processes == 1 or len(configurations) == 1:
+			return map(runConfiguration, configurations)
+		pool = multiprocessing.Pool(min(num_processes, len(configurations)))
+		try:
+			return pool.map(runConfiguration, configurations)
+		finally:
+			pool.close()
+			pool.join()
+
+	def printTable(self, results, output):
+		areas = sorted(shared_inputs['area_to_num_papers'].keys())
+		header = ['engine', 'min_reviewers', 'priority_factor', 'priority_areas', 'assign_all_areas', 'area_load', \
+				'min_coverage', 'average_rating', 'unassigned'] + areas
+		output.write('\t'.join(header) + '\n')
+		for configuration, stats in results:
+			row = [configuration['engine'], str(configuration['min_reviewers']), str(configuration['priority_factor']), \
+					formatAreaSet(configuration['priority_areas']), formatAreaSet(configuration['assign_all_areas']), \
+					formatAreaLoads(configuration['area_load']), '%.0f' % stats['min_coverage'], \
+					'%.3f' % stats['average_rating'], str(stats['unassigned'])]
+			for area in areas:
+				row.append('%.0f' % stats['area_to_coverage'][area])
+			output.write('\t'.join(row) + '\n')
+
+# Run one assignment on the shared inputs and return its summary statistics.
+def runConfiguration(configuration):
+	inputs = shared_inputs
+	assigner = ACLAssignGreedyReviewers()
+	assigner.log = EventLog(ERROR, output=sys.stderr)
+	assigner.increase_priority_factor = configuration['priority_factor']
+
+	area_to_num_papers = inputs['area_to_num_papers']
+	area_to_paper_load = inputs['area_to_paper_load']
+	reviewer_to_area_choices = inputs['reviewer_to_area_choices']
+	# The assignment modifies these, so every configuration gets its own copy.
+	reviewer_load_constraint = dict(inputs['reviewer_load_constraint'])
+	forced_reviewer_to_area = dict(inputs['forced_reviewer_to_area'])
+	area_to_load = dict(inputs['area_to_load'])
+	if configuration['area_load']:
+		for area in area_to_load:
+			if area in configuration['area_load']:
+				area_to_load[area] = configuration['area_load'][area]
+			elif '*' in configuration['area_load']:
+				area_to_load[area] = configuration['area_load']['*']
+	assign_all_areas = configuration['assign_all_areas']
+	if assign_all_areas is not None:
+		assign_all_areas = copy.copy(assign_all_areas)
+
+	stdout = sys.stdout
+	sys.stdout = DiscardOutput()
+	try:
+		reviewers_per_area_lists = assigner.createAreaReviewerLists(reviewer_to_area_choices, inputs['area_to_whitelist'])
+		if configuration['engine'] == 'flow':
+			assignments, area_to_num_reviews_assigned = \
+				assigner.assignReviewersWithFlow(reviewers_per_area_lists, reviewer_to_area_choices, reviewer_load_constraint, \
+									area_to_load, area_to_num_papers, area_to_paper_load, \
+									assign_all_areas, forced_reviewer_to_area, configuration['min_reviewers'])
+		elif configuration['engine'] == 'deficit':
+			assignments, area_to_num_reviews_assigned = \
+				assigner.assignReviewersByDeficit(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
+									area_to_num_papers, area_to_paper_load, \
+									assign_all_areas, forced_reviewer_to_area, configuration['min_reviewers'], \
+									configuration['priority_areas'])
+		else:
+			area_to_num_assignments_per_round = assigner.computeNumAreaAssignmentPerRound(area_to_load, area_to_num_papers, \
+									area_to_paper_load, configuration['priority_areas'])
+			assignments, area_to_num_reviews_assigned = \
+				assigner.assignReviewers(reviewers_per_area_lists, reviewer_load_constraint, area_to_load, \
+									area_to_num_papers, area_to_num_assignments_per_round, area_to_paper_load, \
+									assign_all_areas, forced_reviewer_to_area, configuration['min_reviewers'])
+	finally:
+		sys.stdout = stdout
+		assigner.log.flush()
+
+	area_to_coverage = {}
+	for area in area_to_num_papers:
+		area_to_coverage[area] = area_to_num_reviews_assigned.get(area, 0) / float(area_to_paper_load[area]) / float(area_to_num_papers[area]) * 100
+
+	total_rating = 0
+	num_rated = 0
+	assigned_reviewers = set()
+	for area, reviewers in assignments.iteritems():
+		for reviewer in reviewers:
+			assigned_reviewers.add(reviewer)
+			rating = dict(reviewer_to_area_choices.get(reviewer, [])).get(area)
+			if rating is not None:
+				total_rating += rating
+				num_rated += 1
+
+	stats = {
+		'area_to_coverage': area_to_coverage,
+		'min_coverage': min(area_to_coverage.values()),
+		'average_rating': float(total_rating) / max(1, num_rated),
+		'unassigned': len(reviewer_to_area_choices) - len(assigned_reviewers),
+	}
+	return configuration, stats
+
+if __name__ == '__main__':
+	usage = "Usage: %prog [options] reviewer_csv area_stats_filename whitelist_files_prefix [output_table]"
+	from optparse import OptionParser
+
+	parser = OptionParser(usage = usage)
+	parser.add_option("-m", "--min_reviewers", dest="min_reviewers", default="10",
+			help="Comma separated values of min_reviewers_per_area (default: 10)")
+	parser.add_option("-f", "--priority_factor", dest="priority_factor", default="2",
+			help="Comma separated values of increase_priority_factor (default: 2)")
+	parser.add_option("-P", "--priority_areas", dest="priority_areas", action="append", default=[],
+			help="A set of priority areas separated by |, or none. Repeat for more values (default: none)")
+	parser.add_option("-A", "--assign_all_areas", dest="assign_all_areas", action="append", default=[],
+			help="A set of areas that get all their whitelisted reviewers, separated by |, or none. Repeat for more values (default: none)")
+	parser.add_option("-l", "--area_load", dest="area_load", action="append", default=[],
+			help="Area loads as area=load separated by |, where * is every area, or default. Repeat for more values (default: default)")
+	parser.add_option("-e", "--engines", dest="engines", default="greedy",
+			help="Comma separated assignment engines: greedy, deficit, flow (default: greedy)")
+	parser.add_option("-j", "--processes", dest="num_processes", type="int", default=multiprocessing.cpu_count(),
+			help="The number of worker processes (default: the number of CPUs)")
+	(options, args) = parser.parse_args()
+
+	if len(args) not in (3, 4):
+		parser.print_help()
+		sys.exit()
+
+	grid = {
+		'min_reviewers': [int(value) for value in options.min_reviewers.split(',')],
+		'priority_factor': [int(value) for value in options.priority_factor.split(',')],
+		'priority_areas': [parseAreaSet(value) for value in options.priority_areas] or [None],
+		'assign_all_areas': [parseAreaSet(value) for value in options.assign_all_areas] or [None],
+		'area_load': [parseAreaLoads(value) for value in options.area_load] or [None],
+		'engine': [engine.strip() for engine in options.engines.split(',')],
+	}
+	for engine in grid['engine']:
+		if engine not in ('greedy', 'deficit', 'flow'):
+			parser.error('Unknown engine: %s' % engine)
+
+	sweep = AssignmentSweep(args[0], args[1], args[2])
+	stdout = sys.stdout
+	sys.stdout = DiscardOutput()
+	try:
+		results = sweep.run(grid, options.num_processes)
+	finally:
+		sys.stdout = stdout
+
+	if len(args) == 4:
+		output = open(args[3], 'w')
+		sweep.printTable(results, output)
+		output.close()
+	else:
+		sweep.printTable(results, sys.stdout)
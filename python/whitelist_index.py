@@ -0,0 +1,74 @@
+'''
+Copyright 2013 Mark Dredze. All rights reserved.
+This software is released under the 2-clause BSD license.
+Mark Dredze, mdredze@cs.jhu.edu
+'''
+# Area whitelists as bitsets over integer reviewer ids.
+#
+# Every reviewer gets an integer id, its position in the sorted list of reviewer ids. An area's
+# whitelist is a bytearray with one bit per reviewer, so testing membership is a shift and a
+# mask, and the whitelists of every area together take len(areas) * len(reviewers) / 8 bytes.
+# A WhitelistBitset still behaves like a set of reviewer ids ("reviewer in whitelist", iteration
+# and len) for code that works with the string ids.
+
+# A translation table that maps every nonzero byte to 1.
+NONZERO_BYTES = '\x00' + '\x01' * 255
+# A translation table that maps every byte to the number of bits set in it.
+BIT_COUNTS = ''.join([chr(bin(value).count('1')) for value in range(256)])
+
+class WhitelistBitset:
+	# reviewers- the sorted reviewer ids, shared by every area.
+	# reviewer_index- a dict from reviewer id to its position in reviewers.
+	def __init__(self, reviewers, reviewer_index):
+		self.reviewers = reviewers
+		self.reviewer_index = reviewer_index
+		self.bits = bytearray((len(reviewers) + 7) >> 3)
+
+	def addIndex(self, ii):
+		self.bits[ii >> 3] |= 1 << (ii & 7)
+
+	def add(self, reviewer):
+		self.addIndex(self.reviewer_index[reviewer])
+
+	# Add many reviewer ids at once.
+	def update(self, reviewers):
+		bits = self.bits
+		reviewer_index = self.reviewer_index
+		for reviewer in reviewers:
+			ii = reviewer_index[reviewer]
+			bits[ii >> 3] |= 1 << (ii & 7)
+
+	def containsIndex(self, ii):
+		return (self.bits[ii >> 3] >> (ii & 7)) & 1 == 1
+
+	def __contains__(self, reviewer):
+		ii = self.reviewer_index.get(reviewer)
+		return ii is not None and self.containsIndex(ii)
+
+	# The integer ids of the whitelisted reviewers, in increasing order.
+	def getIndices(self):
+		bits = self.bits
+		# Most reviewers are not in a given whitelist, so find the nonzero bytes with a C scan.
+		nonzero = bits.translate(NONZERO_BYTES)
+		indices = []
+		byte_index = nonzero.find('\x01')
+		while byte_index != -1:
+			value = bits[byte_index]
+			for bit in range(8):
+				if value & (1 << bit):
+					indices.append((byte_index << 3) + bit)
+			byte_index = nonzero.find('\x01', byte_index + 1)
+		return indices
+
+	def __iter__(self):
+		reviewers = self.reviewers
+		return iter([reviewers[ii] for ii in self.getIndices()])
+
+	def __len__(self):
+		return sum(self.bits.translate(BIT_COUNTS))
+
+# Returns (reviewers, reviewer_index) for a collection of reviewer ids.
+def createReviewerIndex(reviewer_ids):
+	reviewers = sorted(set(reviewer_ids))
+	reviewer_index = dict((reviewer, ii) for ii, reviewer in enumerate(reviewers))
+	return reviewers, reviewer_index